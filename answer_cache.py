@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+
+class AnswerCache:
+    """
+    Semantic cache of generated answers
+
+    A cached answer is reused only when the new question embeds close to a cached
+    one (cosine similarity >= threshold) and retrieval returned exactly the same
+    chunks in the same order, i.e. the LLM would have seen an identical context.
+    Entries expire after a TTL and are all dropped when the vector store changes.
+    """
+
+    def __init__(self, threshold: float, ttl_s: float, max_entries: int):
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        # chunk-id tuple -> entries retrieved with exactly that context, oldest first
+        self._entries: "OrderedDict[Tuple[str, ...], List[Dict[str, Any]]]" = OrderedDict()
+        self._size = 0
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.latency_saved_s = 0.0
+
+    def _sync_generation(self, generation: int) -> bool:
+        """Drop everything if the vector store changed; False if the caller's view is stale"""
+        if self._generation is not None and generation < self._generation:
+            return False
+        if self._generation != generation:
+            self._entries.clear()
+            self._size = 0
+            self._generation = generation
+        return True
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def lookup(self, query_embedding: np.ndarray, chunk_ids: Sequence[str], generation: int) -> Optional[str]:
+        """
+        Cached answer for a near-identical question over the same context, if any
+
+        generation is the vector store's generation read before retrieval ran.
+        """
+        key = tuple(chunk_ids)
+        query = self._normalize(query_embedding)
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            if not self._sync_generation(generation):
+                return None
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+
+            live = [entry for entry in entries if now - entry["created"] <= self.ttl_s]
+            self._size -= len(entries) - len(live)
+            if not live:
+                del self._entries[key]
+                return None
+            self._entries[key] = live
+
+            similarities = np.stack([entry["embedding"] for entry in live]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.latency_saved_s += live[best]["latency_s"]
+            return live[best]["answer"]
+
+    def store(self, query_embedding: np.ndarray, chunk_ids: Sequence[str], answer: str,
+              latency_s: float, generation: int) -> None:
+        """Remember an answer and how long it took to generate"""
+        key = tuple(chunk_ids)
+        with self._lock:
+            # Retrieval ran before the store last changed; the context may be gone
+            if not self._sync_generation(generation):
+                return
+            self._entries.setdefault(key, []).append({
+                "embedding": self._normalize(query_embedding),
+                "answer": answer,
+                "latency_s": latency_s,
+                "created": time.time()
+            })
+            self._entries.move_to_end(key)
+            self._size += 1
+            # Evict least recently used contexts first
+            while self._size > self.max_entries and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit rate and generation time saved by cache hits in this process"""
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "latency_saved_s": self.latency_saved_s,
+                "entries": self._size
+            }
+
+
+_answer_cache: Optional[AnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Return the process-wide answer cache, or None when it is disabled"""
+    global _answer_cache
+    if not Config.ANSWER_CACHE_ENABLED:
+        return None
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache(
+                    threshold=Config.ANSWER_CACHE_SIMILARITY,
+                    ttl_s=Config.ANSWER_CACHE_TTL_S,
+                    max_entries=Config.ANSWER_CACHE_MAX_ENTRIES
+                )
+    return _answer_cache
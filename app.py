@@ -1,9 +1,10 @@
 import streamlit as st
-from groq import Groq
-from document_processor import DocumentProcessor
-from vector_store import VectorStoreManager
+from llm import get_llm_stats, stream_answer
+from warmup import is_vector_store_loaded, start_warmup, warmup_status
 from config import Config
-import os
+from typing import Any, Dict, List
+import time
+import uuid
 
 # Page configuration
 st.set_page_config(
@@ -46,14 +47,24 @@ st.markdown("""
 
 def initialize_session_state():
     """Initialize session state variables"""
-    if 'vector_store' not in st.session_state:
-        st.session_state.vector_store = None
-    if 'document_processor' not in st.session_state:
-        st.session_state.document_processor = DocumentProcessor()
+    # The embedding model and vector store are shared process-wide (see
+    # vector_store.get_vector_store); sessions only hold their own chat state
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex[:12]
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
     if 'documents_uploaded' not in st.session_state:
         st.session_state.documents_uploaded = []
+    if 'ingest_jobs' not in st.session_state:
+        st.session_state.ingest_jobs = []
+
+def session_filename(name: str) -> str:
+    """Name a session's upload is stored under, so sessions uploading the same file name never collide"""
+    return f"{st.session_state.session_id}/{name}"
+
+def display_filename(filename: str) -> str:
+    """The uploaded file's own name, without the session prefix"""
+    return filename.split("/", 1)[-1]
 
 def check_api_key():
     """Check if Groq API key is configured"""
@@ -80,19 +91,96 @@ def setup_sidebar():
         # Model info
         st.info(f"🤖 LLM Model: {Config.LLM_MODEL}")
         st.info(f"🔗 Embedding Model: {Config.EMBEDDING_MODEL}")
+        llm_stats = get_llm_stats()
+        if llm_stats["requests"]:
+            st.caption(
+                f"LLM latency: first token {llm_stats['mean_ttft_s']:.2f}s · "
+                f"complete {llm_stats['mean_latency_s']:.2f}s (mean of {int(llm_stats['requests'])})"
+            )
+            # Only imported once a question has been asked
+            from answer_cache import get_answer_cache
+            answer_cache = get_answer_cache()
+        else:
+            answer_cache = None
+        if answer_cache and answer_cache.lookups:
+            cache_stats = answer_cache.stats()
+            st.caption(
+                f"Answer cache: {cache_stats['hits']}/{cache_stats['lookups']} hits "
+                f"({cache_stats['hit_rate']:.0%}) · {cache_stats['latency_saved_s']:.1f}s saved"
+            )
+        from reranker import get_reranker
+        reranker = get_reranker()
+        if reranker and (reranker.reranked or reranker.skipped):
+            rerank_stats = reranker.stats()
+            st.caption(
+                f"Re-ranking: {rerank_stats['reranked']} re-ranked · {rerank_stats['skipped']} over budget · "
+                f"{rerank_stats['pair_cost_ms']:.1f} ms/pair"
+            )
+        
+        show_performance_panel()
         
         st.markdown("---")
         
         # Vector Store Info
         st.markdown("### 📊 Document Store Status")
-        if st.session_state.vector_store:
-            info = st.session_state.vector_store.get_collection_info()
+        warmup = warmup_status()
+        if is_vector_store_loaded():
+            from vector_store import get_vector_store
+            info = get_vector_store().get_collection_info()
             st.metric("Documents in Store", info["document_count"])
             
-            if st.button("🗑️ Clear Document Store"):
-                if st.session_state.vector_store.clear_collection():
-                    st.session_state.documents_uploaded = []
+            # The store is shared, so another session may have cleared or
+            # removed files; only list what is actually indexed
+            st.session_state.documents_uploaded = [
+                doc for doc in st.session_state.documents_uploaded if doc in info["files"]
+            ]
+            
+            stats = info["ingest_stats"]
+            if stats:
+                st.caption(
+                    f"Chunks embedded: {stats.get('encoded', 0)} · "
+                    f"reused: {stats.get('reused', 0)} · removed: {stats.get('deleted', 0)}"
+                )
+            
+            cache_stats = info["embedding_cache"]
+            if cache_stats:
+                st.caption(
+                    f"Embedding cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses "
+                    f"({cache_stats['hit_rate']:.0%}) · {cache_stats['entries']} vectors"
+                )
+            
+            tier = info.get("vector_tier")
+            if tier:
+                st.caption(
+                    f"Vector tier ({tier['dtype']}): {tier['scan_bytes'] / 2**20:.1f} MB searched · "
+                    f"{tier['compression']:.1f}× smaller than float32"
+                )
+            
+            index = info["index"]
+            if index.get("rebuild", {}).get("state") == "running":
+                st.caption(f"Rebuilding index: {index['rebuild'].get('copied', 0)} chunks copied")
+            elif index.get("rebuild_recommended") or index.get("settings_changed"):
+                st.caption(
+                    f"Index: {index.get('tombstones', 0)} deleted entries "
+                    f"({index.get('tombstone_ratio', 0.0):.0%})"
+                    + (" · HNSW settings changed" if index.get("settings_changed") else "")
+                )
+                if st.button("🔧 Rebuild Index"):
+                    get_vector_store().start_rebuild()
+                    st.rerun()
+            
+            # Only this session's files; the store itself is shared with every other session
+            if st.session_state.documents_uploaded and st.button("🗑️ Clear My Documents"):
+                for doc in list(st.session_state.documents_uploaded):
+                    if not get_vector_store().delete_document(doc):
+                        break
+                    st.session_state.documents_uploaded.remove(doc)
+                else:
                     st.rerun()
+        elif warmup["error"]:
+            st.error(f"Error loading the document store: {warmup['error']}")
+        elif warmup["started"] and not warmup["done"]:
+            st.info("⏳ Loading the embedding model in the background...")
         else:
             st.info("No documents uploaded yet")
         
@@ -102,12 +190,41 @@ def setup_sidebar():
         st.markdown("### 📄 Uploaded Documents")
         if st.session_state.documents_uploaded:
             for doc in st.session_state.documents_uploaded:
-                st.text(f"• {doc}")
+                col1, col2 = st.columns([4, 1])
+                col1.text(f"• {display_filename(doc)}")
+                if col2.button("✖", key=f"remove_{doc}", help=f"Remove {display_filename(doc)} from the document store"):
+                    from vector_store import get_vector_store
+                    if get_vector_store().delete_document(doc):
+                        st.session_state.documents_uploaded.remove(doc)
+                        st.rerun()
         else:
             st.text("No documents uploaded")
 
-def upload_documents():
-    """Handle document upload and processing"""
+def show_performance_panel():
+    """Per-stage latency percentiles and pipeline counters of this process"""
+    from metrics import enabled, render_prometheus, snapshot
+    if not enabled():
+        return
+    current = snapshot()
+    if not current["stages"]:
+        return
+    with st.expander("⏱️ Performance"):
+        st.table([
+            {
+                "stage": stage,
+                "calls": values["count"],
+                "p50 ms": round(values["p50_s"] * 1000, 1),
+                "p95 ms": round(values["p95_s"] * 1000, 1),
+                "p99 ms": round(values["p99_s"] * 1000, 1)
+            }
+            for stage, values in current["stages"].items()
+        ])
+        if current["counters"]:
+            st.caption(" · ".join(f"{name}: {value:,.0f}" for name, value in current["counters"].items()))
+        st.download_button("Download metrics", render_prometheus(), file_name="docexpy_metrics.prom")
+
+def upload_documents(jobs: List[Dict[str, Any]]) -> bool:
+    """Handle document upload and processing; True while queued files are still being ingested"""
     st.markdown('<div class="sub-header">📁 Document Upload</div>', unsafe_allow_html=True)
     
     uploaded_files = st.file_uploader(
@@ -119,74 +236,64 @@ def upload_documents():
     
     if uploaded_files:
         if st.button("🚀 Process Documents", type="primary"):
-            # Initialize vector store if needed
-            if st.session_state.vector_store is None:
-                with st.spinner("Initializing embedding model..."):
-                    st.session_state.vector_store = VectorStoreManager()
+            from job_queue import ACTIVE_STATES, get_job_queue, start_job_runner
             
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            for i, uploaded_file in enumerate(uploaded_files):
-                status_text.text(f"Processing {uploaded_file.name}...")
-                
-                # Process document
-                chunks = st.session_state.document_processor.process_document(uploaded_file)
-                
-                if chunks:
-                    # Add to vector store
-                    success = st.session_state.vector_store.add_documents(chunks, uploaded_file.name)
-                    if success and uploaded_file.name not in st.session_state.documents_uploaded:
-                        st.session_state.documents_uploaded.append(uploaded_file.name)
-                
-                progress_bar.progress((i + 1) / len(uploaded_files))
-            
-            status_text.text("✅ Processing complete!")
+            # Queue the files and return at once; a background runner ingests
+            # them, and survives this tab closing or the process restarting
+            job_queue = get_job_queue()
+            st.session_state.ingest_jobs = [job["id"] for job in jobs if job["state"] in ACTIVE_STATES]
+            for uploaded_file in uploaded_files:
+                st.session_state.ingest_jobs.append(job_queue.submit(session_filename(uploaded_file.name), uploaded_file))
+            with st.spinner("Initializing embedding model..."):
+                runner = start_job_runner()
+            runner.notify()
             st.rerun()
+    
+    return show_ingest_jobs(jobs)
 
-def generate_answer(query: str, context_chunks: list) -> str:
-    """Generate answer using Groq API"""
-    try:
-        # Initialize the Groq client
-        client = Groq(api_key=Config.GROQ_API_KEY)
-        
-        # Prepare context
-        context = "\n\n".join([chunk['content'] for chunk in context_chunks])
-        
-        # Create prompt
-        prompt = f"""Based on the following context from uploaded documents, please answer the question. 
-If the answer cannot be found in the context, please say so clearly.
-
-Context:
-{context}
-
-Question: {query}
+def poll_ingest_jobs() -> List[Dict[str, Any]]:
+    """Fetch this session's ingestion jobs and pick up the files that finished indexing"""
+    if not st.session_state.ingest_jobs:
+        return []
+    from job_queue import get_job_queue
+    
+    jobs = get_job_queue().get(st.session_state.ingest_jobs)
+    for job in jobs:
+        if job["state"] == "indexed" and job["filename"] not in st.session_state.documents_uploaded:
+            st.session_state.documents_uploaded.append(job["filename"])
+    # Indexed jobs are reported once; failures stay listed until the next upload
+    st.session_state.ingest_jobs = [job["id"] for job in jobs if job["state"] != "indexed"]
+    return jobs
 
-Answer:"""
-        
-        # Generate response using Groq
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model=Config.LLM_MODEL,
-            temperature=0.1,
-            max_tokens=1024,
-        )
-        
-        return chat_completion.choices[0].message.content or "No answer available"
-        
-    except Exception as e:
-        return f"Error generating answer: {str(e)}"
+def show_ingest_jobs(jobs: List[Dict[str, Any]]) -> bool:
+    """Show progress of ingestion jobs; True while any of them is still running"""
+    from job_queue import ACTIVE_STATES
+    
+    active = False
+    for job in jobs:
+        if job["state"] in ACTIVE_STATES:
+            active = True
+            done, total = job["chunks_done"], job["chunks_total"]
+            st.progress(
+                min(1.0, done / total) if total else 0.0,
+                text=f"{display_filename(job['filename'])}: {job['state']}" + (f" ({done}/{total} chunks)" if total else "")
+            )
+        elif job["state"] == "failed":
+            st.error(f"Error processing {display_filename(job['filename'])}: {job['error']}")
+    
+    if jobs and not active and any(job["state"] == "indexed" for job in jobs):
+        st.success("✅ Processing complete!")
+    return active
 
 def question_answering():
     """Handle question answering interface"""
     st.markdown('<div class="sub-header">💬 Ask Questions</div>', unsafe_allow_html=True)
     
-    if not st.session_state.vector_store or not st.session_state.documents_uploaded:
+    store_empty = False
+    if is_vector_store_loaded():
+        from vector_store import get_vector_store
+        store_empty = get_vector_store().get_collection_info()["document_count"] == 0
+    if not st.session_state.documents_uploaded or store_empty:
         st.info("Please upload and process documents first to ask questions.")
         return
     
@@ -205,22 +312,96 @@ def question_answering():
     
     if query and search_button:
         with st.spinner("Searching for relevant information..."):
-            # Perform similarity search
-            relevant_chunks = st.session_state.vector_store.similarity_search(query, k=num_results)
+            from answer_cache import get_answer_cache
+            from reranker import get_reranker
+            from vector_store import get_vector_store
+            vector_store = get_vector_store()
+            # Read before retrieval, so an answer is never cached against a changed store
+            generation = vector_store.generation
+            answer_cache = get_answer_cache()
+            query_embedding = None
+            if answer_cache:
+                try:
+                    query_embedding = vector_store.embed_query(query)
+                except Exception as e:
+                    st.error(f"Error embedding question: {str(e)}")
+                    return
+            
+            # Only this session's uploads, so other users' documents never leak into the context
+            filenames = list(st.session_state.documents_uploaded) if Config.SCOPE_TO_SESSION_DOCUMENTS else None
+            
+            # Retrieve a wider pool when a cross-encoder picks the best few from it
+            reranker = get_reranker()
+            candidates = max(num_results, Config.RERANK_CANDIDATES) if reranker else num_results
+            
+            # Perform similarity search, fused with BM25 so exact identifiers are found
+            retrieval_timings = {}
+            if Config.HYBRID_SEARCH_ENABLED:
+                relevant_chunks = vector_store.hybrid_search(
+                    query, k=candidates, query_embedding=query_embedding, timings=retrieval_timings,
+                    filenames=filenames
+                )
+            else:
+                relevant_chunks = vector_store.similarity_search(
+                    query, k=candidates, query_embedding=query_embedding, filenames=filenames
+                )
+            if reranker and relevant_chunks:
+                try:
+                    relevant_chunks = reranker.rerank(query, relevant_chunks, num_results, timings=retrieval_timings)
+                except Exception as e:
+                    st.error(f"Error re-ranking results: {str(e)}")
+                    relevant_chunks = relevant_chunks[:num_results]
             
             if relevant_chunks:
-                # Generate answer
-                with st.spinner("Generating answer with Groq..."):
-                    answer = generate_answer(query, relevant_chunks)
-                
-                # Display results
+                timing_parts = []
+                if "vector_s" in retrieval_timings:
+                    timing_parts.append(f"vector {retrieval_timings['vector_s'] * 1000:.0f} ms")
+                    timing_parts.append(f"BM25 {retrieval_timings['lexical_s'] * 1000:.0f} ms")
+                if "rerank_s" in retrieval_timings:
+                    timing_parts.append(f"re-rank {retrieval_timings['rerank_s'] * 1000:.0f} ms")
+                if timing_parts:
+                    st.caption("Retrieval: " + " · ".join(timing_parts))
                 st.markdown("### 📝 Answer")
-                st.markdown(f'<div class="success-box">{answer}</div>', unsafe_allow_html=True)
+                answer_box = st.empty()
+                chunk_ids = [chunk['id'] for chunk in relevant_chunks]
+                cached = answer_cache.lookup(query_embedding, chunk_ids, generation) if answer_cache else None
+                if cached is not None:
+                    answer = cached
+                    answer_box.markdown(f'<div class="success-box">{answer}</div>', unsafe_allow_html=True)
+                    st.caption("Answered from cache (same context as an earlier, near-identical question)")
+                else:
+                    # Generate answer, rendering tokens as they arrive
+                    answer = ""
+                    llm_metrics = {}
+                    for token in stream_answer(query, relevant_chunks, metrics=llm_metrics):
+                        answer += token
+                        answer_box.markdown(f'<div class="success-box">{answer}▌</div>', unsafe_allow_html=True)
+                    answer = answer.strip() or "No answer available"
+                    answer_box.markdown(f'<div class="success-box">{answer}</div>', unsafe_allow_html=True)
+                    context_report = llm_metrics.get("context")
+                    context_caption = ""
+                    if context_report:
+                        context_caption = (
+                            f" · context {context_report['tokens_out']} tokens "
+                            f"({context_report['tokens_saved']} saved)"
+                        )
+                    st.caption(
+                        f"First token after {llm_metrics.get('ttft_s', 0.0):.2f}s · "
+                        f"complete after {llm_metrics.get('total_s', 0.0):.2f}s" + context_caption
+                    )
+                    if answer_cache and not llm_metrics.get("error"):
+                        answer_cache.store(query_embedding, chunk_ids, answer, llm_metrics.get("total_s", 0.0), generation)
                 
                 # Show sources
                 with st.expander("📚 View Source Context"):
                     for i, chunk in enumerate(relevant_chunks):
-                        st.markdown(f"**Source {i+1}** (from {chunk['metadata']['filename']}):")
+                        metadata = chunk['metadata']
+                        page = ""
+                        if "page_start" in metadata:
+                            page = f", page {metadata['page_start']}"
+                            if metadata.get("page_end", metadata["page_start"]) != metadata["page_start"]:
+                                page = f", pages {metadata['page_start']}-{metadata['page_end']}"
+                        st.markdown(f"**Source {i+1}** (from {display_filename(metadata['filename'])}{page}):")
                         st.text(chunk['content'][:500] + "..." if len(chunk['content']) > 500 else chunk['content'])
                         st.markdown(f"*Relevance Score: {1 - chunk['distance']:.3f}*")
                         st.markdown("---")
@@ -249,6 +430,9 @@ def main():
     """Main application function"""
     initialize_session_state()
     
+    # Load the embedding model and vector store while the first page renders
+    start_warmup()
+    
     # Header
     st.markdown('<div class="main-header">📚 DocExpy</div>', unsafe_allow_html=True)
     st.markdown('<div style="text-align: center; font-size: 1.2rem; color: #666; margin-bottom: 2rem;">Document-based Question Answering System</div>', unsafe_allow_html=True)
@@ -257,6 +441,9 @@ def main():
     if not check_api_key():
         return
     
+    # Check on background ingestion before the sidebar lists documents
+    jobs = poll_ingest_jobs()
+    
     # Setup sidebar
     setup_sidebar()
     
@@ -264,7 +451,7 @@ def main():
     tab1, tab2, tab3 = st.tabs(["📁 Upload Documents", "💬 Ask Questions", "📜 History"])
     
     with tab1:
-        upload_documents()
+        ingesting = upload_documents(jobs)
     
     with tab2:
         question_answering()
@@ -278,6 +465,11 @@ def main():
         '<div style="text-align: center; color: #666;">Built with Streamlit, LangChain, and Groq API</div>',
         unsafe_allow_html=True
     )
+    
+    # Poll background ingestion; any user interaction interrupts the wait and reruns
+    if ingesting:
+        time.sleep(Config.JOB_POLL_INTERVAL_S)
+        st.rerun()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Queries per second of similarity_search_batch at different batch sizes
+
+Batch size 1 is the old one-query-per-call path. The embedding cache is turned
+off and every query is distinct, so each run pays the real model cost.
+
+    python benchmarks/bench_batch_search.py --chunks 5000 --queries 512
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from common import emit
+
+WORDS = (
+    "refund policy warranty invoice shipping clause section contract payment "
+    "error code part number delivery return customer support agreement term"
+).split()
+
+
+def synthetic_text(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length)) + f" ref-{rng.randrange(10**6)}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64, 256])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from config import Config
+    Config.VECTOR_DB_PATH = tempfile.mkdtemp(prefix="docexpy-bench-")
+    Config.EMBEDDING_CACHE_ENABLED = False
+
+    from vector_store import get_vector_store
+
+    rng = random.Random(args.seed)
+    store = get_vector_store()
+    store.ingest([synthetic_text(rng, 120) for _ in range(args.chunks)], "corpus.txt")
+    queries = [synthetic_text(rng, 8) for _ in range(args.queries)]
+
+    # Warm up the model and the HNSW index outside the timed region
+    store.similarity_search_batch(queries[:8], k=args.k)
+
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(queries), batch_size):
+            batch = queries[i:i + batch_size]
+            if batch_size == 1:
+                store.similarity_search(batch[0], k=args.k)
+            else:
+                store.similarity_search_batch(batch, k=args.k)
+        elapsed = time.perf_counter() - start
+        emit({
+            "benchmark": "batch_search",
+            "batch_size": batch_size,
+            "queries": len(queries),
+            "chunks": args.chunks,
+            "k": args.k,
+            "elapsed_s": elapsed,
+            "queries_per_s": len(queries) / elapsed,
+        })
+
+
+if __name__ == "__main__":
+    main()
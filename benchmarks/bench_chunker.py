@@ -0,0 +1,126 @@
+"""
+Speed, chunk sizes, edit stability and recall of the two chunkers
+
+Generates a synthetic corpus with section headings (see corpus.py), extracts
+the structural blocks of every file once, then chunks them with the
+recursive character splitter and with the structured token chunker. For each
+chunker it reports:
+
+* speed         - chunking time, blocks and chunks per second
+* tokens        - mean/p95/max embedding-model tokens per chunk and the share
+                  of chunks longer than the model window, which get truncated
+* edit          - share of a file's chunks that change (and would be re-embedded)
+                  after one sentence is added near its start
+* recall@k      - share of questions with a chunk containing the answer among
+                  the k nearest chunks by exact cosine search (skipped with
+                  --no-recall; needs the embedding model in the local cache)
+
+    python benchmarks/bench_chunker.py --documents 20 --pages 20
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from common import emit, summarize
+from corpus import generate_corpus
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+
+def edited(blocks: List[Any], rng: random.Random) -> List[Any]:
+    """A copy of blocks with one sentence added to a body block in the first third"""
+    body = [i for i, block in enumerate(blocks) if not block.level]
+    target = body[rng.randrange(max(1, len(body) // 3))]
+    copy = list(blocks)
+    copy[target] = copy[target]._replace(text=f"{copy[target].text} This sentence was added in a later revision.")
+    return copy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20, help="Pages per document")
+    parser.add_argument("--docx-share", type=float, default=0.3, help="Share of documents written as DOCX")
+    parser.add_argument("--questions", type=int, default=200, help="Questions asked, sampled from the labelled set")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--window", type=int, default=254, help="Tokens the embedding model reads per chunk")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-recall", action="store_true", help="Skip embedding, e.g. without the model")
+    args = parser.parse_args()
+
+    from chunker import StructuredChunker, get_tokenizer
+    from config import Config
+    from document_processor import DocumentProcessor
+
+    Config.METRICS_ENABLED = False
+    workdir = tempfile.mkdtemp(prefix="docexpy-chunker-")
+    files, questions = generate_corpus(
+        workdir, args.documents, args.pages, args.docx_share, seed=args.seed, headings=True
+    )
+    processor = DocumentProcessor()
+    blocks = {f["filename"]: list(processor.iter_blocks(f["path"], f["filename"])) for f in files}
+    block_count = sum(len(file_blocks) for file_blocks in blocks.values())
+    structured = StructuredChunker()
+    tokenizer_name = "model" if get_tokenizer() is not None else "approximate"
+
+    chunkers: Dict[str, Callable[[List[Any]], Iterator[Tuple[str, Dict[str, Any]]]]] = {
+        "recursive": lambda file_blocks: processor.iter_chunks((block.page, block.text) for block in file_blocks),
+        "structured": structured.iter_chunks,
+    }
+
+    asked = questions
+    if args.questions < len(questions):
+        asked = random.Random(args.seed).sample(questions, args.questions)
+    engine = query_vectors = None
+    if not args.no_recall:
+        from embeddings import EmbeddingEngine
+        engine = EmbeddingEngine()
+        query_vectors = engine.encode([item["question"] for item in asked])
+        query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    for name, chunk in chunkers.items():
+        start = time.perf_counter()
+        chunks = {filename: [text for text, _ in chunk(file_blocks)] for filename, file_blocks in blocks.items()}
+        elapsed = time.perf_counter() - start
+        texts = [text for file_chunks in chunks.values() for text in file_chunks]
+        tokens = [len(offsets) for offsets in structured.token_offsets(texts)]
+
+        rng = random.Random(args.seed)
+        changed: List[float] = []
+        for filename, file_blocks in blocks.items():
+            before = set(chunks[filename])
+            after = [text for text, _ in chunk(edited(file_blocks, rng))]
+            changed.append(sum(text not in before for text in after) / max(1, len(after)))
+
+        result: Dict[str, Any] = {
+            "benchmark": "chunker",
+            "chunker": name,
+            "tokenizer": tokenizer_name,
+            "chunks": len(texts),
+            "elapsed_s": elapsed,
+            "blocks_per_s": block_count / elapsed if elapsed else 0.0,
+            "chunks_per_s": len(texts) / elapsed if elapsed else 0.0,
+            "tokens": {key: summarize([float(t) for t in tokens])[key] for key in ("mean", "p95", "max")},
+            "over_window": sum(t > args.window for t in tokens) / max(1, len(tokens)),
+            "reembedded_after_edit": sum(changed) / max(1, len(changed)),
+        }
+        if engine is not None:
+            vectors = engine.encode(texts)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            nearest = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :args.k]
+            hits = sum(
+                any(item["answer_code"] in texts[i] for i in row) for item, row in zip(asked, nearest)
+            )
+            result["recall_at_k"] = hits / len(asked) if asked else 0.0
+        emit(result)
+
+
+if __name__ == "__main__":
+    main()
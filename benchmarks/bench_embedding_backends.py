@@ -0,0 +1,111 @@
+"""
+Encode throughput and retrieval quality of the embedding backends
+
+Embeds a fixed, seeded corpus with each backend and reports chunks/sec plus two
+recall@k figures from exact (brute-force cosine) search:
+
+* recall_vs_torch - overlap of each query's top-k with the PyTorch top-k, i.e.
+                    how much ranking quality ONNX export or int8 weights lose
+* hit_rate        - share of queries whose source chunk is in the top-k
+
+The ONNX backends need a local model directory with model.onnx (see
+``python embedding_backends.py export``); unavailable backends are reported
+with their error and skipped.
+
+    python benchmarks/bench_embedding_backends.py --model-path ./models/all-MiniLM-L6-v2 --chunks 2000
+"""
+
+import argparse
+import random
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from common import emit
+
+SUBJECTS = ["The supplier", "The customer", "The contractor", "The warranty", "The invoice", "The pump", "Support"]
+VERBS = ["must notify", "shall refund", "covers", "excludes", "is billed for", "reports", "replaces"]
+OBJECTS = [
+    "defective parts within 30 days", "late payments after the due date", "error code E{n} on startup",
+    "shipping damage on delivery", "clause {n}.{m} of the agreement", "part number PX-{n}",
+    "overheating of the motor", "travel costs for on-site repairs", "the annual maintenance fee",
+]
+
+
+def synthetic_chunk(rng: random.Random, sentences: int = 8) -> str:
+    parts = []
+    for _ in range(sentences):
+        obj = rng.choice(OBJECTS).format(n=rng.randrange(100), m=rng.randrange(10))
+        parts.append(f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {obj}.")
+    return " ".join(parts)
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default=None, help="Local model directory (required for onnx)")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=0, help="Inference threads, 0 = runtime default")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from embedding_backends import create_backend
+
+    rng = random.Random(args.seed)
+    corpus = [synthetic_chunk(rng) for _ in range(args.chunks)]
+    sources = [rng.randrange(args.chunks) for _ in range(args.queries)]
+    # A query is one sentence of its source chunk
+    queries = [rng.choice(corpus[source].split(". ")).rstrip(".") for source in sources]
+
+    reference: Optional[np.ndarray] = None
+    for name in args.backends:
+        try:
+            backend = create_backend(
+                backend="onnx" if name.startswith("onnx") else name,
+                model=args.model_path,
+                quantize=name == "onnx-int8",
+                threads=args.threads,
+            )
+        except Exception as e:
+            emit({"benchmark": "embedding_backend", "backend": name, "error": str(e)})
+            continue
+
+        backend.encode(corpus[:args.batch_size], batch_size=args.batch_size)  # warm up
+        start = time.perf_counter()
+        corpus_vectors = backend.encode(corpus, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        query_vectors = backend.encode(queries, batch_size=args.batch_size)
+
+        ranked = top_k(corpus_vectors, query_vectors, args.k)
+        if reference is None and name == "torch":
+            reference = ranked
+        result = {
+            "benchmark": "embedding_backend",
+            "backend": name,
+            "chunks": args.chunks,
+            "k": args.k,
+            "threads": args.threads,
+            "chunks_per_s": args.chunks / elapsed if elapsed else 0.0,
+            "hit_rate": float(np.mean([source in row for source, row in zip(sources, ranked)])),
+        }
+        if reference is not None:
+            overlaps: List[float] = [
+                len(set(row) & set(ref_row)) / args.k for row, ref_row in zip(ranked, reference)
+            ]
+            result["recall_vs_torch"] = float(np.mean(overlaps))
+        emit(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Answer latency against a local fake OpenAI-compatible server
+
+Compares a fresh Groq client per question (the old behaviour), the pooled
+client, and streaming, reporting total latency and time-to-first-token.
+
+    python benchmarks/bench_llm.py --questions 50 --ttft 0.2 --token-delay 0.01
+"""
+
+import argparse
+import time
+
+from common import emit, summarize
+from fake_llm_server import start_fake_server
+
+CONTEXT = [
+    {"content": "Items may be returned within 30 days of purchase.", "metadata": {"filename": "policy.pdf"}},
+    {"content": "Refunds are issued to the original payment method.", "metadata": {"filename": "policy.pdf"}},
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    _, base_url = start_fake_server(ttft=args.ttft, token_delay=args.token_delay)
+
+    from config import Config
+    Config.GROQ_BASE_URL = base_url
+    Config.GROQ_API_KEY = Config.GROQ_API_KEY or "fake-key"
+    Config.LLM_STUB = False
+
+    import llm
+    from groq import Groq
+
+    def fresh_client_answer() -> None:
+        client = Groq(api_key=Config.GROQ_API_KEY, base_url=base_url)
+        client.chat.completions.create(
+            messages=[{"role": "user", "content": llm._build_prompt("What is the refund policy?", CONTEXT)}],
+            model=Config.LLM_MODEL,
+            temperature=0.1,
+            max_tokens=1024,
+        )
+
+    def pooled_answer() -> None:
+        llm.generate_answer("What is the refund policy?", CONTEXT)
+
+    for mode, answer in (("fresh_client", fresh_client_answer), ("pooled_client", pooled_answer)):
+        latencies = []
+        for _ in range(args.questions):
+            start = time.perf_counter()
+            answer()
+            latencies.append(time.perf_counter() - start)
+        emit({"benchmark": "llm", "mode": mode, "questions": args.questions, "total_s": summarize(latencies)})
+
+    ttfts, totals = [], []
+    for _ in range(args.questions):
+        metrics = {}
+        for _ in llm.stream_answer("What is the refund policy?", CONTEXT, metrics=metrics):
+            pass
+        ttfts.append(metrics["ttft_s"])
+        totals.append(metrics["total_s"])
+    emit({
+        "benchmark": "llm",
+        "mode": "pooled_streaming",
+        "questions": args.questions,
+        "ttft_s": summarize(ttfts),
+        "total_s": summarize(totals),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+PDF text extraction: parsers, page-range parallelism and the page cache
+
+Generates long synthetic PDFs (see corpus.py) and reports:
+
+* parser    - pages/s of each installed parser, parsing serially in this process
+* parallel  - wall time to extract and chunk each PDF through the extraction
+              pool with the configured parser, with the page cache cleared so
+              every page is parsed (split into page ranges across --workers)
+* cached    - the same files again, now read from the page cache as after a
+              chunking configuration change
+
+    python benchmarks/bench_pdf_extract.py --documents 4 --pages 200 --workers 4
+"""
+
+import argparse
+import importlib.util
+import os
+import shutil
+import tempfile
+import time
+
+from common import emit, summarize
+from corpus import generate_corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=200, help="Pages per document")
+    parser.add_argument("--workers", type=int, default=4, help="Extraction processes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="docexpy-pdf-")
+    # Keeps the run's page cache out of the real database; the pool's workers inherit it
+    os.environ["VECTOR_DB_PATH"] = os.path.join(workdir, "db")
+    from config import Config
+    from document_processor import DocumentProcessor
+    from ingest_pipeline import get_extract_pool, submit_extraction
+    from pdf_extract import PARSERS, get_parser
+
+    Config.INGEST_WORKERS = args.workers
+    files, _ = generate_corpus(workdir, args.documents, args.pages, docx_share=0.0, seed=args.seed)
+    pages = sum(f["pages"] for f in files)
+
+    processor = DocumentProcessor()
+    cache_enabled = Config.PDF_PAGE_CACHE_ENABLED
+    Config.PDF_PAGE_CACHE_ENABLED = False
+    configured = Config.PDF_PARSER
+    for name, parser_class in PARSERS.items():
+        if importlib.util.find_spec(parser_class.module) is None:
+            emit({"benchmark": "pdf_extract", "stage": "parser", "parser": name, "error": "not installed"})
+            continue
+        Config.PDF_PARSER = name
+        start = time.perf_counter()
+        for f in files:
+            for _ in processor.iter_pdf_pages(f["path"]):
+                pass
+        elapsed = time.perf_counter() - start
+        emit({
+            "benchmark": "pdf_extract",
+            "stage": "parser",
+            "parser": name,
+            "pages": pages,
+            "elapsed_s": elapsed,
+            "pages_per_s": pages / elapsed if elapsed else 0.0,
+        })
+    Config.PDF_PARSER = configured
+    Config.PDF_PAGE_CACHE_ENABLED = cache_enabled
+
+    pool = get_extract_pool()
+    pool.submit(time.sleep, 0).result()  # Start the workers outside the timings
+    for stage in ("parallel", "cached"):
+        latencies = []
+        start = time.perf_counter()
+        for f in files:
+            file_start = time.perf_counter()
+            submit_extraction(pool, f["filename"], f["path"]).result()
+            latencies.append(time.perf_counter() - file_start)
+        elapsed = time.perf_counter() - start
+        emit({
+            "benchmark": "pdf_extract",
+            "stage": stage,
+            "parser": get_parser().name,
+            "workers": args.workers,
+            "pages": pages,
+            "elapsed_s": elapsed,
+            "pages_per_s": pages / elapsed if elapsed else 0.0,
+            "file_s": summarize(latencies),
+        })
+    pool.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
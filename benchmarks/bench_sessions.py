@@ -0,0 +1,99 @@
+"""
+Memory and time-to-first-query as the number of Streamlit sessions grows
+
+Compares the old layout, where every session built its own embedding model and
+ChromaDB client, with the process-wide shared store. Each (mode, sessions)
+point runs in a fresh interpreter so RSS numbers are not polluted by earlier runs.
+
+    python benchmarks/bench_sessions.py --sessions 1 5 10 25 50
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import REPO_ROOT, current_rss_mb, emit, peak_rss_mb, summarize
+
+SEED_CHUNKS = [
+    f"Section {i}: the refund policy allows returns within {i % 30 + 1} days of purchase."
+    for i in range(50)
+]
+
+
+def run_child(mode: str, sessions: int) -> None:
+    """Simulate concurrent sessions in this process and print one result line"""
+    from config import Config
+    Config.VECTOR_DB_PATH = tempfile.mkdtemp(prefix="docexpy-bench-")
+
+    import vector_store
+    from embeddings import EmbeddingEngine
+
+    # Seed with the engine the mode under test uses and measure growth from
+    # there, so neither mode is charged for a model the other one loaded
+    if mode == "per-session":
+        seed_store = vector_store.VectorStoreManager(embedding_model=EmbeddingEngine())
+    else:
+        seed_store = vector_store.get_vector_store()
+    seed_store.ingest(SEED_CHUNKS, "seed.txt")
+    baseline_rss = current_rss_mb()
+
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def session() -> None:
+        start = time.perf_counter()
+        if mode == "per-session":
+            # What every session used to do on first interaction
+            store = vector_store.VectorStoreManager(embedding_model=EmbeddingEngine())
+        else:
+            store = vector_store.get_vector_store()
+        store.similarity_search("How long do I have to return an item?", k=3)
+        with latencies_lock:
+            latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    emit({
+        "benchmark": "sessions",
+        "mode": mode,
+        "sessions": sessions,
+        "wall_s": time.perf_counter() - wall_start,
+        "time_to_first_query_s": summarize(latencies),
+        "rss_mb": current_rss_mb(),
+        "rss_growth_mb": current_rss_mb() - baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--modes", nargs="+", default=["shared", "per-session"],
+                        choices=["shared", "per-session"])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "SESSIONS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]))
+        return
+
+    for mode in args.modes:
+        for sessions in args.sessions:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, str(sessions)],
+                cwd=REPO_ROOT,
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
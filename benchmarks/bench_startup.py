@@ -0,0 +1,132 @@
+"""
+Cold-start cost of the Streamlit app
+
+Each measurement runs in a fresh interpreter:
+
+* import  - ``python -X importtime -c "import app"``: wall time plus the slowest
+            imports by cumulative time, for the lazy app and for an eager
+            baseline that imports vector_store and document_processor up front
+            (what app.py used to do at module load)
+* paint   - time for streamlit's AppTest to run the script once, i.e. until the
+            first page is rendered, and how long the background warm-up of the
+            embedding model and vector store takes after that
+
+    python benchmarks/bench_startup.py --top 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from common import REPO_ROOT, emit
+
+EAGER_IMPORTS = "import vector_store, document_processor, ingest_pipeline, answer_cache"
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, object]]:
+    """Rows of -X importtime output as {"module", "depth", "self_us", "cumulative_us"}"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        # Nested imports are indented two spaces per level after one separating space
+        name = module[1:]
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip(" "))) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return rows
+
+
+def run_import(mode: str, top: int, env: Dict[str, str]) -> None:
+    statement = "import app" if mode == "lazy" else f"{EAGER_IMPORTS}; import app"
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    rows = parse_importtime(completed.stderr)
+    # Top-level modules only, so nested imports are not counted twice
+    top_level = [row for row in rows if row["depth"] == 0]
+    slowest = sorted(top_level, key=lambda row: -row["cumulative_us"])[:top]
+    emit({
+        "benchmark": "startup_import",
+        "mode": mode,
+        "wall_s": wall,
+        "imports_s": sum(row["cumulative_us"] for row in top_level) / 1e6,
+        "modules": len(rows),
+        "slowest": [{"module": row["module"], "cumulative_ms": row["cumulative_us"] / 1000} for row in slowest],
+    })
+
+
+def run_paint_child() -> None:
+    """Render app.py once with AppTest in this process and print timings"""
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    streamlit_import = time.perf_counter() - started
+
+    start = time.perf_counter()
+    app_test = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=120)
+    app_test.run()
+    first_paint = time.perf_counter() - start
+
+    import warmup
+    while not warmup.warmup_status()["done"]:
+        time.sleep(0.05)
+    status = warmup.warmup_status()
+    print(json.dumps({
+        "streamlit_import_s": streamlit_import,
+        "first_paint_s": first_paint,
+        "warmup_s": status["elapsed_s"],
+        "warmup_error": status["error"],
+        "exceptions": [str(e.value) for e in app_test.exception],
+    }))
+
+
+def run_paint(env: Dict[str, str]) -> None:
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child-paint"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    emit({"benchmark": "startup_paint", **result})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--skip-paint", action="store_true", help="Only profile imports")
+    parser.add_argument("--child-paint", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_paint:
+        run_paint_child()
+        return
+
+    env = dict(os.environ)
+    env.setdefault("LLM_STUB", "1")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    with tempfile.TemporaryDirectory(prefix="docexpy-bench-") as workdir:
+        # Keep the benchmark's vector store out of the real ./chroma_db
+        env["VECTOR_DB_PATH"] = os.path.join(workdir, "chroma_db")
+        for mode in ("lazy", "eager"):
+            run_import(mode, args.top, env)
+        if not args.skip_paint:
+            run_paint(env)
+
+
+if __name__ == "__main__":
+    main()
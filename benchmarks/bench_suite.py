@@ -0,0 +1,177 @@
+"""
+End-to-end offline benchmark of ingestion and retrieval
+
+Generates a synthetic PDF/DOCX corpus with labelled questions (see corpus.py),
+ingests it through the same pipeline as the app into a fresh store, then asks
+every question with the stub LLM. Reports:
+
+* ingest    - wall time, pages/s and chunks/s
+* query     - retrieval and end-to-end (retrieval + stub answer) latency percentiles
+* recall@k  - share of questions with a retrieved chunk containing the answer
+* peak RSS  - of the whole run
+* stages    - per-stage percentiles from metrics.py
+
+The result is printed and written as JSON together with the settings that
+affect it (chunk size, model, search mode, ...), so runs before and after a
+change can be compared; --baseline prints the relative change against an
+earlier result file. Hugging Face downloads are disabled, so the embedding
+model must already be in the local cache (or set EMBEDDING_MODEL_PATH).
+
+    python benchmarks/bench_suite.py --documents 20 --pages 20 --output before.json
+    python benchmarks/bench_suite.py --documents 20 --pages 20 --output after.json --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from common import emit, peak_rss_mb, summarize
+from corpus import generate_corpus
+
+# Everything below must work without network access
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+# Compared with --baseline: (path in the result, True if higher is better)
+HEADLINE = [
+    (("ingest", "pages_per_s"), True),
+    (("ingest", "chunks_per_s"), True),
+    (("query", "retrieval_s", "p50"), False),
+    (("query", "retrieval_s", "p95"), False),
+    (("query", "end_to_end_s", "p95"), False),
+    (("recall_at_k",), True),
+    (("peak_rss_mb",), False),
+]
+
+
+def lookup(result: Dict[str, Any], path: tuple) -> Any:
+    for key in path:
+        result = result.get(key, {}) if isinstance(result, dict) else {}
+    return result if isinstance(result, (int, float)) else None
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    for path, higher_is_better in HEADLINE:
+        current, previous = lookup(result, path), lookup(baseline, path)
+        if current is None or previous is None:
+            continue
+        change = (current - previous) / previous if previous else 0.0
+        better = change >= 0 if higher_is_better else change <= 0
+        emit({
+            "benchmark": "suite_compare",
+            "metric": ".".join(path),
+            "baseline": previous,
+            "current": current,
+            "change": change,
+            "verdict": "same" if abs(change) < 0.02 else "better" if better else "worse",
+        })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20, help="Pages per document")
+    parser.add_argument("--docx-share", type=float, default=0.3, help="Share of documents written as DOCX")
+    parser.add_argument("--questions", type=int, default=200, help="Questions asked, sampled from the labelled set")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--search", choices=["hybrid", "vector"], default="hybrid")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the stub LLM sleeps per answer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_suite.json")
+    parser.add_argument("--baseline", default=None, help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    from config import Config
+    workdir = tempfile.mkdtemp(prefix="docexpy-bench-")
+    Config.VECTOR_DB_PATH = os.path.join(workdir, "store")
+    Config.EMBEDDING_CACHE_ENABLED = False
+    Config.ANSWER_CACHE_ENABLED = False
+    Config.LLM_STUB = True
+    Config.LLM_STUB_LATENCY_S = args.llm_latency
+    Config.HYBRID_SEARCH_ENABLED = args.search == "hybrid"
+
+    files, questions = generate_corpus(
+        os.path.join(workdir, "corpus"), args.documents, args.pages, args.docx_share, seed=args.seed
+    )
+
+    import metrics
+    from ingest_pipeline import IngestPipeline
+    from llm import generate_answer
+    from vector_store import get_vector_store
+
+    store = get_vector_store()
+    store.embedding_model.warm_up()
+    metrics.reset()
+
+    start = time.perf_counter()
+    snapshot: Dict[str, Any] = {}
+    for snapshot in IngestPipeline(store).run([(f["filename"], f["path"]) for f in files]):
+        pass
+    ingest_s = time.perf_counter() - start
+    file_results = snapshot.get("results", {})
+    chunks = sum(r.get("chunks", 0) for r in file_results.values())
+    failed = sorted(name for name, r in file_results.items() if "error" in r)
+    pages = sum(f["pages"] for f in files if f["filename"] not in failed)
+
+    asked = questions
+    if args.questions < len(questions):
+        asked = random.Random(args.seed).sample(questions, args.questions)
+    retrieval: List[float] = []
+    end_to_end: List[float] = []
+    hits = 0
+    for item in asked:
+        start = time.perf_counter()
+        if Config.HYBRID_SEARCH_ENABLED:
+            results = store.hybrid_search(item["question"], k=args.k)
+        else:
+            results = store.similarity_search(item["question"], k=args.k)
+        retrieved = time.perf_counter()
+        generate_answer(item["question"], results)
+        end_to_end.append(time.perf_counter() - start)
+        retrieval.append(retrieved - start)
+        hits += any(item["answer_code"] in r["content"] for r in results)
+
+    result = {
+        "benchmark": "suite",
+        "settings": {
+            "documents": args.documents,
+            "pages_per_document": args.pages,
+            "docx_share": args.docx_share,
+            "seed": args.seed,
+            "k": args.k,
+            "search": args.search,
+            "chunker": Config.CHUNKER,
+            "chunk_tokens": Config.CHUNK_TOKENS,
+            "chunk_size": Config.CHUNK_SIZE,
+            "chunk_overlap": Config.CHUNK_OVERLAP,
+            "embedding_model": Config.EMBEDDING_MODEL_PATH or Config.EMBEDDING_MODEL,
+            "embedding_backend": Config.EMBEDDING_BACKEND,
+            "ingest_workers": Config.INGEST_WORKERS,
+        },
+        "corpus": {"files": len(files), "pages": pages, "bytes": sum(f["bytes"] for f in files), "failed": failed},
+        "ingest": {
+            "elapsed_s": ingest_s,
+            "chunks": chunks,
+            "pages_per_s": pages / ingest_s if ingest_s else 0.0,
+            "chunks_per_s": chunks / ingest_s if ingest_s else 0.0,
+        },
+        "query": {"questions": len(asked), "retrieval_s": summarize(retrieval), "end_to_end_s": summarize(end_to_end)},
+        "recall_at_k": hits / len(asked) if asked else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": metrics.snapshot()["stages"],
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    emit({key: result[key] for key in ("benchmark", "ingest", "query", "recall_at_k", "peak_rss_mb")})
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
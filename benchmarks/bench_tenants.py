@@ -0,0 +1,126 @@
+"""
+Scoped query latency with many tenants in one store
+
+Loads --chunks random vectors (1M by default) split evenly across --tenants
+tenants, each with a few files, in the two layouts vector_store supports, and
+queries a few tenants' documents in each:
+
+* shared    - one collection, unscoped (the old behaviour, for reference)
+* filtered  - one collection, queries restricted with a where filter on filename
+* sharded   - one collection per tenant (VectorStoreManager(tenant=...))
+
+Each scoped result reports p50/p95 latency and recall@k against exact search
+over that tenant's own vectors. Vectors are random and inserted directly, so no
+embedding model is needed; loading 1M vectors into ChromaDB still takes a while,
+use --chunks 100000 for a quick run.
+
+    python benchmarks/bench_tenants.py --chunks 1000000 --tenants 100
+"""
+
+import argparse
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from common import emit, summarize
+
+INSERT_BATCH = 5000
+
+
+def tenant_vectors(seed: int, tenant: int, count: int, dim: int) -> np.ndarray:
+    """Unit vectors of one tenant, regenerated identically on every call"""
+    vectors = np.random.default_rng([seed, tenant]).standard_normal((count, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def tenant_filenames(tenant: int, files: int) -> List[str]:
+    return [f"tenant{tenant}-doc{f}.pdf" for f in range(files)]
+
+
+def load(collection, ids: List[str], vectors: np.ndarray, metadatas: List[Dict[str, str]]) -> None:
+    for start in range(0, len(ids), INSERT_BATCH):
+        end = start + INSERT_BATCH
+        collection.add(ids=ids[start:end], embeddings=vectors[start:end].tolist(), metadatas=metadatas[start:end])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1_000_000, help="Total chunks across all tenants")
+    parser.add_argument("--tenants", type=int, default=100)
+    parser.add_argument("--files-per-tenant", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--query-tenants", type=int, default=10, help="Tenants queried in each layout")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per queried tenant")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import chromadb
+    from chromadb.config import Settings
+
+    from config import Config
+    from vector_store import collection_name_for
+
+    client = chromadb.PersistentClient(
+        path=tempfile.mkdtemp(prefix="docexpy-bench-"), settings=Settings(anonymized_telemetry=False)
+    )
+    per_tenant = args.chunks // args.tenants
+    shared = client.create_collection(name=Config.COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+    shards = {}
+
+    start = time.perf_counter()
+    for tenant in range(args.tenants):
+        vectors = tenant_vectors(args.seed, tenant, per_tenant, args.dim)
+        filenames = tenant_filenames(tenant, args.files_per_tenant)
+        ids = [f"t{tenant}-{i}" for i in range(per_tenant)]
+        metadatas = [{"filename": filenames[i % len(filenames)]} for i in range(per_tenant)]
+        load(shared, ids, vectors, metadatas)
+        shard = client.create_collection(name=collection_name_for(f"tenant{tenant}"), metadata={"hnsw:space": "cosine"})
+        load(shard, ids, vectors, metadatas)
+        shards[tenant] = shard
+    emit({
+        "benchmark": "tenants_load",
+        "chunks": per_tenant * args.tenants,
+        "tenants": args.tenants,
+        "elapsed_s": time.perf_counter() - start,
+    })
+
+    rng = np.random.default_rng(args.seed)
+    queried = rng.choice(args.tenants, size=min(args.query_tenants, args.tenants), replace=False)
+    latencies: Dict[str, List[float]] = {"shared": [], "filtered": [], "sharded": []}
+    recalls: Dict[str, List[float]] = {"shared": [], "filtered": [], "sharded": []}
+    for tenant in queried:
+        tenant = int(tenant)
+        vectors = tenant_vectors(args.seed, tenant, per_tenant, args.dim)
+        filenames = tenant_filenames(tenant, args.files_per_tenant)
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+        for layout in latencies:
+            collection = shards[tenant] if layout == "sharded" else shared
+            where = {"filename": {"$in": filenames}} if layout == "filtered" else None
+            for query, expected in zip(queries, exact):
+                start = time.perf_counter()
+                result = collection.query(query_embeddings=[query.tolist()], n_results=args.k, where=where, include=[])
+                latencies[layout].append(time.perf_counter() - start)
+                expected_ids = {f"t{tenant}-{i}" for i in expected}
+                recalls[layout].append(len(expected_ids & set(result["ids"][0])) / args.k)
+
+    for layout, values in latencies.items():
+        emit({
+            "benchmark": "tenants_query",
+            "layout": layout,
+            "chunks": per_tenant * args.tenants,
+            "chunks_in_scope": per_tenant,
+            "k": args.k,
+            "latency_s": summarize(values),
+            # The shared layout searches every tenant, so its recall is for reference only
+            "recall_at_k": float(np.mean(recalls[layout])),
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Footprint, latency and recall of the compact vector tier against ChromaDB's HNSW index
+
+Stores the same vectors in a fresh ChromaDB collection (the current path) and in
+fp16 and int8 vector tiers, then runs every query against each. Ground truth is
+an exact float32 scan. Reports per store:
+
+* memory    - bytes kept in memory for searching: the tiers' quantized codes
+              (their float32 file is only paged in for re-scoring), or HNSW's
+              float32 vectors plus graph links
+* write_s   - time to store the vectors; ChromaDB's includes the tolist() copy
+* query     - latency percentiles per query
+* recall@k  - overlap with the exact top-k; for the tiers also without re-scoring
+
+Vectors are unit-normalized clusters of 384-d Gaussian noise by default, or an
+.npy matrix of real embeddings given with --embeddings. ChromaDB is skipped with
+its error if it cannot be imported.
+
+    python benchmarks/bench_vector_tier.py --vectors 200000 --queries 200
+"""
+
+import argparse
+import hashlib
+import shutil
+import tempfile
+import time
+from typing import List, Set
+
+import numpy as np
+
+from common import emit, summarize
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[Set[int]]:
+    truth = []
+    for query in queries:
+        scores = vectors @ query
+        truth.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    return truth
+
+
+def recall(found: List[List[int]], truth: List[Set[int]]) -> float:
+    return sum(len(truth_set & set(rows)) / len(truth_set) for rows, truth_set in zip(found, truth)) / len(truth)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--embeddings", default=None, help="Use the rows of this .npy file instead")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=4, help="Candidates re-scored per result")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype(np.float32)
+    else:
+        centers = rng.normal(size=(args.clusters, args.dim))
+        vectors = centers[rng.integers(0, args.clusters, args.vectors)] + rng.normal(scale=0.8, size=(args.vectors, args.dim))
+        vectors = vectors.astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Queries near stored vectors, like questions near the chunk that answers them
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + rng.normal(scale=0.5 / np.sqrt(vectors.shape[1]), size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact_top_k(vectors, queries, args.k)
+    ids = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(len(vectors))]
+    rows_by_id = {rid: row for row, rid in enumerate(ids)}
+    workdir = tempfile.mkdtemp(prefix="docexpy-tier-")
+
+    from vector_tier import CompactVectorIndex
+    for dtype in ("fp16", "int8"):
+        tier = CompactVectorIndex(f"{workdir}/{dtype}", dtype, rescore=args.rescore)
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), 5000):
+            tier.add(ids[offset:offset + 5000], vectors[offset:offset + 5000])
+        tier.save()
+        write_s = time.perf_counter() - start
+        latencies, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = tier.search(query, args.k)[0]
+            latencies.append(time.perf_counter() - start)
+            found.append([rows_by_id[rid] for rid, _ in hits])
+        first_pass = [[rows_by_id[rid] for rid, _ in hits] for hits in tier.search(queries, args.k, rescore=1)]
+        stats = tier.stats()
+        emit({
+            "benchmark": "vector_tier",
+            "store": f"tier_{dtype}",
+            "vectors": len(vectors),
+            "memory_bytes": stats["scan_bytes"],
+            "rescore_file_bytes": stats["rescore_bytes"],
+            "write_s": write_s,
+            "query_s": summarize(latencies),
+            "recall_at_k": recall(found, truth),
+            "recall_at_k_first_pass": recall(first_pass, truth),
+        })
+
+    try:
+        import chromadb
+        from chromadb.config import Settings
+    except ImportError as e:
+        emit({"benchmark": "vector_tier", "store": "chroma_hnsw", "error": str(e)})
+    else:
+        client = chromadb.PersistentClient(path=f"{workdir}/chroma", settings=Settings(anonymized_telemetry=False))
+        collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), 5000):
+            collection.add(ids=ids[offset:offset + 5000], embeddings=vectors[offset:offset + 5000].tolist())
+        write_s = time.perf_counter() - start
+        latencies, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=args.k, include=[])
+            latencies.append(time.perf_counter() - start)
+            found.append([rows_by_id[rid] for rid in result["ids"][0]])
+        # float32 vectors plus M=16 links per node on layer 0 (4 bytes each), as hnswlib stores them
+        hnsw_bytes = len(vectors) * (vectors.shape[1] * 4 + 2 * 16 * 4)
+        emit({
+            "benchmark": "vector_tier",
+            "store": "chroma_hnsw",
+            "vectors": len(vectors),
+            "memory_bytes": hnsw_bytes,
+            "write_s": write_s,
+            "query_s": summarize(latencies),
+            "recall_at_k": recall(found, truth),
+        })
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Shared helpers for the DocExpy benchmark scripts
+Run the scripts from the repository root, e.g. ``python benchmarks/bench_sessions.py``
+"""
+
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+# Make the top-level DocExpy modules importable from the benchmarks directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        # /proc fallback for Linux when psutil is not installed
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KB on Linux
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Mean and tail percentiles of a list of latencies"""
+    if not values:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def emit(result: Dict[str, Any]) -> None:
+    """Print one benchmark result as a JSON line"""
+    print(json.dumps(result, sort_keys=True), flush=True)
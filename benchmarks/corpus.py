@@ -0,0 +1,152 @@
+"""
+Synthetic PDF/DOCX corpus with labelled questions, for offline benchmarks
+
+Every page is filler text about warranties, invoices and repairs with one
+planted fact naming a unique part code. Each fact has a question mentioning
+the same part; a retrieved chunk answers it if it contains the code, which
+occurs nowhere else in the corpus. With headings, every page starts with a
+numbered section heading (a heading style in DOCX, a plain line in PDF).
+PDFs are written by hand (Helvetica text, one content stream per page), so no
+PDF library is needed; DOCX needs python-docx, which DocExpy already depends on.
+"""
+
+import os
+import random
+from typing import Any, Dict, List, Tuple
+
+SUBJECTS = ["The supplier", "The customer", "The contractor", "The warranty", "The invoice", "The pump", "Support"]
+VERBS = ["must notify", "shall refund", "covers", "excludes", "is billed for", "reports", "replaces"]
+OBJECTS = [
+    "defective parts within 30 days", "late payments after the due date", "error codes shown on startup",
+    "shipping damage on delivery", "the clauses of the agreement", "spare parts kept in stock",
+    "overheating of the motor", "travel costs for on-site repairs", "the annual maintenance fee",
+]
+SECTIONS = ["service terms", "maintenance", "warranty conditions", "spare parts", "billing"]
+PRODUCTS = ["pump", "compressor", "valve", "controller", "heater", "sensor", "motor", "filter"]
+
+CHARS_PER_LINE = 95
+
+
+def _sentence(rng: random.Random) -> str:
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}."
+
+
+def _page_text(rng: random.Random, fact: str, sentences: int) -> List[str]:
+    """Paragraphs of one page, with the fact in a random one"""
+    paragraphs = [" ".join(_sentence(rng) for _ in range(rng.randint(3, 7))) for _ in range(max(1, sentences // 5))]
+    target = rng.randrange(len(paragraphs))
+    paragraphs[target] = f"{paragraphs[target]} {fact}"
+    return paragraphs
+
+
+def _wrap(paragraph: str) -> List[str]:
+    lines, line = [], ""
+    for word in paragraph.split():
+        if line and len(line) + 1 + len(word) > CHARS_PER_LINE:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[str]]) -> None:
+    """Write a minimal PDF with one page per list of paragraphs; "# " marks a heading"""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page ids are known
+    page_tree = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for paragraphs in pages:
+        lines: List[str] = []
+        for paragraph in paragraphs:
+            lines.extend(_wrap(paragraph[2:] if paragraph.startswith("# ") else paragraph))
+            lines.append("")
+        text = " T* ".join(f"({_escape(line)}) Tj" for line in lines)
+        stream = f"BT /F1 10 Tf 13 TL 50 760 Td {text} ET".encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (page_tree, font, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[page_tree - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path: str, pages: List[List[str]]) -> None:
+    """Write a DOCX with the pages' paragraphs, separated by page breaks; "# " marks a heading"""
+    import docx
+
+    document = docx.Document()
+    for number, paragraphs in enumerate(pages):
+        if number:
+            document.add_page_break()
+        for paragraph in paragraphs:
+            if paragraph.startswith("# "):
+                document.add_heading(paragraph[2:], level=1)
+            else:
+                document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def generate_corpus(directory: str, documents: int, pages_per_document: int, docx_share: float = 0.3,
+                    sentences_per_page: int = 30, seed: int = 0,
+                    headings: bool = False) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """
+    Write the corpus into directory
+
+    Returns the files as {"filename", "path", "pages", "bytes"} and the labelled
+    questions as {"question", "answer_code", "filename"}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    files: List[Dict[str, Any]] = []
+    questions: List[Dict[str, str]] = []
+    codes = rng.sample(range(10_000, 100_000), documents * pages_per_document)
+    for number in range(documents):
+        is_docx = rng.random() < docx_share
+        filename = f"manual_{number:04d}.{'docx' if is_docx else 'pdf'}"
+        pages = []
+        for page in range(pages_per_document):
+            code = f"QX-{codes[number * pages_per_document + page]}"
+            product = rng.choice(PRODUCTS)
+            months = rng.randint(6, 60)
+            fact = f"The {product} with part code {code} has a warranty of {months} months."
+            paragraphs = _page_text(rng, fact, sentences_per_page)
+            if headings:
+                paragraphs.insert(0, f"# {page + 1} {rng.choice(PRODUCTS).capitalize()} {rng.choice(SECTIONS)}")
+            pages.append(paragraphs)
+            questions.append({
+                "question": f"How long is the warranty of the {product} with part code {code}?",
+                "answer_code": code,
+                "filename": filename
+            })
+        path = os.path.join(directory, filename)
+        (write_docx if is_docx else write_pdf)(path, pages)
+        files.append({"filename": filename, "path": path, "pages": pages_per_document, "bytes": os.path.getsize(path)})
+    return files, questions
@@ -0,0 +1,113 @@
+"""
+Local fake of an OpenAI-compatible chat completions endpoint (as used by Groq)
+
+Answers /openai/v1/chat/completions and /v1/chat/completions with a canned
+reply, either in one response or as server-sent events with a configurable
+time-to-first-token and per-token delay. Keeps HTTP/1.1 connections alive so
+client connection reuse is visible in latency numbers.
+
+    python benchmarks/fake_llm_server.py --port 8088 --ttft 0.2 --token-delay 0.01
+    GROQ_BASE_URL=http://127.0.0.1:8088 GROQ_API_KEY=fake streamlit run app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+ANSWER = (
+    "Based on the provided context, the refund policy allows customers to return "
+    "items within 30 days of purchase for a full refund, provided the items are unused."
+)
+
+
+def make_handler(ttft: float, token_delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            if self.path not in ("/openai/v1/chat/completions", "/v1/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = request.get("model", "fake")
+            created = int(time.time())
+            tokens = [word + " " for word in ANSWER.split(" ")]
+
+            if not request.get("stream"):
+                time.sleep(ttft + token_delay * len(tokens))
+                self._send_json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": ANSWER},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(ttft)
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(token_delay)
+                event = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+    return Handler
+
+
+def start_fake_server(port: int = 0, ttft: float = 0.2, token_delay: float = 0.01) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the fake server in a background thread and return it with its base URL"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(ttft, token_delay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between tokens")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.ttft, args.token_delay))
+    print(f"Fake OpenAI-compatible server on http://127.0.0.1:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
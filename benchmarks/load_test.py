@@ -0,0 +1,108 @@
+"""
+Closed-loop load generator for the DocExpy HTTP API (server.py)
+
+Start the server with the stub LLM so only DocExpy's own work is measured:
+
+    LLM_STUB=1 python server.py
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --endpoint answer --concurrency 32
+
+Each of --concurrency threads sends requests back to back until --requests have
+completed; throughput and latency percentiles are printed as one JSON line.
+Uses only the standard library so it runs on any box next to the server.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from common import emit, summarize
+
+QUESTIONS = [
+    "What is the refund policy?",
+    "How long is the warranty period?",
+    "Which clause covers late payment?",
+    "What does error code E42 mean?",
+    "Who do I contact for support?",
+    "When is the delivery deadline?",
+]
+
+
+def post(url: str, payload: dict, timeout: float) -> int:
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=["search", "answer"], default="answer")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    url = f"{args.url.rstrip('/')}/{args.endpoint}"
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    issued = [0]
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        while True:
+            with lock:
+                if issued[0] >= args.requests:
+                    return
+                issued[0] += 1
+            question = rng.choice(QUESTIONS)
+            if args.endpoint == "search":
+                payload = {"queries": [question], "k": args.k}
+            else:
+                payload = {"query": question, "k": args.k}
+            start = time.perf_counter()
+            try:
+                status = post(url, payload, args.timeout)
+            except Exception:
+                status = -1
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    emit({
+        "benchmark": "http_load",
+        "endpoint": args.endpoint,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "latency_s": summarize(latencies),
+    })
+
+
+if __name__ == "__main__":
+    main()
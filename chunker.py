@@ -0,0 +1,240 @@
+"""
+Structure-aware chunking on token offsets
+
+The recursive character splitter sizes chunks in characters, so the embedding
+model silently truncates chunks that tokenize long and short ones waste a
+forward pass, and it ignores headings, so chunks straddle sections. Its cut
+points also depend on everything before them: one edit early in a file moves
+every later chunk boundary and forces the whole file to be re-embedded.
+
+StructuredChunker works on blocks (paragraphs, table rows, headings) and:
+
+1. tokenizes them in batches with the embedding model's fast tokenizer and
+   sizes chunks in its tokens (CHUNK_TOKENS)
+2. starts a new chunk at every heading once the running chunk has
+   CHUNK_MIN_TOKENS, so chunks follow sections and boundaries only depend on
+   the text since the last heading
+3. fills chunks with whole paragraphs, splitting a paragraph at sentence ends
+   (or token boundaries for run-on text) only when it does not fit, and repeats
+   up to CHUNK_OVERLAP_TOKENS of trailing sentences when a section continues
+   in the next chunk
+
+Without transformers or a local copy of the tokenizer, tokens are approximated
+by short word pieces.
+"""
+
+import bisect
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from config import Config
+from metrics import span
+
+
+class Block(NamedTuple):
+    """A paragraph, table row group or heading of a document"""
+    page: Optional[int]
+    text: str
+    level: int = 0  # Heading level, 0 for body text
+
+
+class _Unit(NamedTuple):
+    """A sentence (or piece of one) of a block, the smallest thing a chunk is cut around"""
+    block: Block
+    start: int
+    end: int
+    tokens: int
+
+
+# Sentence ends and line breaks; PDF lines and table rows break at word boundaries too
+_UNIT_BREAK = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+# Word pieces of at most 8 letters or 4 digits, roughly what WordPiece produces for English
+_APPROXIMATE_TOKEN = re.compile(r"[^\W\d]{1,8}|\d{1,4}|[^\w\s]")
+
+_tokenizer: Any = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def _load_tokenizer() -> Any:
+    name = Config.EMBEDDING_MODEL_PATH or Config.EMBEDDING_MODEL
+    if not os.path.isdir(name) and "/" not in name:
+        # sentence-transformers resolves bare model names the same way
+        name = f"sentence-transformers/{name}"
+    try:
+        from transformers import AutoTokenizer
+        # Never reach for the network from an extraction worker; the embedding model's
+        # download (or EMBEDDING_MODEL_PATH) leaves the tokenizer files on disk
+        tokenizer = AutoTokenizer.from_pretrained(name, local_files_only=True)
+    except (ImportError, OSError, ValueError):
+        return None
+    # Only fast (Rust) tokenizers return character offsets
+    return tokenizer if getattr(tokenizer, "is_fast", False) else None
+
+
+def get_tokenizer() -> Any:
+    """The embedding model's fast tokenizer, loaded once per process; None if unavailable"""
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        with _tokenizer_lock:
+            if not _tokenizer_loaded:
+                _tokenizer = _load_tokenizer()
+                _tokenizer_loaded = True
+    return _tokenizer
+
+
+class StructuredChunker:
+    """Token-sized chunks that follow a document's headings and paragraphs"""
+
+    def __init__(self, chunk_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None,
+                 min_tokens: Optional[int] = None, tokenizer: Any = None):
+        self.chunk_tokens = chunk_tokens or Config.CHUNK_TOKENS
+        self.overlap_tokens = Config.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        self.min_tokens = Config.CHUNK_MIN_TOKENS if min_tokens is None else min_tokens
+        self._tokenizer = tokenizer
+
+    @property
+    def tokenizer(self) -> Any:
+        return self._tokenizer if self._tokenizer is not None else get_tokenizer()
+
+    def token_offsets(self, texts: List[str]) -> List[List[Tuple[int, int]]]:
+        """(start, end) character offsets of every token of each text, in one tokenizer call"""
+        tokenizer = self.tokenizer
+        if tokenizer is None:
+            return [[match.span() for match in _APPROXIMATE_TOKEN.finditer(text)] for text in texts]
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False
+        )
+        return [[tuple(offset) for offset in offsets] for offsets in encoded["offset_mapping"]]
+
+    def _units(self, block: Block, offsets: List[Tuple[int, int]]) -> List[_Unit]:
+        """Split a block into sentences, and sentences longer than a chunk at token boundaries"""
+        starts = [start for start, _ in offsets]
+        spans = []
+        position = 0
+        for match in _UNIT_BREAK.finditer(block.text):
+            if match.start() > position:
+                spans.append((position, match.start()))
+            position = match.end()
+        end = len(block.text.rstrip())
+        if position < end:
+            spans.append((position, end))
+
+        units = []
+        for start, end in spans:
+            first, last = bisect.bisect_left(starts, start), bisect.bisect_left(starts, end)
+            while last - first > self.chunk_tokens:
+                # Cut before a token that starts a word, so words are not split
+                cut = first + self.chunk_tokens
+                while cut > first + self.chunk_tokens // 2 and not block.text[starts[cut] - 1].isspace():
+                    cut -= 1
+                units.append(_Unit(block, start, offsets[cut - 1][1], cut - first))
+                start, first = starts[cut], cut
+            units.append(_Unit(block, start, end, max(1, last - first)))
+        return units
+
+    def _chunk(self, units: List[_Unit], section: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+        parts: List[str] = []
+        run_start = 0
+        for i, unit in enumerate(units):
+            if i + 1 == len(units) or units[i + 1].block is not unit.block:
+                parts.append(unit.block.text[units[run_start].start:unit.end])
+                run_start = i + 1
+        metadata: Dict[str, Any] = {"chunk_tokens": sum(unit.tokens for unit in units)}
+        pages = [unit.block.page for unit in units if unit.block.page is not None]
+        if pages:
+            metadata["page_start"] = int(min(pages))
+            metadata["page_end"] = int(max(pages))
+        if section:
+            metadata["section"] = section[:200]
+        return "\n".join(parts), metadata
+
+    def iter_chunks(self, blocks: Iterable[Block]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Chunk a stream of blocks, yielding (chunk, metadata) as blocks arrive
+
+        Metadata holds chunk_tokens, page_start/page_end when the blocks have
+        page numbers, and section, the heading the chunk falls under. Only
+        CHUNK_TOKENIZE_BATCH blocks and the chunk being filled are held at a time.
+        """
+        current: List[_Unit] = []
+        used = 0
+        section: Optional[str] = None
+        # Heading of the chunk being filled, which may differ from section once a heading was appended
+        chunk_section: Optional[str] = None
+
+        def close(carry: bool) -> List[Tuple[str, Dict[str, Any]]]:
+            nonlocal current, used, chunk_section
+            if not current:
+                return []
+            chunk = self._chunk(current, chunk_section)
+            kept: List[_Unit] = []
+            if carry and self.overlap_tokens:
+                kept_tokens = 0
+                for unit in reversed(current[1:]):
+                    if kept_tokens + unit.tokens > self.overlap_tokens:
+                        break
+                    kept.insert(0, unit)
+                    kept_tokens += unit.tokens
+            current, used, chunk_section = kept, sum(unit.tokens for unit in kept), section
+            return [chunk]
+
+        def add(units: List[_Unit]) -> List[Tuple[str, Dict[str, Any]]]:
+            nonlocal used
+            done = []
+            for unit in units:
+                if used + unit.tokens > self.chunk_tokens:
+                    done.extend(close(carry=True))
+                    # The carried overlap must leave room for the unit itself
+                    while current and used + unit.tokens > self.chunk_tokens:
+                        used -= current.pop(0).tokens
+                current.append(unit)
+                used += unit.tokens
+            return done
+
+        def feed(batch: List[Block]) -> List[Tuple[str, Dict[str, Any]]]:
+            nonlocal section, chunk_section
+            done: List[Tuple[str, Dict[str, Any]]] = []
+            with span("chunk"):
+                for block, offsets in zip(batch, self.token_offsets([block.text for block in batch])):
+                    units = self._units(block, offsets)
+                    if not units:
+                        continue
+                    if block.level:
+                        # A new section; tiny trailing content of the last one joins it instead
+                        if used >= self.min_tokens:
+                            done.extend(close(carry=False))
+                        section = block.text.strip()
+                        if not current:
+                            chunk_section = section
+                        done.extend(add(units))
+                        continue
+                    tokens = sum(unit.tokens for unit in units)
+                    fits_alone = tokens <= self.chunk_tokens
+                    if used + tokens > self.chunk_tokens and used >= self.chunk_tokens // 2 and fits_alone:
+                        # Start the paragraph in a fresh chunk rather than splitting it
+                        done.extend(close(carry=True))
+                    if not current:
+                        chunk_section = section
+                    done.extend(add(units))
+            return done
+
+        pending: List[Block] = []
+        for block in blocks:
+            if not block.text.strip():
+                continue
+            pending.append(block)
+            if len(pending) >= Config.CHUNK_TOKENIZE_BATCH:
+                yield from feed(pending)
+                pending = []
+        if pending:
+            yield from feed(pending)
+        yield from close(carry=False)
+
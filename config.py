@@ -14,15 +14,107 @@ class Config:
     
     # Model Configuration
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Sentence transformer model
+    EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH")  # Local model directory, for offline use
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx"
+    EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "").lower() in ("1", "true", "yes")  # int8 ONNX weights
+    EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # Inference threads, 0 = runtime default
+    EMBED_TOKEN_BUDGET = 16384  # Padded tokens per forward pass; texts are bucketed by length
     LLM_MODEL = "llama3-8b-8192"  # Groq model
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # Override to point at an OpenAI-compatible server
+    LLM_TIMEOUT_S = 60.0
+    
+    # Offline stand-in for the Groq call, for load tests and benchmarks
+    LLM_STUB = os.getenv("LLM_STUB", "").lower() in ("1", "true", "yes")
+    LLM_STUB_LATENCY_S = float(os.getenv("LLM_STUB_LATENCY_S", "0.05"))
     
     # Chunking Configuration
-    CHUNK_SIZE = 1000
+    CHUNKER = os.getenv("CHUNKER", "structured")  # "structured" (tokens, follows headings) or "recursive" (characters)
+    CHUNK_SIZE = 1000  # Characters, recursive chunker
     CHUNK_OVERLAP = 200
+    CHUNK_TOKENS = 250  # Embedding-model tokens per chunk; all-MiniLM-L6-v2 reads 256 including [CLS]/[SEP]
+    CHUNK_OVERLAP_TOKENS = 40  # Trailing sentences repeated when a section continues in the next chunk
+    CHUNK_MIN_TOKENS = 64  # A heading only closes the running chunk once it has this many tokens
+    CHUNK_TOKENIZE_BATCH = 64  # Blocks tokenized per tokenizer call
     
     # Vector Store Configuration
-    VECTOR_DB_PATH = "./chroma_db"
+    VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "./chroma_db")
     COLLECTION_NAME = "documents"
+    MAX_OPEN_TENANTS = 64  # Tenant stores kept loaded per process; idle least recently used ones are dropped
+    # HNSW graph settings of new collections (Chroma's defaults); rebuild_index applies changes to existing ones
+    HNSW_M = int(os.getenv("HNSW_M", "16"))  # Links per node: more means better recall, more memory
+    HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))  # Build-time candidate list
+    HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", "10"))  # Query-time candidate list, at least k
+    HNSW_REBUILD_TOMBSTONE_RATIO = 0.2  # Deleted share of the index at which a rebuild is recommended
+    HNSW_RETIRE_DELAY_S = 30.0  # Queries still on the old collection get this long after a rebuild swap
+    MANIFEST_FILE = "manifest.sqlite3"  # Per-file chunk manifest, inside VECTOR_DB_PATH
+    # Compact vector tier: quantized, memory-mapped copies of the embeddings searched instead of HNSW
+    VECTOR_TIER = os.getenv("VECTOR_TIER", "off")  # "off", "fp16" or "int8"
+    VECTOR_TIER_DIR = "vector_tier"  # Inside VECTOR_DB_PATH
+    VECTOR_TIER_RESCORE = 4  # Candidates per result re-scored with the float32 vectors
+    VECTOR_TIER_BLOCK_ROWS = 4096  # Rows scored per step of the first pass; small blocks stay in cache
+    VECTOR_TIER_COMPACT_RATIO = 0.2  # Deleted share of the rows at which the files are rewritten
+    
+    # Embedding Cache Configuration
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_FILE = "embedding_cache.sqlite3"  # Inside VECTOR_DB_PATH
+    EMBEDDING_CACHE_MAX_ENTRIES = 100_000  # ~150 MB of 384-d float32 vectors
+    
+    # Retrieval Configuration
+    SEARCH_BATCH_SIZE = 256  # Max queries per encode/query call in similarity_search_batch
+    HYBRID_SEARCH_ENABLED = True  # Fuse BM25 with vector results when answering questions
+    HYBRID_CANDIDATES = 20  # Results taken from each retriever before fusion
+    RRF_K = 60  # Reciprocal rank fusion constant
+    LEXICAL_INDEX_FILE = "lexical_index.npz"  # BM25 index, inside VECTOR_DB_PATH
+    SCOPE_TO_SESSION_DOCUMENTS = True  # UI questions only search the documents uploaded in that session
+    
+    # Re-ranking Configuration
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "").lower() in ("1", "true", "yes")
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")  # Name or local directory
+    RERANK_CANDIDATES = 50  # Retrieved chunks scored by the cross-encoder
+    RERANK_BATCH_SIZE = 16  # (query, chunk) pairs per forward pass
+    RERANK_BUDGET_S = 0.5  # Skip re-ranking when scoring would take longer than this
+    RERANK_CACHE_MAX_ENTRIES = 50_000  # Cached (query, chunk id) scores
+    
+    # Prompt Context Configuration
+    CONTEXT_PACKING_ENABLED = True  # Merge neighbouring chunks and drop repeats before prompting
+    CONTEXT_TOKEN_BUDGET = 3000  # Max prompt tokens of retrieved context
+    CONTEXT_DEDUP_SIMILARITY = 0.9  # Share of a passage's word 3-grams already in a better passage to drop it
+    CONTEXT_MIN_PASSAGE_TOKENS = 64  # Shortest truncated passage worth adding at the end of the budget
+    CONTEXT_CHARS_PER_TOKEN = 4  # For counting prompt tokens without the LLM's tokenizer
+    
+    # Answer Cache Configuration
+    ANSWER_CACHE_ENABLED = True
+    ANSWER_CACHE_SIMILARITY = 0.95  # Min cosine similarity between questions for a hit
+    ANSWER_CACHE_TTL_S = 3600.0
+    ANSWER_CACHE_MAX_ENTRIES = 1000
+    
+    # PDF Extraction Configuration
+    PDF_PARSER = os.getenv("PDF_PARSER", "auto")  # "auto" (fastest installed), "pypdfium2", "pymupdf" or "pypdf2"
+    PDF_PAGE_CACHE_ENABLED = True  # Keep extracted page text by file hash, so re-ingesting skips parsing
+    PDF_PAGE_CACHE_FILE = "page_cache.sqlite3"  # Inside VECTOR_DB_PATH
+    PDF_PAGE_CACHE_MAX_FILES = 2000  # PDFs whose pages are kept
+    PDF_PARALLEL_MIN_PAGES = 32  # Longer PDFs are parsed in page ranges across the extraction pool
+    PDF_MIN_PAGES_PER_TASK = 8  # Smallest page range handed to one worker
+    
+    # Ingestion Pipeline Configuration
+    INGEST_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Extraction processes
+    EMBED_BATCH_SIZE = 64  # Chunks per encode call, filled across files
+    PIPELINE_QUEUE_SIZE = 8  # Files buffered between stages
+    JOB_QUEUE_FILE = "jobs.sqlite3"  # Background ingestion jobs, inside VECTOR_DB_PATH
+    JOB_BATCH_FILES = 32  # Jobs claimed per pipeline run
+    JOB_POLL_INTERVAL_S = 1.0  # How often the job runner and the UI check for progress
+    
+    # Metrics Configuration
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+    METRICS_WINDOW = 1024  # Recent samples per stage kept for p50/p95/p99
+    METRICS_FILE = os.getenv("METRICS_FILE")  # Also write Prometheus text here, if set
+    METRICS_DUMP_INTERVAL_S = 15.0
+    
+    # HTTP Service Configuration
+    SERVER_THREADS = 8  # Threads for blocking model/DB/LLM work
+    SERVER_MAX_CONCURRENCY = 32  # In-flight requests, including streamed answers
+    SERVER_QUEUE_TIMEOUT_S = 10.0  # Wait for a slot before answering 503
+    SERVER_LOCK_FILE = "server.lock"  # Inside VECTOR_DB_PATH; one server process per store
     
     # File Upload Configuration
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
@@ -31,6 +123,6 @@ class Config:
     @classmethod
     def validate_config(cls):
         """Validate that required configuration is present"""
-        if not cls.GROQ_API_KEY:
+        if not cls.GROQ_API_KEY and not cls.LLM_STUB:
             raise ValueError("GROQ_API_KEY environment variable is required")
         return True 
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Packing retrieved chunks into the LLM prompt
+
+Chunks overlap by CHUNK_OVERLAP characters and neighbouring chunks of a file are
+often retrieved together, so joining them as-is repeats text. pack_context:
+
+1. merges chunks of the same file whose chunk_index values are consecutive,
+   removing the overlapping text between them
+2. drops passages whose word shingles are (almost) all contained in a passage
+   ranked higher
+3. adds passages in rank order until CONTEXT_TOKEN_BUDGET is reached,
+   truncating the last one at a sentence or word boundary
+
+and reports how many prompt tokens that saved compared to joining every chunk.
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import Config
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"[.!?]\s")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM tokens in text"""
+    # Llama-style subword vocabularies average about four characters per token in English
+    return math.ceil(len(text) / Config.CONTEXT_CHARS_PER_TOKEN)
+
+
+def _merge_text(first: str, second: str) -> str:
+    """Join two consecutive chunks, writing the text they share only once"""
+    max_overlap = min(len(first), len(second), Config.CHUNK_OVERLAP * 2)
+    probe = second[:min(32, max_overlap)]
+    if probe:
+        position = first.find(probe, len(first) - max_overlap)
+        while position != -1:
+            if second.startswith(first[position:]):
+                return first + second[len(first) - position:]
+            position = first.find(probe, position + 1)
+    return f"{first}\n{second}"
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, at the last sentence end or else the last space"""
+    limit = max_tokens * Config.CONTEXT_CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    ends = [match.end() for match in _SENTENCE_END.finditer(head)]
+    if ends and ends[-1] > limit // 2:
+        return head[:ends[-1]].rstrip()
+    space = head.rfind(" ")
+    return head[:space] if space > limit // 2 else head
+
+
+def pack_context(chunks: List[Dict[str, Any]], token_budget: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Passages to put in the prompt, best first, and how they were packed
+
+    Returns passages (list of str) plus tokens_in (tokens of all chunks joined
+    as before), tokens_out, tokens_saved, merged (chunks folded into a
+    neighbour), duplicates (passages dropped as near-duplicates) and dropped
+    (passages left out or cut to fit the budget).
+    """
+    token_budget = token_budget or Config.CONTEXT_TOKEN_BUDGET
+    tokens_in = count_tokens("\n\n".join(chunk['content'] for chunk in chunks))
+
+    # Group consecutive chunks of a file; a group keeps the rank of its best chunk
+    groups: List[Dict[str, Any]] = []
+    by_position: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    merged = 0
+    for rank, chunk in enumerate(chunks):
+        metadata = chunk.get('metadata') or {}
+        filename, index = metadata.get('filename'), metadata.get('chunk_index')
+        if filename is None or index is None:
+            groups.append({"rank": rank, "parts": {0: chunk['content']}})
+            continue
+        if (filename, index) in by_position:
+            merged += 1
+            continue
+        group = by_position.get((filename, index - 1)) or by_position.get((filename, index + 1))
+        if group is None:
+            group = {"rank": rank, "parts": {}}
+            groups.append(group)
+        else:
+            merged += 1
+        group["parts"][index] = chunk['content']
+        by_position[(filename, index)] = group
+    # A chunk can join two groups it sits between; fold the later one into the earlier
+    for filename, index in list(by_position):
+        group = by_position[(filename, index)]
+        neighbour = by_position.get((filename, index + 1))
+        if neighbour is not None and neighbour is not group:
+            group["parts"].update(neighbour["parts"])
+            group["rank"] = min(group["rank"], neighbour["rank"])
+            for position in neighbour["parts"]:
+                by_position[(filename, position)] = group
+            groups.remove(neighbour)
+            merged += 1
+
+    passages: List[str] = []
+    for group in sorted(groups, key=lambda group: group["rank"]):
+        parts = [group["parts"][index] for index in sorted(group["parts"])]
+        text = parts[0]
+        for part in parts[1:]:
+            text = _merge_text(text, part)
+        passages.append(text)
+
+    # Drop passages mostly repeated in a higher-ranked one
+    kept: List[str] = []
+    kept_shingles: List[Set[Tuple[str, ...]]] = []
+    duplicates = 0
+    for text in passages:
+        shingles = _shingles(text)
+        if shingles and any(
+            len(shingles & other) / len(shingles) >= Config.CONTEXT_DEDUP_SIMILARITY for other in kept_shingles
+        ):
+            duplicates += 1
+            continue
+        kept.append(text)
+        kept_shingles.append(shingles)
+
+    packed: List[str] = []
+    dropped = 0
+    used = 0
+    for text in kept:
+        # Passages are joined with a blank line
+        separator = 1 if packed else 0
+        tokens = count_tokens(text) + separator
+        if used + tokens <= token_budget:
+            packed.append(text)
+            used += tokens
+            continue
+        dropped += 1
+        remaining = token_budget - used - separator
+        if remaining >= Config.CONTEXT_MIN_PASSAGE_TOKENS:
+            packed.append(_truncate(text, remaining))
+            used = token_budget
+
+    tokens_out = count_tokens("\n\n".join(packed))
+    return {
+        "passages": packed,
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "tokens_saved": max(0, tokens_in - tokens_out),
+        "merged": merged,
+        "duplicates": duplicates,
+        "dropped": dropped
+    }
@@ -1,14 +1,28 @@
 import streamlit as st
-import PyPDF2
 import docx
+import bisect
+import mmap
+import os
+import re
+from contextlib import ExitStack, contextmanager
 from io import BytesIO
-from typing import List, Optional
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from chunker import Block, StructuredChunker
 from config import Config
+from metrics import count, enabled as metrics_enabled, span, timed
+from page_cache import get_page_cache
+from pdf_extract import file_hash, get_parser
+
+# A document can be read from a path (memory-mapped), raw bytes or an open binary stream
+DocumentSource = Union[str, os.PathLike, bytes, BinaryIO]
+
+# Numbered ("2.1 Scope") or upper-case lines without a sentence end, taken as headings in PDF text
+_PDF_HEADING = re.compile(r"^(?:(\d+(?:\.\d+)*)\.?\s+[A-Z][^.!?:;]{0,80}|[A-Z][A-Z ,&/-]{3,60})$")
 
 class DocumentProcessor:
     """Handles document processing including text extraction and chunking"""
-    
+
     def __init__(self):
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=Config.CHUNK_SIZE,
@@ -16,45 +30,212 @@ class DocumentProcessor:
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
-    
+        self.chunker = StructuredChunker() if Config.CHUNKER == "structured" else None
+
+    @contextmanager
+    def _open_source(self, source: DocumentSource) -> Iterator[BinaryIO]:
+        """Open a document source as a seekable binary stream without copying it into memory"""
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    yield BytesIO(b"")
+                    return
+                # Pages are paged in by the OS on demand instead of read up front
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield mapped
+        elif isinstance(source, (bytes, bytearray)):
+            yield BytesIO(source)
+        else:
+            source.seek(0)
+            yield source
+
+    def _source_size(self, source: DocumentSource) -> int:
+        if isinstance(source, (str, os.PathLike)):
+            return os.path.getsize(source)
+        if isinstance(source, (bytes, bytearray)):
+            return len(source)
+        try:
+            return source.seek(0, os.SEEK_END)
+        except (AttributeError, OSError):
+            return 0
+
+    def iter_pdf_pages(self, source: DocumentSource) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) for each PDF page, 1-based, one page at a time
+
+        Files seen before, by content hash, are read from the page cache
+        instead of being parsed again; others are written to it page by page.
+        """
+        path = os.fspath(source) if isinstance(source, (str, os.PathLike)) else None
+        parser = get_parser()
+        cache = get_page_cache()
+        with self._open_source(source) as stream:
+            digest = file_hash(stream) if cache is not None else None
+            pages = cache.get(digest, parser.name) if cache is not None else None
+            if pages is not None:
+                cached = 0
+                for cached, text in enumerate(pages, start=1):
+                    yield cached, text
+                count("pdf_pages_cached", cached)
+                return
+            parsed = 0
+            with ExitStack() as stack:
+                add_page = None
+                if cache is not None:
+                    cache.begin(digest, parser.name)
+                    add_page = stack.enter_context(cache.page_writer(digest, parser.name))
+                document = stack.enter_context(parser.document(stream, path))
+                for index in range(parser.page_count(document)):
+                    with span("pdf_parse"):
+                        text = parser.page_text(document, index)
+                    if add_page is not None:
+                        add_page(text)
+                    parsed += 1
+                    yield index + 1, text
+        count("pdf_pages_parsed", parsed)
+        if cache is not None:
+            cache.complete(digest, parser.name, parsed)
+
+    def pdf_page_ranges(self, path: str, workers: int) -> Optional[Tuple[str, List[Tuple[int, int]]]]:
+        """
+        Split an uncached PDF into (start, end) page ranges for parallel parsing
+
+        Returns the file hash and ranges of 0-based page indexes, or None when
+        the file is cached, too short to be worth splitting or the cache is off.
+        The workers write the ranges to a new cache entry with
+        extract_pdf_page_range; complete_pdf_pages then marks it complete.
+        """
+        cache = get_page_cache()
+        if cache is None:
+            return None
+        parser = get_parser()
+        with self._open_source(path) as stream:
+            digest = file_hash(stream)
+            if cache.contains(digest, parser.name):
+                return None
+            with parser.document(stream, path) as document:
+                pages = parser.page_count(document)
+        if pages < Config.PDF_PARALLEL_MIN_PAGES:
+            return None
+        cache.begin(digest, parser.name)
+        size = max(Config.PDF_MIN_PAGES_PER_TASK, -(-pages // workers))
+        return digest, [(start, min(start + size, pages)) for start in range(0, pages, size)]
+
+    def extract_pdf_page_range(self, path: str, digest: str, start: int, end: int) -> int:
+        """Parse the pages [start, end) of a PDF, 0-based, into its page cache entry; returns how many"""
+        parser = get_parser()
+        parsed = 0
+        with self._open_source(path) as stream, parser.document(stream, path) as document, \
+                get_page_cache().page_writer(digest, parser.name, start) as add_page:
+            for index in range(start, min(end, parser.page_count(document))):
+                with span("pdf_parse"):
+                    add_page(parser.page_text(document, index))
+                parsed += 1
+        count("pdf_pages_parsed", parsed)
+        return parsed
+
+    def complete_pdf_pages(self, digest: str, pages: int) -> bool:
+        """Mark a PDF's cache entry written in page ranges complete, so iter_pdf_pages finds it"""
+        cache = get_page_cache()
+        return cache is not None and cache.complete(digest, get_parser().name, pages)
+
+    def iter_docx_paragraphs(self, source: DocumentSource) -> Iterator[Tuple[Optional[int], str]]:
+        """Yield (None, text) for each DOCX paragraph; Word files carry no page numbers"""
+        with self._open_source(source) as stream:
+            doc = docx.Document(stream)
+            for paragraph in doc.paragraphs:
+                yield None, paragraph.text
+
+    def iter_pdf_blocks(self, source: DocumentSource) -> Iterator[Block]:
+        """Yield the paragraphs and headings of each PDF page; paragraphs end at blank lines"""
+        for page_number, text in self.iter_pdf_pages(source):
+            paragraph: List[str] = []
+            for line in text.splitlines():
+                stripped = line.strip()
+                heading = _PDF_HEADING.match(stripped)
+                if (not stripped or heading) and paragraph:
+                    yield Block(page_number, "\n".join(paragraph))
+                    paragraph = []
+                if heading:
+                    numbering = heading.group(1)
+                    yield Block(page_number, stripped, numbering.count(".") + 1 if numbering else 1)
+                elif stripped:
+                    paragraph.append(line)
+            if paragraph:
+                yield Block(page_number, "\n".join(paragraph))
+
+    def iter_docx_blocks(self, source: DocumentSource) -> Iterator[Block]:
+        """Yield DOCX paragraphs, with the level of Heading/Title styles, and tables in document order"""
+        with self._open_source(source) as stream:
+            doc = docx.Document(stream)
+            # python-docx >= 1.0 interleaves tables with paragraphs; older versions only list paragraphs
+            items = doc.iter_inner_content() if hasattr(doc, "iter_inner_content") else doc.paragraphs
+            for item in items:
+                if hasattr(item, "rows"):
+                    rows = []
+                    for row in item.rows:
+                        cells: List[str] = []
+                        for cell in row.cells:
+                            # Merged cells are returned once per grid column they cover
+                            if not cells or cell.text != cells[-1]:
+                                cells.append(cell.text.strip())
+                        rows.append(" | ".join(cells))
+                    yield Block(None, "\n".join(rows))
+                    continue
+                style = item.style.name if item.style is not None else ""
+                level = 0
+                if style == "Title":
+                    level = 1
+                elif style.startswith("Heading"):
+                    digits = style[len("Heading"):].strip()
+                    level = int(digits) if digits.isdigit() else 1
+                yield Block(None, item.text, level)
+
+    def iter_blocks(self, source: DocumentSource, filename: str) -> Iterator[Block]:
+        """Yield the structural blocks of a document based on the filename's extension"""
+        file_extension = filename.lower().split('.')[-1]
+        if file_extension == 'pdf':
+            return self.iter_pdf_blocks(source)
+        elif file_extension in ['docx', 'doc']:
+            return self.iter_docx_blocks(source)
+        raise ValueError(f"Unsupported file type: {file_extension}")
+
+    def iter_pages(self, source: DocumentSource, filename: str) -> Iterator[Tuple[Optional[int], str]]:
+        """Yield (page_number, text) blocks of a document based on the filename's extension"""
+        file_extension = filename.lower().split('.')[-1]
+        if file_extension == 'pdf':
+            return self.iter_pdf_pages(source)
+        elif file_extension in ['docx', 'doc']:
+            return self.iter_docx_paragraphs(source)
+        raise ValueError(f"Unsupported file type: {file_extension}")
+
     def extract_text_from_pdf(self, file_bytes: bytes) -> str:
         """Extract text from PDF file"""
         try:
-            pdf_file = BytesIO(file_bytes)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            return text.strip()
+            return "\n".join(text for _, text in self.iter_pdf_pages(file_bytes)).strip()
         except Exception as e:
             st.error(f"Error extracting text from PDF: {str(e)}")
             return ""
-    
+
     def extract_text_from_docx(self, file_bytes: bytes) -> str:
         """Extract text from DOCX file"""
         try:
-            docx_file = BytesIO(file_bytes)
-            doc = docx.Document(docx_file)
-            
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            return text.strip()
+            return "\n".join(text for _, text in self.iter_docx_paragraphs(file_bytes)).strip()
         except Exception as e:
             st.error(f"Error extracting text from DOCX: {str(e)}")
             return ""
-    
+
     def extract_text(self, uploaded_file) -> Optional[str]:
         """Extract text from uploaded file based on file type"""
         if uploaded_file is None:
             return None
-        
-        file_extension = uploaded_file.name.lower().split('.')[-1]
-        file_bytes = uploaded_file.read()
-        
+
+        return self.extract_text_from_bytes(uploaded_file.read(), uploaded_file.name)
+
+    def extract_text_from_bytes(self, file_bytes: bytes, filename: str) -> Optional[str]:
+        """Extract text from raw file contents based on the filename's extension"""
+        file_extension = filename.lower().split('.')[-1]
+
         if file_extension == 'pdf':
             return self.extract_text_from_pdf(file_bytes)
         elif file_extension in ['docx', 'doc']:
@@ -62,28 +243,104 @@ class DocumentProcessor:
         else:
             st.error(f"Unsupported file type: {file_extension}")
             return None
-    
+
     def chunk_text(self, text: str) -> List[str]:
         """Split text into chunks for vector embedding"""
         if not text:
             return []
-        
-        chunks = self.text_splitter.split_text(text)
+
+        with span("chunk"):
+            chunks = self.text_splitter.split_text(text)
         return chunks
-    
+
+    def iter_chunks(self, pages: Iterable[Tuple[Optional[int], str]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Chunk a stream of (page_number, text) blocks, yielding (chunk, metadata) as pages arrive
+
+        Only a few chunks' worth of text is buffered at a time. The last, possibly
+        incomplete, chunk of each split is carried into the next one, so overlap and
+        chunk boundaries match splitting the whole text at once.
+        """
+        flush_size = Config.CHUNK_SIZE * 4
+        buffer = ""
+        # (offset in buffer, page number) of every page that starts in the buffer
+        page_starts: List[Tuple[int, Optional[int]]] = []
+
+        def located(chunks: List[str]) -> List[Tuple[str, int]]:
+            positions = []
+            cursor = 0
+            for chunk in chunks:
+                start = buffer.find(chunk, cursor)
+                if start < 0:
+                    start = cursor
+                positions.append((chunk, start))
+                cursor = start + 1
+            return positions
+
+        def metadata_for(start: int, end: int) -> Dict[str, Any]:
+            offsets = [offset for offset, _ in page_starts]
+            first = page_starts[max(0, bisect.bisect_right(offsets, start) - 1)][1]
+            last = page_starts[max(0, bisect.bisect_right(offsets, max(start, end - 1)) - 1)][1]
+            if first is None:
+                return {}
+            return {"page_start": int(first), "page_end": int(last)}
+
+        for page_number, text in pages:
+            if not text:
+                continue
+            page_starts.append((len(buffer), page_number))
+            buffer += text + "\n"
+            if len(buffer) < flush_size:
+                continue
+
+            chunks = located(self.chunk_text(buffer))
+            if len(chunks) < 2:
+                continue
+            for chunk, start in chunks[:-1]:
+                yield chunk, metadata_for(start, start + len(chunk))
+
+            # Keep the trailing chunk and the pages it spans for the next split
+            carry = chunks[-1][1]
+            offsets = [offset for offset, _ in page_starts]
+            first_kept = max(0, bisect.bisect_right(offsets, carry) - 1)
+            page_starts = [(max(0, offset - carry), page) for offset, page in page_starts[first_kept:]]
+            buffer = buffer[carry:]
+
+        if buffer.strip():
+            for chunk, start in located(self.chunk_text(buffer)):
+                yield chunk, metadata_for(start, start + len(chunk))
+
+    def iter_document_chunks(self, source: DocumentSource, filename: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Stream (chunk, metadata) pairs from a document with bounded memory"""
+        if self.chunker is not None:
+            return self.chunker.iter_chunks(self.iter_blocks(source, filename))
+        return self.iter_chunks(self.iter_pages(source, filename))
+
+    @timed("process_document")
+    def process_file(self, source: DocumentSource, filename: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Chunks of a document and their page metadata, raising on unreadable files"""
+        chunks: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        for chunk, metadata in self.iter_document_chunks(source, filename):
+            chunks.append(chunk)
+            metadatas.append(metadata)
+        if metrics_enabled():
+            count("files_processed")
+            count("bytes_processed", self._source_size(source))
+            count("chunks_created", len(chunks))
+        return chunks, metadatas
+
     def process_document(self, uploaded_file) -> List[str]:
         """Complete document processing pipeline"""
-        # Extract text
-        text = self.extract_text(uploaded_file)
-        if not text:
+        if uploaded_file is None:
+            return []
+        return self.process_bytes(uploaded_file, uploaded_file.name)
+
+    def process_bytes(self, file_bytes: DocumentSource, filename: str) -> List[str]:
+        """Processing pipeline for raw file contents, usable outside the UI thread"""
+        try:
+            chunks, _ = self.process_file(file_bytes, filename)
+            return chunks
+        except Exception as e:
+            st.error(f"Error processing {filename}: {str(e)}")
             return []
-        
-        # Chunk text
-        chunks = self.chunk_text(text)
-        
-        # Add metadata about the source file
-        processed_chunks = []
-        for i, chunk in enumerate(chunks):
-            processed_chunks.append(chunk)
-        
-        return processed_chunks 
\ No newline at end of file
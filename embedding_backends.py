@@ -0,0 +1,212 @@
+"""
+Inference backends behind EmbeddingEngine.encode
+
+* torch - SentenceTransformer on PyTorch (the default)
+* onnx  - the same transformer exported to ONNX and run with ONNX Runtime on
+          CPU, optionally with int8 dynamically quantized weights
+
+Both load from a local model directory (Config.EMBEDDING_MODEL_PATH) so they
+work offline. Prepare one with:
+
+    python embedding_backends.py export --model all-MiniLM-L6-v2 --output ./models/all-MiniLM-L6-v2 --quantize
+"""
+
+import argparse
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+
+
+class EmbeddingBackend(ABC):
+    """Turns a list of texts into a float32 matrix, one row per text"""
+
+    name = "base"
+    max_seq_length = 512
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        ...
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Tokens per text after truncation, used to batch texts of similar length together"""
+        # About four characters per token for English subword vocabularies
+        return [min(self.max_seq_length, len(text) // 4 + 2) for text in texts]
+
+
+def _tokenized_lengths(tokenizer: Any, texts: List[str], max_length: int) -> List[int]:
+    return [len(ids) for ids in tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]]
+
+
+class TorchBackend(EmbeddingBackend):
+    """SentenceTransformer on PyTorch"""
+
+    name = "torch"
+
+    def __init__(self, model_name_or_path: str, threads: int = 0):
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name_or_path)
+        self.max_seq_length = getattr(self.model, "max_seq_length", None) or self.max_seq_length
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        kwargs["convert_to_tensor"] = False
+        return np.asarray(self.model.encode(texts, batch_size=batch_size, **kwargs), dtype=np.float32)
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return super().token_lengths(texts)
+        return _tokenized_lengths(tokenizer, texts, self.max_seq_length)
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Transformer exported to ONNX, run with ONNX Runtime
+
+    Pooling, normalization and max sequence length are read from the
+    sentence-transformers files in the model directory, so the vectors match
+    TorchBackend up to numerical (or, with int8 weights, quantization) error.
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = False, threads: int = 0):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError("The onnx embedding backend needs `pip install onnxruntime transformers`") from e
+
+        model_file = os.path.join(model_dir, ONNX_INT8_FILE if quantize else ONNX_FILE)
+        if quantize and not os.path.exists(model_file):
+            quantize_onnx(os.path.join(model_dir, ONNX_FILE), model_file)
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(
+                f"{model_file} not found; create it with `python embedding_backends.py export --output {model_dir}`"
+            )
+        self.name = "onnx-int8" if quantize else "onnx"
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # One batch at a time is parallelized inside each operator
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+
+        pooling = _read_json(os.path.join(model_dir, "1_Pooling", "config.json"))
+        self.cls_pooling = bool(pooling.get("pooling_mode_cls_token"))
+        modules = _read_json(os.path.join(model_dir, "modules.json"))
+        self.normalize = any(module.get("type", "").endswith("Normalize") for module in modules or [])
+        self.max_seq_length = _read_json(os.path.join(model_dir, "sentence_bert_config.json")).get("max_seq_length", 256)
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        return _tokenized_lengths(self.tokenizer, texts, self.max_seq_length)
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feed = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+            hidden = self.session.run(None, feed)[0]
+            if self.cls_pooling:
+                pooled = hidden[:, 0]
+            else:
+                mask = tokens["attention_mask"][..., None].astype(np.float32)
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(batches)
+
+
+def create_backend(backend: Optional[str] = None, model: Optional[str] = None,
+                   quantize: Optional[bool] = None, threads: Optional[int] = None) -> EmbeddingBackend:
+    """Build the configured backend; arguments override the Config defaults"""
+    backend = backend or Config.EMBEDDING_BACKEND
+    model = model or Config.EMBEDDING_MODEL_PATH or Config.EMBEDDING_MODEL
+    quantize = Config.EMBEDDING_QUANTIZE if quantize is None else quantize
+    threads = Config.EMBEDDING_THREADS if threads is None else threads
+    if backend == "torch":
+        return TorchBackend(model, threads=threads)
+    if backend == "onnx":
+        if not os.path.isdir(model):
+            raise ValueError("The onnx embedding backend needs EMBEDDING_MODEL_PATH set to a local model directory")
+        return OnnxBackend(model, quantize=quantize, threads=threads)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def quantize_onnx(source: str, target: str) -> None:
+    """Write an int8 copy of an ONNX model with dynamically quantized weights"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+
+
+def export_model(model_name: str, output_dir: str, quantize: bool = False) -> None:
+    """Save a sentence-transformers model to a local directory and export its transformer to ONNX"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    model.save(output_dir)
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, ONNX_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    if quantize:
+        quantize_onnx(os.path.join(output_dir, ONNX_FILE), os.path.join(output_dir, ONNX_INT8_FILE))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prepare local embedding model files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Save a model locally and export it to ONNX")
+    export.add_argument("--model", default=Config.EMBEDDING_MODEL)
+    export.add_argument("--output", required=True)
+    export.add_argument("--quantize", action="store_true", help="Also write an int8 model")
+    args = parser.parse_args()
+
+    export_model(args.model, args.output, quantize=args.quantize)
+    print(f"Exported {args.model} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
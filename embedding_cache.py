@@ -0,0 +1,103 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Persistent LRU cache of embeddings keyed by model name and text hash"""
+
+    # SQLite caps the number of bound parameters per statement
+    _BATCH_SIZE = 500
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_by_last_used ON embeddings (last_used)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _key(self, model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for texts, None where the text has not been embedded before"""
+        keys = [self._key(model_name, text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        with closing(self._connect()) as conn, conn:
+            for start in range(0, len(keys), self._BATCH_SIZE):
+                batch = keys[start:start + self._BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+
+        vectors = [found.get(key) for key in keys]
+        hits = sum(vector is not None for vector in vectors)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model_name: str, texts: List[str], vectors: np.ndarray) -> None:
+        """Store vectors for texts, evicting least recently used entries over the cap"""
+        now = time.time()
+        rows = [
+            (self._key(model_name, text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+                with self._lock:
+                    self.evictions += overflow
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for this process and the number of cached vectors"""
+        with closing(self._connect()) as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,124 @@
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from embedding_backends import EmbeddingBackend, create_backend
+from embedding_cache import EmbeddingCache
+from metrics import count, span
+
+
+class EmbeddingEngine:
+    """Thread-safe wrapper around an embedding backend shared by all sessions"""
+
+    # encode() options that do not change the vectors, so cached ones stay valid
+    _CACHE_SAFE_KWARGS = {"convert_to_tensor", "batch_size", "show_progress_bar"}
+
+    def __init__(self, model_name: Optional[str] = None, cache: Optional[EmbeddingCache] = None,
+                 backend: Optional[EmbeddingBackend] = None, token_budget: Optional[int] = None):
+        self.model_name = model_name or Config.EMBEDDING_MODEL
+        self.backend = backend or create_backend(model=model_name)
+        self.cache = cache
+        self.token_budget = token_budget or Config.EMBED_TOKEN_BUDGET
+        # Quantized or exported models give slightly different vectors, so each
+        # backend other than the original PyTorch one gets its own cache entries
+        self.cache_namespace = self.model_name
+        if self.backend.name != "torch":
+            self.cache_namespace = f"{self.model_name}@{self.backend.name}"
+        # A single model instance is not safe to drive from several threads at once
+        self._lock = threading.Lock()
+
+    def _encode_uncached(self, texts: List[str], **kwargs) -> np.ndarray:
+        with self._lock, span("encode"):
+            embeddings = self.backend.encode(texts, **kwargs)
+        count("texts_encoded", len(texts))
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def warm_up(self) -> None:
+        """Run one forward pass so the first real query does not pay for lazy initialization"""
+        self._encode_uncached(["warm-up"])
+
+    def _schedule(self, lengths: List[int]) -> List[List[int]]:
+        """Group indices into batches of similar length whose padded size fits the token budget"""
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        batches: List[List[int]] = []
+        batch: List[int] = []
+        for i in order:
+            # Lengths ascend, so the newest text sets the batch's padded length
+            if batch and (len(batch) + 1) * max(lengths[i], 1) > self.token_budget:
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def iter_encode(self, texts: List[str], **kwargs) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """
+        Encode texts batch by batch, yielding (indices into texts, vectors) as each batch completes
+
+        Cached vectors come first, as one batch. The rest are sorted by token length
+        and split into batches of at most token_budget padded tokens, so short
+        chunks are not padded to the longest one and memory stays bounded no
+        matter how many texts are passed. Each distinct text is encoded once.
+        """
+        kwargs.pop("batch_size", None)
+        missing = range(len(texts))
+        if self.cache is not None and texts:
+            cached = self.cache.get_many(self.cache_namespace, texts)
+            hits = [i for i, vector in enumerate(cached) if vector is not None]
+            if hits:
+                yield hits, np.vstack([cached[i] for i in hits]).astype(np.float32, copy=False)
+            missing = [i for i, vector in enumerate(cached) if vector is None]
+
+        positions: Dict[str, List[int]] = {}
+        for i in missing:
+            positions.setdefault(texts[i], []).append(i)
+        distinct = list(positions)
+        if not distinct:
+            return
+        # Fast tokenizers are not safe to call from several threads at once either
+        with self._lock:
+            lengths = self.backend.token_lengths(distinct)
+        for batch in self._schedule(lengths):
+            batch_texts = [distinct[j] for j in batch]
+            vectors = self._encode_uncached(batch_texts, batch_size=len(batch_texts), **kwargs)
+            if self.cache is not None:
+                self.cache.put_many(self.cache_namespace, batch_texts, vectors)
+            rows = [row for row, text in enumerate(batch_texts) for _ in positions[text]]
+            yield [i for text in batch_texts for i in positions[text]], vectors[rows]
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        """Encode texts into a float32 matrix, one row per text in input order"""
+        if not texts or set(kwargs) - self._CACHE_SAFE_KWARGS:
+            return self._encode_uncached(texts, **kwargs)
+
+        embeddings: Optional[np.ndarray] = None
+        for indices, vectors in self.iter_encode(texts, **kwargs):
+            if embeddings is None:
+                embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            embeddings[indices] = vectors
+        return embeddings
+
+
+_engine: Optional[EmbeddingEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_embedding_engine() -> EmbeddingEngine:
+    """Return the process-wide embedding engine, loading the model on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                cache = None
+                if Config.EMBEDDING_CACHE_ENABLED:
+                    os.makedirs(Config.VECTOR_DB_PATH, exist_ok=True)
+                    cache = EmbeddingCache(
+                        os.path.join(Config.VECTOR_DB_PATH, Config.EMBEDDING_CACHE_FILE),
+                        Config.EMBEDDING_CACHE_MAX_ENTRIES,
+                    )
+                _engine = EmbeddingEngine(cache=cache)
+    return _engine
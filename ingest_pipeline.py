@@ -0,0 +1,339 @@
+"""
+Pipelined multi-file ingestion
+
+Three overlapping stages connected by bounded queues:
+
+1. extract  - a process pool parses and chunks files; long PDFs are split
+               into page ranges parsed by several workers at once
+2. embed    - one thread fills encode batches across file boundaries
+3. write    - one thread commits each finished file to the collection
+
+While the writer stores file N the embedder encodes file N+1 and the pool is
+already parsing the files after that, so a large upload is bound by its slowest
+stage rather than the sum of all three.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from config import Config
+from metrics import drain as drain_metrics, merge as merge_metrics
+
+_DONE = object()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Per process; built on first use, in workers and in the parent when splitting PDFs
+_worker_processor = None
+
+
+def _get_worker_processor():
+    global _worker_processor
+    if _worker_processor is None:
+        from document_processor import DocumentProcessor
+        _worker_processor = DocumentProcessor()
+    return _worker_processor
+
+
+def _extract_and_chunk(filename: str, source: Union[str, bytes]) -> Tuple[List[str], List[Dict[str, Any]], Any]:
+    """
+    Runs inside a pool worker; returns the chunks of a file, their page metadata
+    and the metrics the worker recorded for them, to be merged in the parent
+    """
+    try:
+        chunks, metadatas = _get_worker_processor().process_file(source, filename)
+    finally:
+        drained = drain_metrics()
+    return chunks, metadatas, drained
+
+
+def _extract_page_range(path: str, digest: str, start: int, end: int) -> Tuple[int, Any]:
+    """
+    Runs inside a pool worker; writes the text of pages [start, end) of a PDF to
+    the page cache and returns how many pages that was and the worker's metrics
+    """
+    try:
+        parsed = _get_worker_processor().extract_pdf_page_range(path, digest, start, end)
+    finally:
+        drained = drain_metrics()
+    return parsed, drained
+
+
+def submit_extraction(pool: ProcessPoolExecutor, filename: str, source: Union[str, bytes]) -> Future:
+    """
+    Submit a file to the extraction pool; the future resolves like _extract_and_chunk
+
+    A long PDF given by path is first split into page ranges parsed by several
+    workers at once, each writing its pages to the page cache. A helper thread
+    waits for them, then submits the file itself, whose pages are then read
+    from the cache.
+    """
+    if not (isinstance(source, str) and filename.lower().endswith(".pdf") and Config.INGEST_WORKERS > 1):
+        return pool.submit(_extract_and_chunk, filename, source)
+    result: Future = Future()
+
+    def split_and_extract() -> None:
+        try:
+            processor = _get_worker_processor()
+            plan = processor.pdf_page_ranges(source, Config.INGEST_WORKERS)
+            if plan is not None:
+                digest, ranges = plan
+                parts = [pool.submit(_extract_page_range, source, digest, start, end) for start, end in ranges]
+                pages = 0
+                for part in parts:
+                    parsed, drained = part.result()
+                    merge_metrics(drained)
+                    pages += parsed
+                processor.complete_pdf_pages(digest, pages)
+            result.set_result(pool.submit(_extract_and_chunk, filename, source).result())
+        except Exception as e:
+            result.set_exception(e)
+
+    threading.Thread(target=split_and_extract, name=f"docexpy-pdf-{filename}", daemon=True).start()
+    return result
+
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """Process-wide extraction pool, started on first use and reused across uploads"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that already runs torch threads can deadlock
+                _pool = ProcessPoolExecutor(
+                    max_workers=Config.INGEST_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def _discard_broken_pool(error: Exception) -> None:
+    """Drop the shared pool after a worker crash so the next upload starts a fresh one"""
+    global _pool
+    if isinstance(error, BrokenProcessPool):
+        with _pool_lock:
+            _pool = None
+
+
+class IngestPipeline:
+    """Overlapped extract / embed / write ingestion of many files into a VectorStoreManager"""
+
+    STAGES = ("extract", "embed", "write")
+
+    def __init__(self, vector_store, batch_size: Optional[int] = None, queue_size: Optional[int] = None,
+                 on_file: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        on_file, if given, is called from the stage threads with a filename and
+        {"state": "embedding", "done", "total"} as its chunks are encoded, then
+        {"state": "indexed", "stats"} or {"state": "failed", "error"}
+        """
+        self.vector_store = vector_store
+        self.batch_size = batch_size or Config.EMBED_BATCH_SIZE
+        self.queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+        self.on_file = on_file
+        self._progress_lock = threading.Lock()
+
+    def _advance(self, stage: str, files: int = 0, chunks: int = 0) -> None:
+        with self._progress_lock:
+            self._progress[stage]["files"] += files
+            self._progress[stage]["chunks"] += chunks
+
+    def _fail(self, filename: str, error: Exception) -> None:
+        with self._progress_lock:
+            self._results[filename] = {"error": str(error)}
+            self._failed += 1
+        self._notify(filename, state="failed", error=str(error))
+
+    def _notify(self, filename: str, **event: Any) -> None:
+        if self.on_file is None:
+            return
+        try:
+            self.on_file(filename, event)
+        except Exception:
+            # Reporting progress must never stall a stage and with it the whole run
+            pass
+
+    def _extract_stage(self, files: List[Tuple[str, Union[str, bytes]]], chunk_queue: "queue.Queue") -> None:
+        pool = get_extract_pool()
+        # Bound the number of files being parsed at once; finished ones wait in chunk_queue
+        max_in_flight = Config.INGEST_WORKERS * 2
+        in_flight: Dict[Future, str] = {}
+        remaining = iter(files)
+        exhausted = False
+        try:
+            while in_flight or not exhausted:
+                while not exhausted and len(in_flight) < max_in_flight:
+                    item = next(remaining, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    filename, source = item
+                    in_flight[submit_extraction(pool, filename, source)] = filename
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    filename = in_flight.pop(future)
+                    try:
+                        chunks, metadatas, drained = future.result()
+                    except Exception as e:
+                        _discard_broken_pool(e)
+                        self._fail(filename, e)
+                        continue
+                    merge_metrics(drained)
+                    self._advance("extract", files=1, chunks=len(chunks))
+                    # Blocks while the embedder is behind, which throttles submission
+                    chunk_queue.put((filename, chunks, metadatas))
+        except Exception as e:
+            # e.g. a crashed worker breaks the pool; fail what never came back
+            _discard_broken_pool(e)
+            for filename in in_flight.values():
+                self._fail(filename, e)
+            for filename, _ in remaining:
+                self._fail(filename, e)
+        finally:
+            chunk_queue.put(_DONE)
+
+    def _embed_stage(self, chunk_queue: "queue.Queue", write_queue: "queue.Queue") -> None:
+        # Files whose vectors are still being filled in, keyed by arrival order
+        pending: Dict[int, Dict[str, Any]] = {}
+        batch: List[Tuple[int, int, str]] = []  # (file key, row, text)
+        next_key = 0
+
+        def flush() -> None:
+            if not batch:
+                return
+            try:
+                vectors = self.vector_store.embedding_model.encode([text for _, _, text in batch])
+            except Exception as e:
+                for key in {key for key, _, _ in batch}:
+                    entry = pending.pop(key, None)
+                    if entry is not None:
+                        self._fail(entry["plan"]["filename"], e)
+                batch.clear()
+                return
+            for (key, row, _), vector in zip(batch, vectors):
+                entry = pending.get(key)
+                if entry is None:
+                    continue
+                entry["vectors"][row] = vector
+                entry["remaining"] -= 1
+            for key in {key for key, _, _ in batch}:
+                entry = pending.get(key)
+                if entry is None:
+                    continue
+                total = len(entry["vectors"])
+                self._notify(entry["plan"]["filename"], state="embedding", done=total - entry["remaining"], total=total)
+                if entry["remaining"] == 0:
+                    del pending[key]
+                    self._advance("embed", files=1)
+                    write_queue.put((entry["plan"], np.vstack(entry["vectors"])))
+            self._advance("embed", chunks=len(batch))
+            batch.clear()
+
+        while True:
+            try:
+                item = chunk_queue.get(timeout=0 if batch else None)
+            except queue.Empty:
+                # Nothing else ready: encode the partial batch instead of idling
+                flush()
+                continue
+            if item is _DONE:
+                break
+            filename, chunks, metadatas = item
+            if not chunks:
+                # Never let an unreadable upload replace a previously indexed version
+                self._fail(filename, ValueError("no text could be extracted"))
+                continue
+            try:
+                plan = self.vector_store._plan_ingest(chunks, filename, metadatas)
+            except Exception as e:
+                self._fail(filename, e)
+                continue
+            texts = plan["encode_texts"]
+            self._notify(filename, state="embedding", done=0, total=len(texts))
+            if not texts:
+                self._advance("embed", files=1)
+                write_queue.put((plan, np.zeros((0, 0), dtype=np.float32)))
+                continue
+            key, next_key = next_key, next_key + 1
+            pending[key] = {
+                "plan": plan,
+                "vectors": [None] * len(texts),
+                "remaining": len(texts)
+            }
+            for row, text in enumerate(texts):
+                batch.append((key, row, text))
+                if len(batch) >= self.batch_size:
+                    flush()
+        flush()
+        write_queue.put(_DONE)
+
+    def _write_stage(self, write_queue: "queue.Queue") -> None:
+        while True:
+            item = write_queue.get()
+            if item is _DONE:
+                # Persist the side indexes once per run rather than once per file
+                with self.vector_store._write_lock:
+                    self.vector_store._save_indexes()
+                return
+            plan, embeddings = item
+            try:
+                with self.vector_store._write_lock:
+                    stats = self.vector_store._commit_ingest(plan, embeddings)
+                with self._progress_lock:
+                    self._results[plan["filename"]] = stats
+                self._advance("write", files=1, chunks=len(plan["chunks"]))
+            except Exception as e:
+                self._fail(plan["filename"], e)
+                continue
+            self._notify(plan["filename"], state="indexed", stats=stats)
+
+    def run(self, files: List[Tuple[str, Union[str, bytes]]], poll_interval: float = 0.2) -> Iterator[Dict[str, Any]]:
+        """
+        Ingest (filename, source) pairs, yielding progress snapshots from the calling thread
+
+        A source is a file path or raw bytes. Paths are cheaper: workers memory-map
+        them instead of receiving a pickled copy of the whole file.
+
+        Each snapshot maps stage name to {"files", "chunks", "total_files"} and also has
+        "failed" and "elapsed_s"; the final one carries "results", per-file ingest stats
+        or {"error": ...}.
+        """
+        self._progress = {stage: {"files": 0, "chunks": 0} for stage in self.STAGES}
+        self._failed = 0
+        self._results: Dict[str, Dict[str, Any]] = {}
+        chunk_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        write_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._extract_stage, args=(files, chunk_queue), daemon=True),
+            threading.Thread(target=self._embed_stage, args=(chunk_queue, write_queue), daemon=True),
+            threading.Thread(target=self._write_stage, args=(write_queue,), daemon=True),
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            threads[-1].join(poll_interval)
+            yield self._snapshot(len(files), started)
+        snapshot = self._snapshot(len(files), started)
+        snapshot["results"] = dict(self._results)
+        yield snapshot
+
+    def _snapshot(self, total_files: int, started: float) -> Dict[str, Any]:
+        with self._progress_lock:
+            snapshot: Dict[str, Any] = {
+                stage: dict(counts, total_files=total_files) for stage, counts in self._progress.items()
+            }
+            snapshot["failed"] = self._failed
+        snapshot["elapsed_s"] = time.perf_counter() - started
+        return snapshot
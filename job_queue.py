@@ -0,0 +1,242 @@
+"""
+Persistent background ingestion jobs
+
+Uploads are copied into VECTOR_DB_PATH/jobs and recorded in a SQLite table, so
+they survive a closed tab or a restarted process. A JobRunner thread in the
+process that owns the vector store works through them:
+
+    queued -> extracting -> embedding -> indexed   (or failed)
+
+The runner claims jobs in batches and feeds each batch through IngestPipeline,
+so extraction, embedding and writing overlap across files and encode batches
+are filled across file boundaries, as for uploads to the HTTP API. Each encoded
+batch goes to the embedding cache as it completes and its progress is recorded
+on the job. A job interrupted by a crash or restart is queued again when the
+next runner starts; re-planning it reuses the chunks already indexed and the
+vectors already in the embedding cache, and only encodes the rest.
+
+ChromaDB's local store has a single writer, so there is one runner per store
+and the worker processes never touch it.
+"""
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+from config import Config
+
+ACTIVE_STATES = ("queued", "extracting", "embedding")
+
+
+class JobQueue:
+    """SQLite-backed queue of files waiting to be ingested, with per-file state and progress"""
+
+    def __init__(self, path: str, spool_dir: str):
+        self.path = path
+        self.spool_dir = spool_dir
+        os.makedirs(spool_dir, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    filename TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    chunks_done INTEGER NOT NULL DEFAULT 0,
+                    chunks_total INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    owner_pid INTEGER,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(self, filename: str, source: Union[str, bytes, BinaryIO]) -> int:
+        """Copy a file into the spool directory and queue it, returning the job id"""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            job_id = conn.execute(
+                "INSERT INTO jobs (filename, path, state, created_at, updated_at) VALUES (?, '', 'queued', ?, ?)",
+                (filename, now, now),
+            ).lastrowid
+            path = os.path.join(self.spool_dir, f"{job_id}_{os.path.basename(filename)}")
+            if isinstance(source, (str, os.PathLike)):
+                shutil.copyfile(source, path)
+            elif isinstance(source, bytes):
+                with open(path, "wb") as f:
+                    f.write(source)
+            else:
+                source.seek(0)
+                with open(path, "wb") as f:
+                    shutil.copyfileobj(source, f)
+            conn.execute("UPDATE jobs SET path = ? WHERE id = ?", (path, job_id))
+        return job_id
+
+    def get(self, job_ids: List[int]) -> List[Dict[str, Any]]:
+        """Current state of the given jobs, in id order"""
+        if not job_ids:
+            return []
+        placeholders = ",".join("?" * len(job_ids))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT * FROM jobs WHERE id IN ({placeholders}) ORDER BY id", list(job_ids)).fetchall()
+        return [dict(row) for row in rows]
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def update(self, job_id: int, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Move up to limit queued jobs to extracting for this process, oldest first"""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' AND path != '' ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET state = 'extracting', owner_pid = ?, updated_at = ? WHERE id = ?",
+                [(os.getpid(), time.time(), row["id"]) for row in rows],
+            )
+            conn.commit()
+        return [dict(row) for row in rows]
+
+    def recover(self) -> int:
+        """
+        Queue again every job left extracting or embedding, returning how many
+
+        There is one runner per store and it calls this before it claims
+        anything, so such jobs belong to a runner that stopped mid-way. Their
+        recorded owner_pid is not checked: a restarted process often gets the
+        same PID (PID 1 in a container), and a dead one's PID can be reused.
+        """
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                "UPDATE jobs SET state = 'queued', owner_pid = NULL, updated_at = ? "
+                "WHERE state IN ('extracting', 'embedding')",
+                (time.time(),)
+            ).rowcount
+
+    def finish(self, job: Dict[str, Any], state: str, error: Optional[str] = None) -> None:
+        """Mark a job indexed or failed and delete its spooled copy"""
+        self.update(job["id"], state=state, error=error, owner_pid=None)
+        try:
+            os.remove(job["path"])
+        except OSError:
+            pass
+
+
+class JobRunner:
+    """Works through a JobQueue on a daemon thread, ingesting claimed jobs through the ingest pipeline"""
+
+    def __init__(self, job_queue: JobQueue, vector_store):
+        self.job_queue = job_queue
+        self.vector_store = vector_store
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="docexpy-jobs", daemon=True)
+
+    def start(self) -> None:
+        self.job_queue.recover()
+        self._thread.start()
+
+    def notify(self) -> None:
+        """Wake the runner after new jobs were submitted"""
+        self._wake.set()
+
+    def _run(self) -> None:
+        # Claimed jobs left over from the previous run because of a file name clash
+        carried: List[Dict[str, Any]] = []
+        while True:
+            jobs: List[Dict[str, Any]] = []
+            try:
+                jobs = carried + self.job_queue.claim(Config.JOB_BATCH_FILES - len(carried))
+                if not jobs:
+                    self._wake.wait(Config.JOB_POLL_INTERVAL_S)
+                    self._wake.clear()
+                    continue
+                # The pipeline reports per file name, so a run holds each name once
+                batch: Dict[str, Dict[str, Any]] = {}
+                carried = []
+                for job in jobs:
+                    if job["filename"] in batch:
+                        carried.append(job)
+                    else:
+                        batch[job["filename"]] = job
+                self._index(batch)
+            except Exception as e:
+                # Keep the runner alive; whatever was claimed is failed rather than lost
+                for job in jobs:
+                    if job["state"] in ACTIVE_STATES:
+                        self.job_queue.finish(job, "failed", str(e))
+                carried = []
+                time.sleep(Config.JOB_POLL_INTERVAL_S)
+
+    def _index(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        """Ingest a batch of claimed jobs with distinct file names through the ingest pipeline's stages"""
+        from ingest_pipeline import IngestPipeline
+
+        def on_file(filename: str, event: Dict[str, Any]) -> None:
+            job = batch[filename]
+            if event["state"] == "embedding":
+                self.job_queue.update(job["id"], state="embedding", chunks_done=event["done"], chunks_total=event["total"])
+            else:
+                self.job_queue.finish(job, event["state"], event.get("error"))
+            job["state"] = event["state"]
+
+        pipeline = IngestPipeline(self.vector_store, on_file=on_file)
+        for _ in pipeline.run([(filename, job["path"]) for filename, job in batch.items()]):
+            pass
+        for job in batch.values():
+            if job["state"] in ACTIVE_STATES:
+                self.job_queue.finish(job, "failed", "the ingest pipeline stopped before indexing it")
+
+
+_job_queue: Optional[JobQueue] = None
+_job_runner: Optional[JobRunner] = None
+_job_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_lock:
+            if _job_queue is None:
+                os.makedirs(Config.VECTOR_DB_PATH, exist_ok=True)
+                _job_queue = JobQueue(
+                    os.path.join(Config.VECTOR_DB_PATH, Config.JOB_QUEUE_FILE),
+                    os.path.join(Config.VECTOR_DB_PATH, "jobs")
+                )
+    return _job_queue
+
+
+def start_job_runner() -> JobRunner:
+    """Start the process-wide runner once, resuming any jobs a previous process left behind"""
+    global _job_runner
+    if _job_runner is None:
+        from vector_store import get_vector_store
+        vector_store = get_vector_store()
+        job_queue = get_job_queue()
+        with _job_lock:
+            if _job_runner is None:
+                runner = JobRunner(job_queue, vector_store)
+                runner.start()
+                _job_runner = runner
+    return _job_runner
@@ -0,0 +1,205 @@
+import os
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Identifiers such as "E-42", "3.1.2" or "ABC_123" stay one token; their parts are indexed too
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word and identifier tokens of a text"""
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 inverted index over chunk records, persisted to one compressed file
+
+    Postings are kept per term as two typed arrays, document numbers and term
+    frequencies. Document numbers only grow, so each list stays sorted and is
+    written delta-encoded. Removed records are tombstoned and dropped when the
+    index is compacted, which happens before every save.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._reset()
+        if os.path.exists(path):
+            try:
+                self._load()
+            except Exception:
+                # A corrupt or outdated file is rebuilt from the collection by the caller
+                self._reset()
+
+    def _reset(self) -> None:
+        self._record_ids: List[Optional[str]] = []
+        self._numbers: Dict[str, int] = {}
+        self._lengths = array("I")
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def add(self, records: Iterable[Tuple[str, str]]) -> None:
+        """Index (record_id, text) pairs, replacing records that are already indexed"""
+        with self._lock:
+            for record_id, text in records:
+                self._remove_one(record_id)
+                number = len(self._record_ids)
+                self._record_ids.append(record_id)
+                self._numbers[record_id] = number
+
+                counts: Dict[str, int] = {}
+                tokens = tokenize(text)
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                self._lengths.append(len(tokens))
+                self._total_length += len(tokens)
+                for token, count in counts.items():
+                    postings = self._postings.get(token)
+                    if postings is None:
+                        postings = self._postings[token] = (array("I"), array("H"))
+                    postings[0].append(number)
+                    postings[1].append(min(count, 0xFFFF))
+            self._dirty = True
+
+    def _remove_one(self, record_id: str) -> None:
+        number = self._numbers.pop(record_id, None)
+        if number is not None:
+            self._record_ids[number] = None
+            self._total_length -= self._lengths[number]
+
+    def remove(self, record_ids: Iterable[str]) -> None:
+        with self._lock:
+            for record_id in record_ids:
+                self._remove_one(record_id)
+            self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self._dirty = True
+
+    def search(self, query: str, k: int, within: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k (record_id, BM25 score) pairs for a query, best first, optionally only among the given record ids"""
+        terms = set(tokenize(query))
+        with self._lock:
+            alive_count = len(self._numbers)
+            if not terms or not alive_count:
+                return []
+            alive = np.fromiter((rid is not None for rid in self._record_ids), dtype=bool, count=len(self._record_ids))
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32).astype(np.float32)
+            average_length = max(self._total_length / alive_count, 1.0)
+            norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+
+            scores = np.zeros(len(self._record_ids), dtype=np.float32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                numbers = np.frombuffer(postings[0], dtype=np.uint32)
+                frequencies = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float32)
+                live = alive[numbers]
+                df = int(live.sum())
+                if not df:
+                    continue
+                numbers, frequencies = numbers[live], frequencies[live]
+                idf = np.log(1 + (alive_count - df + 0.5) / (df + 0.5))
+                scores[numbers] += idf * frequencies * (self.k1 + 1) / (frequencies + norms[numbers])
+
+            if within is not None:
+                allowed = np.zeros(len(self._record_ids), dtype=bool)
+                allowed[[self._numbers[rid] for rid in within if rid in self._numbers]] = True
+                scores[~allowed] = 0.0
+
+            matched = np.flatnonzero(scores)
+            if len(matched) > k:
+                matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            matched = matched[np.argsort(-scores[matched], kind="stable")]
+            return [(self._record_ids[number], float(scores[number])) for number in matched]
+
+    def _compact(self) -> None:
+        """Renumber live records and drop tombstoned postings"""
+        if len(self._numbers) == len(self._record_ids):
+            return
+        renumber = np.full(len(self._record_ids), -1, dtype=np.int64)
+        live_numbers = [number for number, rid in enumerate(self._record_ids) if rid is not None]
+        renumber[live_numbers] = np.arange(len(live_numbers))
+
+        self._record_ids = [self._record_ids[number] for number in live_numbers]
+        self._numbers = {rid: number for number, rid in enumerate(self._record_ids)}
+        self._lengths = array("I", [self._lengths[number] for number in live_numbers])
+        postings: Dict[str, Tuple[array, array]] = {}
+        for term, (numbers, frequencies) in self._postings.items():
+            new_numbers = renumber[np.frombuffer(numbers, dtype=np.uint32)]
+            live = new_numbers >= 0
+            if live.any():
+                postings[term] = (
+                    array("I", new_numbers[live].astype(np.uint32).tobytes()),
+                    array("H", np.frombuffer(frequencies, dtype=np.uint16)[live].tobytes())
+                )
+        self._postings = postings
+
+    def save(self) -> None:
+        """Write the index if it changed since it was loaded or last saved"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._compact()
+            terms = list(self._postings)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            deltas, frequencies = [], []
+            for i, term in enumerate(terms):
+                numbers = np.frombuffer(self._postings[term][0], dtype=np.uint32)
+                deltas.append(np.diff(numbers, prepend=np.uint32(0)).astype(np.uint32))
+                frequencies.append(np.frombuffer(self._postings[term][1], dtype=np.uint16))
+                offsets[i + 1] = offsets[i] + len(numbers)
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    record_ids=np.frombuffer("\n".join(self._record_ids).encode("utf-8"), dtype=np.uint8),
+                    lengths=np.frombuffer(self._lengths, dtype=np.uint32),
+                    terms=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+                    offsets=offsets,
+                    deltas=np.concatenate(deltas) if deltas else np.zeros(0, dtype=np.uint32),
+                    frequencies=np.concatenate(frequencies) if frequencies else np.zeros(0, dtype=np.uint16)
+                )
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def _load(self) -> None:
+        with np.load(self.path, allow_pickle=False) as data:
+            record_ids = data["record_ids"].tobytes().decode("utf-8")
+            self._record_ids = record_ids.split("\n") if record_ids else []
+            self._numbers = {rid: number for number, rid in enumerate(self._record_ids)}
+            self._lengths = array("I", data["lengths"].astype(np.uint32).tobytes())
+            self._total_length = int(data["lengths"].sum())
+            terms = data["terms"].tobytes().decode("utf-8")
+            offsets = data["offsets"]
+            numbers = data["deltas"].astype(np.uint32)
+            frequencies = data["frequencies"].astype(np.uint16)
+            for i, term in enumerate(terms.split("\n") if terms else []):
+                start, end = offsets[i], offsets[i + 1]
+                self._postings[term] = (
+                    array("I", np.cumsum(numbers[start:end], dtype=np.uint32).tobytes()),
+                    array("H", frequencies[start:end].tobytes())
+                )
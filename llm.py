@@ -0,0 +1,181 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+from config import Config
+from context_packer import count_tokens, pack_context
+from metrics import count, observe, span
+
+if TYPE_CHECKING:
+    from groq import Groq
+
+# The groq SDK (httpx, pydantic) is imported on first use so the UI starts without it
+_client: Optional["Groq"] = None
+_client_lock = threading.Lock()
+
+# Process-wide latency counters for answer generation
+_stats_lock = threading.Lock()
+_stats: Dict[str, float] = {
+    "requests": 0, "streamed": 0, "ttft_s_total": 0.0, "latency_s_total": 0.0, "context_tokens_saved": 0
+}
+
+def get_llm_client() -> "Groq":
+    """Return the process-wide Groq client; its HTTP connection pool is reused across questions"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from groq import Groq
+                _client = Groq(
+                    api_key=Config.GROQ_API_KEY,
+                    base_url=Config.GROQ_BASE_URL or None,
+                    timeout=Config.LLM_TIMEOUT_S
+                )
+    return _client
+
+def _record(latency_s: float, ttft_s: Optional[float] = None) -> None:
+    observe("generate_answer", latency_s)
+    count("llm_requests")
+    if ttft_s is not None:
+        observe("llm_ttft", ttft_s)
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["latency_s_total"] += latency_s
+        if ttft_s is not None:
+            _stats["streamed"] += 1
+            _stats["ttft_s_total"] += ttft_s
+
+def get_llm_stats() -> Dict[str, float]:
+    """Mean time-to-first-token and total latency of answers generated in this process"""
+    with _stats_lock:
+        requests, streamed = _stats["requests"], _stats["streamed"]
+        return {
+            "requests": requests,
+            "mean_latency_s": _stats["latency_s_total"] / requests if requests else 0.0,
+            "mean_ttft_s": _stats["ttft_s_total"] / streamed if streamed else 0.0,
+            "context_tokens_saved": _stats["context_tokens_saved"]
+        }
+
+def _build_prompt(query: str, context_chunks: list, metrics: Optional[Dict[str, Any]] = None) -> str:
+    # Prepare context, without the text neighbouring chunks repeat and within the token budget
+    if Config.CONTEXT_PACKING_ENABLED:
+        packed = pack_context(context_chunks)
+        context = "\n\n".join(packed.pop("passages"))
+        with _stats_lock:
+            _stats["context_tokens_saved"] += packed["tokens_saved"]
+        count("prompt_tokens_saved", packed["tokens_saved"])
+        if metrics is not None:
+            metrics["context"] = packed
+    else:
+        context = "\n\n".join([chunk['content'] for chunk in context_chunks])
+
+    prompt = f"""Based on the following context from uploaded documents, please answer the question.
+If the answer cannot be found in the context, please say so clearly.
+
+Context:
+{context}
+
+Question: {query}
+
+Answer:"""
+    count("prompt_tokens", count_tokens(prompt))
+    return prompt
+
+def _stub_answer(query: str, context_chunks: list) -> str:
+    """Deterministic offline answer for load tests and benchmarks (LLM_STUB=1)"""
+    time.sleep(Config.LLM_STUB_LATENCY_S)
+    sources = ", ".join(sorted({chunk['metadata'].get('filename', '?') for chunk in context_chunks}))
+    return f"[stub answer] {query} ({len(context_chunks)} chunks from {sources or 'no sources'})"
+
+def generate_answer(query: str, context_chunks: list, metrics: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Generate answer using Groq API
+
+    If a metrics dict is passed it is filled with context, the packing report
+    (tokens_in, tokens_out, tokens_saved, ...) of the prompt's context, and
+    error, the exception text, when the request failed and the returned
+    answer is an error message.
+    """
+    prompt = _build_prompt(query, context_chunks, metrics)
+    if Config.LLM_STUB:
+        with span("generate_answer"):
+            return _stub_answer(query, context_chunks)
+
+    try:
+        start = time.perf_counter()
+
+        # Generate response using Groq
+        chat_completion = get_llm_client().chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=Config.LLM_MODEL,
+            temperature=0.1,
+            max_tokens=1024,
+        )
+
+        _record(time.perf_counter() - start)
+        return chat_completion.choices[0].message.content or "No answer available"
+
+    except Exception as e:
+        if metrics is not None:
+            metrics["error"] = str(e)
+        return f"Error generating answer: {str(e)}"
+
+def stream_answer(query: str, context_chunks: list, metrics: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Generate an answer token by token as the Groq API streams it
+
+    If a metrics dict is passed it is filled with context (the packing report
+    of the prompt's context), then ttft_s (time to first token), total_s and
+    pieces once the stream ends. When the request fails the error text is
+    yielded after whatever tokens already arrived and error holds the
+    exception text, so callers can tell a complete answer from a broken one.
+    """
+    start = time.perf_counter()
+    ttft = None
+    pieces = 0
+    try:
+        prompt = _build_prompt(query, context_chunks, metrics)
+        if Config.LLM_STUB:
+            for word in _stub_answer(query, context_chunks).split(" "):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                pieces += 1
+                yield word + " "
+            return
+
+        stream = get_llm_client().chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=Config.LLM_MODEL,
+            temperature=0.1,
+            max_tokens=1024,
+            stream=True,
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            pieces += 1
+            yield delta
+
+    except Exception as e:
+        if metrics is not None:
+            metrics["error"] = str(e)
+        yield f"Error generating answer: {str(e)}"
+    finally:
+        total = time.perf_counter() - start
+        _record(total, ttft if ttft is not None else total)
+        if metrics is not None:
+            metrics.update({"ttft_s": ttft if ttft is not None else total, "total_s": total, "pieces": pieces})
@@ -0,0 +1,73 @@
+import sqlite3
+import threading
+from contextlib import closing
+from typing import List, Optional
+
+
+class ChunkManifest:
+    """Per-file record of the content hashes of each document's chunks, in order"""
+
+    def __init__(self, path: str, collection_name: str):
+        self.path = path
+        self.collection_name = collection_name
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS file_chunks (
+                    collection TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    PRIMARY KEY (collection, filename, position)
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get_file(self, filename: str) -> Optional[List[str]]:
+        """Ordered chunk content hashes of a file, or None if the file has never been ingested"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT content_hash FROM file_chunks WHERE collection = ? AND filename = ? ORDER BY position",
+                (self.collection_name, filename),
+            ).fetchall()
+        if not rows:
+            return None
+        return [row[0] for row in rows]
+
+    def replace_file(self, filename: str, content_hashes: List[str]) -> None:
+        """Record the current chunk content hashes of a file, replacing any previous version"""
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM file_chunks WHERE collection = ? AND filename = ?",
+                (self.collection_name, filename),
+            )
+            conn.executemany(
+                "INSERT INTO file_chunks (collection, filename, position, content_hash) VALUES (?, ?, ?, ?)",
+                [(self.collection_name, filename, i, content_hash) for i, content_hash in enumerate(content_hashes)],
+            )
+
+    def remove_file(self, filename: str) -> None:
+        """Forget a file"""
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM file_chunks WHERE collection = ? AND filename = ?",
+                (self.collection_name, filename),
+            )
+
+    def list_files(self) -> List[str]:
+        """Names of all files recorded for the collection"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT filename FROM file_chunks WHERE collection = ? ORDER BY filename",
+                (self.collection_name,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self) -> None:
+        """Forget every file of the collection"""
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM file_chunks WHERE collection = ?", (self.collection_name,))
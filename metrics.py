@@ -0,0 +1,227 @@
+"""
+Latency spans and counters for the RAG pipeline
+
+Stages are timed with span() / timed() and land in per-stage histograms with
+Prometheus buckets plus a window of recent samples for p50/p95/p99. Counters
+track chunks, bytes and tokens. Everything is exported as Prometheus text by
+render_prometheus() (served at /metrics by server.py, and written to
+METRICS_FILE every METRICS_DUMP_INTERVAL_S if set).
+
+With METRICS_ENABLED off, span() returns a shared no-op context manager and
+count()/observe() return at once, so instrumented code pays one attribute lookup.
+
+Extraction runs in the ingest pipeline's worker processes; their samples are
+collected with drain() and folded into the parent with merge().
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from config import Config
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """Cumulative bucket counts plus the most recent samples for percentiles"""
+
+    def __init__(self, window: int):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        index = 0
+        while index < len(BUCKETS) and value > BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        """Nearest-rank quantiles of the recent samples"""
+        ordered = sorted(self.recent)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))] for q in QUANTILES}
+
+
+_lock = threading.Lock()
+_histograms: Dict[str, Histogram] = {}
+_counters: Dict[str, float] = {}
+_dumper: Optional[threading.Thread] = None
+
+
+def enabled() -> bool:
+    return Config.METRICS_ENABLED
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record one duration of a stage"""
+    if not Config.METRICS_ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram(Config.METRICS_WINDOW)
+        histogram.observe(seconds)
+    if Config.METRICS_FILE and _dumper is None:
+        _start_dumper()
+
+
+def count(name: str, amount: float = 1) -> None:
+    """Add to a counter"""
+    if not Config.METRICS_ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        observe(self.stage, time.perf_counter() - self.start)
+
+
+def span(stage: str):
+    """Context manager timing a block as one sample of stage"""
+    if not Config.METRICS_ENABLED:
+        return _NOOP
+    return _Span(stage)
+
+
+def timed(stage: str) -> Callable:
+    """Decorator timing every call of a function as one sample of stage"""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not Config.METRICS_ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def drain() -> Optional[Dict[str, Any]]:
+    """Samples and counters recorded since the last drain, then reset; None when disabled"""
+    if not Config.METRICS_ENABLED:
+        return None
+    with _lock:
+        drained = {
+            "samples": {stage: list(histogram.recent) for stage, histogram in _histograms.items()},
+            "counters": dict(_counters)
+        }
+        _histograms.clear()
+        _counters.clear()
+    return drained
+
+
+def merge(drained: Optional[Dict[str, Any]]) -> None:
+    """Fold samples drained in another process into this one"""
+    if not drained or not Config.METRICS_ENABLED:
+        return
+    for stage, samples in drained["samples"].items():
+        for value in samples:
+            observe(stage, value)
+    for name, amount in drained["counters"].items():
+        count(name, amount)
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def snapshot() -> Dict[str, Any]:
+    """Per-stage count, total and recent p50/p95/p99 in seconds, plus the counters"""
+    with _lock:
+        stages = {}
+        for stage, histogram in sorted(_histograms.items()):
+            quantiles = histogram.quantiles()
+            stages[stage] = {
+                "count": histogram.count,
+                "sum_s": histogram.sum,
+                "p50_s": quantiles[0.5],
+                "p95_s": quantiles[0.95],
+                "p99_s": quantiles[0.99]
+            }
+        return {"stages": stages, "counters": dict(sorted(_counters.items()))}
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = [
+        "# HELP docexpy_stage_duration_seconds Time spent in each pipeline stage",
+        "# TYPE docexpy_stage_duration_seconds histogram"
+    ]
+    with _lock:
+        histograms = sorted(_histograms.items())
+        for stage, histogram in histograms:
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS + (float("inf"),), histogram.buckets):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'docexpy_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'docexpy_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'docexpy_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        lines.append("# HELP docexpy_stage_recent_seconds Quantiles of the most recent samples of each stage")
+        lines.append("# TYPE docexpy_stage_recent_seconds gauge")
+        for stage, histogram in histograms:
+            for quantile, value in histogram.quantiles().items():
+                lines.append(f'docexpy_stage_recent_seconds{{stage="{stage}",quantile="{quantile}"}} {value}')
+
+        for name, value in sorted(_counters.items()):
+            lines.append(f"# TYPE docexpy_{name}_total counter")
+            lines.append(f"docexpy_{name}_total {value}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path: Optional[str] = None) -> None:
+    """Write the Prometheus text to a file, replacing it atomically"""
+    path = path or Config.METRICS_FILE
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(temporary, path)
+
+
+def _dump_forever() -> None:
+    while True:
+        time.sleep(Config.METRICS_DUMP_INTERVAL_S)
+        try:
+            dump()
+        except OSError:
+            pass
+
+
+def _start_dumper() -> None:
+    global _dumper
+    with _lock:
+        if _dumper is None:
+            _dumper = threading.Thread(target=_dump_forever, name="docexpy-metrics", daemon=True)
+            _dumper.start()
@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import closing, contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+
+
+class PageCache:
+    """
+    Persistent LRU cache of the page texts of PDF files, keyed by file hash and parser
+
+    Pages are written and read one row at a time, so caching a document never
+    holds all of its text in memory. An entry only counts once complete() has
+    recorded its page count; partial entries of interrupted parses are ignored
+    and overwritten by the next parse of that file.
+    """
+
+    # Pages written per transaction
+    _WRITE_BATCH = 64
+
+    def __init__(self, path: str, max_files: int):
+        self.path = path
+        self.max_files = max_files
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            # Whole-document entries of earlier versions
+            conn.execute("DROP TABLE IF EXISTS pdf_pages")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS pdf_files (
+                    key TEXT PRIMARY KEY,
+                    pages INTEGER,
+                    last_used REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pdf_files_by_last_used ON pdf_files (last_used)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS pdf_page_texts (
+                    key TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    text BLOB NOT NULL,
+                    PRIMARY KEY (key, page)
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _key(self, file_hash: str, parser: str) -> str:
+        # Parsers lay out the same page differently, so each gets its own entry
+        return f"{parser}:{file_hash}"
+
+    def get(self, file_hash: str, parser: str) -> Optional[Iterator[str]]:
+        """Text of every page of a file, read lazily in order, or None if it has not been extracted before"""
+        key = self._key(file_hash, parser)
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT pages FROM pdf_files WHERE key = ? AND pages IS NOT NULL", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE pdf_files SET last_used = ? WHERE key = ?", (time.time(), key))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self._iter_pages(key, row[0])
+
+    def _iter_pages(self, key: str, pages: int) -> Iterator[str]:
+        read = 0
+        with closing(self._connect()) as conn:
+            for (blob,) in conn.execute("SELECT text FROM pdf_page_texts WHERE key = ? ORDER BY page", (key,)):
+                read += 1
+                yield zlib.decompress(blob).decode("utf-8")
+        if read != pages:
+            # Evicted or re-parsed by another process while being read
+            raise RuntimeError(f"page cache entry changed while it was read ({read} of {pages} pages)")
+
+    def contains(self, file_hash: str, parser: str) -> bool:
+        """Whether a file's pages are cached, without loading them or counting a lookup"""
+        key = self._key(file_hash, parser)
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT 1 FROM pdf_files WHERE key = ? AND pages IS NOT NULL", (key,)
+            ).fetchone() is not None
+
+    def begin(self, file_hash: str, parser: str) -> None:
+        """Start a new, incomplete entry for a file, dropping whatever was cached for it"""
+        key = self._key(file_hash, parser)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM pdf_page_texts WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT OR REPLACE INTO pdf_files (key, pages, last_used) VALUES (?, NULL, ?)", (key, time.time())
+            )
+
+    @contextmanager
+    def page_writer(self, file_hash: str, parser: str, start: int = 0) -> Iterator[Callable[[str], None]]:
+        """
+        Yield a function that stores page texts in order from the 0-based page
+        start on, committing every _WRITE_BATCH pages and at the end
+        """
+        key = self._key(file_hash, parser)
+        pending: List[Tuple[str, int, bytes]] = []
+        next_page = start
+
+        def flush(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO pdf_page_texts (key, page, text) VALUES (?, ?, ?)", pending)
+            pending.clear()
+
+        with closing(self._connect()) as conn:
+            def add(text: str) -> None:
+                nonlocal next_page
+                pending.append((key, next_page, zlib.compress(text.encode("utf-8"))))
+                next_page += 1
+                if len(pending) >= self._WRITE_BATCH:
+                    flush(conn)
+
+            yield add
+            flush(conn)
+
+    def complete(self, file_hash: str, parser: str, pages: int) -> bool:
+        """
+        Mark an entry complete once all of its pages are stored, evicting the
+        least recently used files over the cap; False if pages are missing
+        """
+        key = self._key(file_hash, parser)
+        with closing(self._connect()) as conn, conn:
+            stored = conn.execute("SELECT COUNT(*) FROM pdf_page_texts WHERE key = ?", (key,)).fetchone()[0]
+            if stored != pages:
+                return False
+            conn.execute("UPDATE pdf_files SET pages = ?, last_used = ? WHERE key = ?", (pages, time.time(), key))
+            overflow = conn.execute("SELECT COUNT(*) FROM pdf_files").fetchone()[0] - self.max_files
+            if overflow > 0:
+                evicted = [row[0] for row in conn.execute(
+                    "SELECT key FROM pdf_files WHERE key != ? ORDER BY last_used LIMIT ?", (key, overflow)
+                )]
+                conn.executemany("DELETE FROM pdf_page_texts WHERE key = ?", [(k,) for k in evicted])
+                conn.executemany("DELETE FROM pdf_files WHERE key = ?", [(k,) for k in evicted])
+            return True
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for this process and the number of cached files"""
+        with closing(self._connect()) as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM pdf_files WHERE pages IS NOT NULL").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "max_files": self.max_files
+            }
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Return the process-wide page cache, or None when it is disabled"""
+    global _cache
+    if not Config.PDF_PAGE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                os.makedirs(Config.VECTOR_DB_PATH, exist_ok=True)
+                _cache = PageCache(
+                    os.path.join(Config.VECTOR_DB_PATH, Config.PDF_PAGE_CACHE_FILE),
+                    Config.PDF_PAGE_CACHE_MAX_FILES
+                )
+    return _cache
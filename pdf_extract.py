@@ -0,0 +1,137 @@
+"""
+PDF text extraction backends
+
+PyPDF2 is pure Python and usually the slowest part of ingesting a PDF.
+pypdfium2 (PDFium) and PyMuPDF (MuPDF) extract text in native code, typically
+an order of magnitude faster, and are used when installed. PDF_PARSER picks
+one explicitly; "auto" takes the first importable of pypdfium2, pymupdf and
+pypdf2. The parsers lay text out differently, so the page cache keeps each
+parser's pages apart.
+"""
+
+import hashlib
+import importlib.util
+import mmap
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, BinaryIO, ContextManager, Dict, Iterator, Optional, Type
+
+import PyPDF2
+
+from config import Config
+
+
+class PdfParser(ABC):
+    """Opens a PDF and extracts the text of one page at a time"""
+
+    name = ""
+    module = ""  # Importable module the parser needs
+
+    @abstractmethod
+    def document(self, stream: BinaryIO, path: Optional[str] = None) -> ContextManager[Any]:
+        """Open a PDF from a stream, or from its path when the library reads files itself"""
+
+    @abstractmethod
+    def page_count(self, document: Any) -> int:
+        ...
+
+    @abstractmethod
+    def page_text(self, document: Any, index: int) -> str:
+        """Text of the page at a 0-based index"""
+
+
+class PyPDF2Parser(PdfParser):
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    @contextmanager
+    def document(self, stream: BinaryIO, path: Optional[str] = None) -> Iterator[Any]:
+        # The stream is memory-mapped for paths, which beats PdfReader reading the file into memory
+        yield PyPDF2.PdfReader(stream)
+
+    def page_count(self, document: Any) -> int:
+        return len(document.pages)
+
+    def page_text(self, document: Any, index: int) -> str:
+        return document.pages[index].extract_text() or ""
+
+
+class PdfiumParser(PdfParser):
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    @contextmanager
+    def document(self, stream: BinaryIO, path: Optional[str] = None) -> Iterator[Any]:
+        import pypdfium2
+        document = pypdfium2.PdfDocument(path if path is not None else stream)
+        try:
+            yield document
+        finally:
+            document.close()
+
+    def page_count(self, document: Any) -> int:
+        return len(document)
+
+    def page_text(self, document: Any, index: int) -> str:
+        page = document[index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range().replace("\r\n", "\n")
+        finally:
+            textpage.close()
+            page.close()
+
+
+class PyMuPdfParser(PdfParser):
+    name = "pymupdf"
+    module = "fitz"
+
+    @contextmanager
+    def document(self, stream: BinaryIO, path: Optional[str] = None) -> Iterator[Any]:
+        import fitz
+        if path is not None:
+            document = fitz.open(path)
+        else:
+            document = fitz.open(stream=stream.read(), filetype="pdf")
+        try:
+            yield document
+        finally:
+            document.close()
+
+    def page_count(self, document: Any) -> int:
+        return document.page_count
+
+    def page_text(self, document: Any, index: int) -> str:
+        return document.load_page(index).get_text()
+
+
+PARSERS: Dict[str, Type[PdfParser]] = {
+    parser.name: parser for parser in (PdfiumParser, PyMuPdfParser, PyPDF2Parser)
+}
+
+
+def get_parser(name: Optional[str] = None) -> PdfParser:
+    """The configured PDF parser, or the fastest installed one for "auto" """
+    name = (name or Config.PDF_PARSER).lower()
+    if name == "auto":
+        for parser in PARSERS.values():
+            if importlib.util.find_spec(parser.module) is not None:
+                return parser()
+    if name not in PARSERS:
+        raise ValueError(f"Unknown PDF parser: {name} (expected auto, {', '.join(PARSERS)})")
+    return PARSERS[name]()
+
+
+def file_hash(stream: BinaryIO) -> str:
+    """sha256 of a PDF's bytes; memory maps and in-memory buffers are hashed without copying"""
+    if isinstance(stream, mmap.mmap):
+        return hashlib.sha256(stream).hexdigest()
+    if hasattr(stream, "getbuffer"):
+        with stream.getbuffer() as data:
+            return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for block in iter(lambda: stream.read(1 << 20), b""):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
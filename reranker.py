@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from metrics import timed
+
+
+class CrossEncoderReranker:
+    """
+    Re-orders retrieved chunks with a cross-encoder scoring each (question, chunk) pair
+
+    Scores are cached per (question, chunk id); chunk ids are derived from the
+    chunk's content, so a cached score stays valid for as long as the chunk exists.
+    Scoring stays within a latency budget: if the pairs still to score would take
+    longer than budget_s at the measured per-pair cost, or scoring overruns it,
+    the retrieval order is kept instead.
+    """
+
+    def __init__(self, model_name: str, batch_size: int, budget_s: float, max_entries: int):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget_s = budget_s
+        self.max_entries = max_entries
+        self._model = None
+        self._model_lock = threading.Lock()
+        # A single model instance is not safe to drive from several threads at once
+        self._score_lock = threading.Lock()
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Moving average of seconds per scored pair, None until the first batch
+        self._pair_cost_s: Optional[float] = None
+        self.reranked = 0
+        self.skipped = 0
+        self.pairs_scored = 0
+        self.pairs_cached = 0
+
+    def _get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def warm_up(self) -> None:
+        """Load the model and measure the cost of one batch before the first question"""
+        model = self._get_model()
+        pairs = [("warm-up question", "warm-up passage")] * self.batch_size
+        start = time.perf_counter()
+        with self._score_lock:
+            model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        self._pair_cost_s = (time.perf_counter() - start) / len(pairs)
+
+    def _cached_scores(self, query: str, chunk_ids: List[str]) -> Dict[str, float]:
+        with self._cache_lock:
+            found = {}
+            for chunk_id in chunk_ids:
+                score = self._scores.get((query, chunk_id))
+                if score is not None:
+                    self._scores.move_to_end((query, chunk_id))
+                    found[chunk_id] = score
+            return found
+
+    def _remember(self, query: str, scores: Dict[str, float]) -> None:
+        with self._cache_lock:
+            for chunk_id, score in scores.items():
+                self._scores[(query, chunk_id)] = score
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+    @timed("rerank")
+    def rerank(self, query: str, chunks: List[Dict[str, Any]], k: int,
+               timings: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+        """
+        The k best chunks by cross-encoder score, each with a rerank_score
+
+        Falls back to the first k chunks in retrieval order when the budget does
+        not allow scoring them. If a timings dict is passed, rerank_s is set.
+        """
+        start = time.perf_counter()
+        scores = self._cached_scores(query, [chunk["id"] for chunk in chunks])
+        self.pairs_cached += len(scores)
+        pending = [chunk for chunk in chunks if chunk["id"] not in scores]
+
+        completed = True
+        if pending:
+            model = self._get_model()
+            if self._pair_cost_s is not None and self._pair_cost_s * len(pending) > self.budget_s:
+                completed = False
+                # Let an estimate inflated by one slow batch decay, so scoring is tried again
+                self._pair_cost_s *= 0.9
+            fresh: Dict[str, float] = {}
+            for batch_start in range(0, len(pending), self.batch_size):
+                if not completed or time.perf_counter() - start > self.budget_s:
+                    completed = False
+                    break
+                batch = pending[batch_start:batch_start + self.batch_size]
+                batch_begin = time.perf_counter()
+                with self._score_lock:
+                    predicted = model.predict(
+                        [(query, chunk["content"]) for chunk in batch],
+                        batch_size=self.batch_size,
+                        show_progress_bar=False
+                    )
+                pair_cost = (time.perf_counter() - batch_begin) / len(batch)
+                self._pair_cost_s = pair_cost if self._pair_cost_s is None else 0.8 * self._pair_cost_s + 0.2 * pair_cost
+                fresh.update({chunk["id"]: float(score) for chunk, score in zip(batch, predicted)})
+            self.pairs_scored += len(fresh)
+            # Keep partial work, so the same question fits the budget next time
+            self._remember(query, fresh)
+            scores.update(fresh)
+
+        if completed:
+            self.reranked += 1
+            ranked = sorted(chunks, key=lambda chunk: -scores[chunk["id"]])[:k]
+            results = [dict(chunk, rerank_score=scores[chunk["id"]]) for chunk in ranked]
+        else:
+            self.skipped += 1
+            results = chunks[:k]
+        if timings is not None:
+            timings["rerank_s"] = time.perf_counter() - start
+        return results
+
+    def stats(self) -> Dict[str, float]:
+        """How often re-ranking ran or was skipped, and how many scores came from the cache"""
+        with self._cache_lock:
+            entries = len(self._scores)
+        return {
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+            "pairs_scored": self.pairs_scored,
+            "pairs_cached": self.pairs_cached,
+            "pair_cost_ms": (self._pair_cost_s or 0.0) * 1000,
+            "entries": entries
+        }
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Return the process-wide re-ranker, or None when re-ranking is disabled"""
+    global _reranker
+    if not Config.RERANK_ENABLED:
+        return None
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker(
+                    model_name=Config.RERANK_MODEL,
+                    batch_size=Config.RERANK_BATCH_SIZE,
+                    budget_s=Config.RERANK_BUDGET_S,
+                    max_entries=Config.RERANK_CACHE_MAX_ENTRIES
+                )
+    return _reranker
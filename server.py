@@ -0,0 +1,338 @@
+"""
+Headless HTTP API for DocExpy (ASGI)
+
+Exposes ingest, search and answer on top of the same DocumentProcessor,
+VectorStoreManager and generate_answer the Streamlit UI uses:
+
+    python server.py --port 8000
+    uvicorn server:app --port 8000
+
+Model inference, ChromaDB calls and the LLM request are blocking, so they run
+in a thread pool, streamed answers one token at a time; the event loop only
+parses requests and waits. A semaphore caps in-flight requests, streams
+included, per worker process and sheds load with 503s instead of queueing
+without bound.
+
+The service runs as a single process; scale it with SERVER_THREADS. The
+embedding model, ChromaDB's HNSW segment and the BM25 and vector tier indexes
+are loaded into memory once, and ChromaDB's local store is not safe to share
+between processes: another process reading it would not see documents this
+one ingests. A lock file in VECTOR_DB_PATH makes any further server process on
+the same store, e.g. from uvicorn --workers N, fail at startup.
+
+Requests with an X-Tenant-ID header read and write that tenant's own collection;
+the first /ingest for a tenant creates it, and other endpoints answer 404 for
+tenants that do not exist yet. Search and answer also take a filenames list to
+scope retrieval to those files.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, TextIO
+
+from fastapi import FastAPI, File, Header, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from config import Config
+
+_executor = ThreadPoolExecutor(max_workers=Config.SERVER_THREADS, thread_name_prefix="docexpy-worker")
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+class SearchRequest(BaseModel):
+    queries: List[str]
+    k: int = 3
+    filenames: Optional[List[str]] = None
+    search_ef: Optional[int] = None
+
+
+class AnswerRequest(BaseModel):
+    query: str
+    k: int = 3
+    stream: bool = False
+    filenames: Optional[List[str]] = None
+
+
+_store_lock: Optional[TextIO] = None
+
+
+def _lock_store() -> None:
+    """Hold an exclusive lock on VECTOR_DB_PATH for the life of this process"""
+    global _store_lock
+    try:
+        import fcntl
+    except ImportError:
+        # Not available on Windows; nothing to enforce a single process with
+        return
+    os.makedirs(Config.VECTOR_DB_PATH, exist_ok=True)
+    lock = open(os.path.join(Config.VECTOR_DB_PATH, Config.SERVER_LOCK_FILE), "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        raise RuntimeError(
+            f"Another DocExpy server process already serves {Config.VECTOR_DB_PATH}; "
+            "run a single worker process and raise SERVER_THREADS instead"
+        )
+    _store_lock = lock
+
+
+async def _acquire_slot() -> None:
+    """Take one of the in-flight request slots, answering 503 if none frees up in time"""
+    try:
+        await asyncio.wait_for(_semaphore.acquire(), timeout=Config.SERVER_QUEUE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Server busy, retry later")
+
+
+async def _run_blocking(func: Callable, *args) -> Any:
+    """Run blocking model/DB work in the thread pool under the concurrency limit"""
+    await _acquire_slot()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _semaphore.release()
+
+
+async def _stream_blocking(tokens: Iterator[str]) -> AsyncIterator[str]:
+    """
+    Drive a blocking token generator from the thread pool, one token per step
+
+    The caller takes a slot with _acquire_slot before the response starts, so
+    a busy server still answers 503; the slot is released when the stream
+    ends, fails or the client disconnects.
+    """
+    loop = asyncio.get_running_loop()
+    done = object()
+    try:
+        while True:
+            token = await loop.run_in_executor(_executor, next, tokens, done)
+            if token is done:
+                break
+            yield token
+    finally:
+        _semaphore.release()
+        try:
+            getattr(tokens, "close", lambda: None)()
+        except ValueError:
+            # Still inside next() on a pool thread after a disconnect; closed once garbage collected
+            pass
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    global _semaphore
+    _lock_store()
+    _semaphore = asyncio.Semaphore(Config.SERVER_MAX_CONCURRENCY)
+    # Load the model and open the store before the first request arrives
+    from vector_store import get_vector_store
+    await asyncio.get_running_loop().run_in_executor(_executor, get_vector_store)
+    yield
+
+
+app = FastAPI(title="DocExpy", description="Document-based question answering API", lifespan=_lifespan)
+
+
+def _tenant_store(tenant: Optional[str]) -> Any:
+    """An existing tenant's vector store, or a 404; only /ingest creates tenants"""
+    from vector_store import find_vector_store
+    vector_store = find_vector_store(tenant)
+    if vector_store is None:
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant}")
+    return vector_store
+
+
+@app.get("/health")
+async def health(x_tenant_id: Optional[str] = Header(None)) -> Dict[str, Any]:
+    from answer_cache import get_answer_cache
+    from reranker import get_reranker
+    info = await _run_blocking(lambda: _tenant_store(x_tenant_id).get_collection_info())
+    answer_cache = get_answer_cache()
+    reranker = get_reranker()
+    return {
+        "status": "ok",
+        "document_count": info["document_count"],
+        "index": info["index"],
+        "vector_tier": info["vector_tier"],
+        "answer_cache": answer_cache.stats() if answer_cache else {},
+        "reranker": reranker.stats() if reranker else {}
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_text() -> str:
+    """Stage latency histograms and counters in the Prometheus text format"""
+    from metrics import render_prometheus
+    return render_prometheus()
+
+
+async def _spool_upload(upload: UploadFile, path: str) -> None:
+    """Copy an upload to disk block by block without blocking the event loop, enforcing MAX_FILE_SIZE"""
+    size = 0
+    with open(path, "wb") as f:
+        while True:
+            block = await upload.read(1 << 20)
+            if not block:
+                break
+            size += len(block)
+            if size > Config.MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{upload.filename} is larger than {Config.MAX_FILE_SIZE // (1024 * 1024)} MB"
+                )
+            f.write(block)
+
+
+@app.post("/ingest")
+async def ingest(files: List[UploadFile] = File(...), x_tenant_id: Optional[str] = Header(None)) -> Dict[str, Any]:
+    from ingest_pipeline import IngestPipeline
+    from vector_store import get_vector_store
+
+    spool_dir = tempfile.mkdtemp(prefix="docexpy-upload-")
+    try:
+        sources = []
+        for i, upload in enumerate(files):
+            extension = os.path.splitext(upload.filename or "")[1].lower()
+            if extension not in Config.ALLOWED_EXTENSIONS:
+                raise HTTPException(status_code=400, detail=f"Unsupported file type: {upload.filename}")
+            path = os.path.join(spool_dir, f"{i}_{os.path.basename(upload.filename)}")
+            await _spool_upload(upload, path)
+            sources.append((upload.filename, path))
+
+        def run() -> Dict[str, Any]:
+            snapshot: Dict[str, Any] = {}
+            for snapshot in IngestPipeline(get_vector_store(x_tenant_id)).run(sources):
+                pass
+            return snapshot
+
+        snapshot = await _run_blocking(run)
+        return {"results": snapshot.get("results", {}), "elapsed_s": snapshot.get("elapsed_s", 0.0)}
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+@app.post("/admin/rebuild")
+async def rebuild(x_tenant_id: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Start rebuilding the tenant's HNSW index in the background; poll /health for its state"""
+    vector_store = await _run_blocking(_tenant_store, x_tenant_id)
+    return {"started": vector_store.start_rebuild(), "rebuild": dict(vector_store.rebuild_status)}
+
+
+@app.post("/search")
+async def search(request: SearchRequest, x_tenant_id: Optional[str] = Header(None)) -> Dict[str, Any]:
+    def run() -> List[List[Dict[str, Any]]]:
+        return _tenant_store(x_tenant_id).similarity_search_batch(
+            request.queries, request.k, request.filenames, request.search_ef
+        )
+
+    results = await _run_blocking(run)
+    return {"results": results}
+
+
+def _retrieve(query: str, k: int, tenant: Optional[str] = None,
+              filenames: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Search for context and look the question up in the answer cache"""
+    from answer_cache import get_answer_cache
+    from reranker import get_reranker
+
+    vector_store = _tenant_store(tenant)
+    generation = vector_store.generation
+    answer_cache = get_answer_cache()
+    query_embedding = vector_store.embed_query(query) if answer_cache else None
+    reranker = get_reranker()
+    candidates = max(k, Config.RERANK_CANDIDATES) if reranker else k
+    timings: Dict[str, float] = {}
+    if Config.HYBRID_SEARCH_ENABLED:
+        chunks = vector_store.hybrid_search(
+            query, candidates, query_embedding=query_embedding, timings=timings, filenames=filenames
+        )
+    else:
+        chunks = vector_store.similarity_search(query, candidates, query_embedding=query_embedding, filenames=filenames)
+    if reranker and chunks:
+        chunks = reranker.rerank(query, chunks, k, timings=timings)
+    cached = None
+    if answer_cache and chunks:
+        cached = answer_cache.lookup(query_embedding, [chunk["id"] for chunk in chunks], generation)
+    return {
+        "chunks": chunks,
+        "cached": cached,
+        "embedding": query_embedding,
+        "generation": generation,
+        "timings": timings
+    }
+
+
+def _remember(query: Dict[str, Any], text: str, latency_s: float, metrics: Dict[str, Any]) -> None:
+    """Cache an answer, unless generating it failed (possibly after part of it was streamed)"""
+    from answer_cache import get_answer_cache
+
+    answer_cache = get_answer_cache()
+    if answer_cache and not metrics.get("error"):
+        chunk_ids = [chunk["id"] for chunk in query["chunks"]]
+        answer_cache.store(query["embedding"], chunk_ids, text, latency_s, query["generation"])
+
+
+@app.post("/answer")
+async def answer(request: AnswerRequest, x_tenant_id: Optional[str] = Header(None)) -> Any:
+    from llm import generate_answer, stream_answer
+
+    retrieved = await _run_blocking(_retrieve, request.query, request.k, x_tenant_id, request.filenames)
+    chunks = retrieved["chunks"]
+    if request.stream:
+        if not chunks:
+            return StreamingResponse(iter(()), media_type="text/plain")
+        if retrieved["cached"] is not None:
+            return StreamingResponse(iter([retrieved["cached"]]), media_type="text/plain")
+
+        def tokens():
+            pieces: List[str] = []
+            metrics: Dict[str, Any] = {}
+            for token in stream_answer(request.query, chunks, metrics=metrics):
+                pieces.append(token)
+                yield token
+            _remember(retrieved, "".join(pieces).strip(), metrics.get("total_s", 0.0), metrics)
+
+        await _acquire_slot()
+        return StreamingResponse(_stream_blocking(tokens()), media_type="text/plain")
+    if not chunks:
+        return {"answer": None, "sources": []}
+    if retrieved["cached"] is not None:
+        return {"answer": retrieved["cached"], "sources": chunks, "cached": True, "retrieval": retrieved["timings"]}
+
+    metrics: Dict[str, Any] = {}
+
+    def generate() -> str:
+        start = time.perf_counter()
+        text = generate_answer(request.query, chunks, metrics=metrics)
+        _remember(retrieved, text, time.perf_counter() - start, metrics)
+        return text
+
+    text = await _run_blocking(generate)
+    return {
+        "answer": text,
+        "sources": chunks,
+        "cached": False,
+        "retrieval": retrieved["timings"],
+        "context": metrics.get("context", {})
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the DocExpy HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run("server:app", host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Shared fixtures for the DocExpy tests
+
+Stores are built on a temporary VECTOR_DB_PATH with a hashing embedding
+backend, so the tests need ChromaDB but neither the sentence-transformers
+model nor network access. Run them from the repository root with ``pytest``.
+"""
+
+import hashlib
+import os
+import sys
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+import pytest
+
+# Make the top-level DocExpy modules importable from the tests directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from config import Config
+from embedding_backends import EmbeddingBackend
+
+
+class HashingBackend(EmbeddingBackend):
+    """Deterministic unit vectors seeded by each text's hash; counts the texts it encodes"""
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+        self.encoded: List[str] = []
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        self.encoded.extend(texts)
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vectors[row] = np.random.default_rng(seed).normal(size=self.dim)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A fresh VECTOR_DB_PATH, with the process-wide ChromaDB client and stores reset"""
+    vector_store = pytest.importorskip("vector_store")
+    path = str(tmp_path / "db")
+    monkeypatch.setattr(Config, "VECTOR_DB_PATH", path)
+    monkeypatch.setattr(vector_store, "_client", None)
+    monkeypatch.setattr(vector_store, "_vector_stores", OrderedDict())
+    return path
+
+
+@pytest.fixture
+def engine():
+    from embeddings import EmbeddingEngine
+    return EmbeddingEngine(model_name="hashing", backend=HashingBackend())
+
+
+@pytest.fixture
+def make_store(db_path, engine):
+    """Factory for VectorStoreManagers on the temporary database, sharing one engine"""
+    from vector_store import VectorStoreManager
+
+    def make(tenant=None):
+        return VectorStoreManager(embedding_model=engine, tenant=tenant)
+
+    return make
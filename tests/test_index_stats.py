@@ -0,0 +1,34 @@
+import struct
+
+import pytest
+
+pytest.importorskip("chromadb")
+from vector_store import read_hnsw_header  # noqa: E402
+
+
+def chunks(count, prefix="chunk"):
+    return [f"{prefix} {i} about part number P-{i:05d}" for i in range(count)]
+
+
+def test_read_hnsw_header_skips_version(tmp_path):
+    path = tmp_path / "header.bin"
+    # persistence version, offsetLevel0, max_elements, cur_element_count, then the rest of the header
+    path.write_bytes(struct.pack("<iQQQ", 1, 0, 1320, 1000) + bytes(72))
+    assert read_hnsw_header(str(path)) == (1320, 1000)
+
+
+def test_read_hnsw_header_rejects_unknown_layout(tmp_path):
+    path = tmp_path / "header.bin"
+    path.write_bytes(struct.pack("<iQQQ", 1, 0, 10, 1000))
+    assert read_hnsw_header(str(path)) is None
+    assert read_hnsw_header(str(tmp_path / "missing.bin")) is None
+
+
+def test_fresh_index_has_no_tombstones(make_store):
+    store = make_store()
+    # More than Chroma's sync threshold, so the HNSW header is persisted
+    store.ingest(chunks(1200), "a.pdf")
+    stats = store.index_stats()
+    assert 0 < stats["elements"] <= stats["capacity"]
+    assert stats["tombstone_ratio"] < 0.01
+    assert not stats["rebuild_recommended"]
@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("chromadb")
+
+CHUNKS = ["Refunds take 14 days.", "Shipping is free over 50 EUR.", "Returns need a receipt."]
+
+
+def test_reingesting_a_file_only_embeds_changed_chunks(make_store):
+    store = make_store()
+    encoded = store.embedding_model.backend.encoded
+    assert store.ingest(CHUNKS, "policy.pdf") == {"chunks": 3, "encoded": 3, "reused": 0, "deleted": 0}
+    assert store.ingest(CHUNKS, "policy.pdf") == {"chunks": 3, "encoded": 0, "reused": 3, "deleted": 0}
+    assert len(encoded) == 3
+
+    edited = [CHUNKS[0], "Shipping is free over 40 EUR."]
+    assert store.ingest(edited, "policy.pdf") == {"chunks": 2, "encoded": 1, "reused": 1, "deleted": 2}
+    assert encoded[3:] == ["Shipping is free over 40 EUR."]
+    info = store.get_collection_info()
+    assert info["document_count"] == 2
+    assert info["ingest_stats"] == {"chunks": 8, "encoded": 4, "reused": 4, "deleted": 2}
+
+
+def test_identical_chunks_of_another_file_are_copied_not_embedded(make_store):
+    store = make_store()
+    store.ingest(CHUNKS, "policy.pdf")
+    stats = store.ingest(CHUNKS[:2] + ["Gift cards never expire."], "copy.pdf")
+    assert (stats["encoded"], stats["reused"]) == (1, 2)
+    assert len(store.embedding_model.backend.encoded) == 4
+    assert store.get_collection_info()["document_count"] == 6
+
+
+def test_removed_file_stays_removed_after_a_restart(make_store):
+    store = make_store()
+    store.ingest(CHUNKS, "policy.pdf")
+    store.ingest(["Gift cards never expire."], "cards.pdf")
+    assert store.remove("policy.pdf") == 3
+    restarted = make_store()
+    assert restarted.get_collection_info()["document_count"] == 1
+    assert restarted.manifest.get_file("policy.pdf") is None
+    assert [hit["metadata"]["filename"] for hit in restarted.similarity_search(CHUNKS[0], k=3)] == ["cards.pdf"]
@@ -0,0 +1,76 @@
+import os
+
+from job_queue import JobQueue
+
+
+def make_queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "spool"))
+
+
+def states(queue, job_ids):
+    return [job["state"] for job in queue.get(job_ids)]
+
+
+def test_recover_requeues_interrupted_jobs(tmp_path):
+    queue = make_queue(tmp_path)
+    job_ids = [queue.submit(f"{i}.pdf", b"%PDF") for i in range(4)]
+    claimed = queue.claim(3)
+    assert [job["id"] for job in claimed] == job_ids[:3]
+    queue.update(job_ids[1], state="embedding", chunks_done=5, chunks_total=10)
+    queue.finish(claimed[2], "indexed")
+
+    # A restarted process, which may well have the same PID as the one that stopped
+    restarted = make_queue(tmp_path)
+    assert all(job["owner_pid"] in (os.getpid(), None) for job in restarted.get(job_ids))
+    assert restarted.recover() == 2
+    assert states(restarted, job_ids) == ["queued", "queued", "indexed", "queued"]
+    assert [job["owner_pid"] for job in restarted.get(job_ids[:2])] == [None, None]
+
+
+def test_recovered_jobs_are_claimed_again_in_order(tmp_path):
+    queue = make_queue(tmp_path)
+    job_ids = [queue.submit(f"{i}.pdf", b"%PDF") for i in range(2)]
+    queue.claim(1)
+    queue.recover()
+    assert [job["id"] for job in queue.claim(5)] == job_ids
+    assert queue.recover() == 2
+    assert queue.recover() == 0
+
+
+def test_finish_removes_spooled_copy(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.submit("a.pdf", b"%PDF")
+    job = queue.claim(1)[0]
+    assert os.path.exists(job["path"])
+    queue.finish(job, "failed", "no text could be extracted")
+    assert not os.path.exists(job["path"])
+    assert queue.get([job_id])[0]["error"] == "no text could be extracted"
+
+
+def test_runner_ingests_a_batch_through_the_pipeline(tmp_path, make_store, monkeypatch):
+    from concurrent.futures import Future
+
+    import ingest_pipeline
+    from job_queue import JobRunner
+
+    texts = {"a.pdf": ["Refunds take 14 days.", "Shipping is free."], "b.pdf": [], "c.pdf": ["Returns need a receipt."]}
+
+    def extracted(pool, filename, source):
+        future = Future()
+        future.set_result((texts[filename], [{} for _ in texts[filename]], None))
+        return future
+
+    monkeypatch.setattr(ingest_pipeline, "get_extract_pool", lambda: None)
+    monkeypatch.setattr(ingest_pipeline, "submit_extraction", extracted)
+    store = make_store()
+    queue = make_queue(tmp_path)
+    job_ids = [queue.submit(name, b"%PDF") for name in texts]
+    jobs = queue.claim(5)
+    JobRunner(queue, store)._index({job["filename"]: job for job in jobs})
+
+    a, b, c = queue.get(job_ids)
+    assert [a["state"], b["state"], c["state"]] == ["indexed", "failed", "indexed"]
+    assert (a["chunks_done"], a["chunks_total"]) == (2, 2)
+    assert b["error"] == "no text could be extracted"
+    assert len(store.embedding_model.backend.encoded) == 3
+    assert store.get_collection_info()["document_count"] == 3
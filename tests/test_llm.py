@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+import llm
+from config import Config
+
+CHUNKS = [{"id": "1", "content": "Refunds take 14 days.", "metadata": {"filename": "a.pdf"}}]
+
+
+def delta(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FailingStream:
+    """A Groq stream that sends a few tokens and then drops the connection"""
+
+    def __iter__(self):
+        yield delta("Refunds ")
+        yield delta("take")
+        raise ConnectionError("connection reset")
+
+
+def client_returning(response):
+    create = lambda **kwargs: response
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_stream_failure_is_reported_out_of_band(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_STUB", False)
+    monkeypatch.setattr(llm, "get_llm_client", lambda: client_returning(FailingStream()))
+    metrics = {}
+    tokens = list(llm.stream_answer("How long do refunds take?", CHUNKS, metrics=metrics))
+    assert tokens[:2] == ["Refunds ", "take"]
+    assert tokens[-1].startswith("Error generating answer")
+    assert metrics["error"] == "connection reset"
+    assert metrics["pieces"] == 2
+
+
+def test_complete_stream_has_no_error(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_STUB", False)
+    monkeypatch.setattr(llm, "get_llm_client", lambda: client_returning(iter([delta("14 days")])))
+    metrics = {}
+    assert "".join(llm.stream_answer("How long?", CHUNKS, metrics=metrics)) == "14 days"
+    assert "error" not in metrics
+
+
+def test_failed_answer_is_not_cached(monkeypatch):
+    server = pytest.importorskip("server")
+    import answer_cache
+
+    stored = []
+    cache = SimpleNamespace(store=lambda *args: stored.append(args))
+    monkeypatch.setattr(answer_cache, "get_answer_cache", lambda: cache)
+    retrieved = {"chunks": CHUNKS, "embedding": None, "generation": 0}
+    server._remember(retrieved, "Refunds take\nError generating answer: reset", 1.0, {"error": "reset"})
+    assert stored == []
+    server._remember(retrieved, "Refunds take 14 days.", 1.0, {})
+    assert len(stored) == 1
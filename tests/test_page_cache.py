@@ -0,0 +1,105 @@
+import hashlib
+from contextlib import contextmanager
+
+import pytest
+
+from config import Config
+from page_cache import PageCache
+
+
+def make_cache(tmp_path, max_files=10):
+    return PageCache(str(tmp_path / "pages.sqlite3"), max_files)
+
+
+def write(cache, file_hash, pages, start=0):
+    with cache.page_writer(file_hash, "p", start) as add_page:
+        for text in pages:
+            add_page(text)
+
+
+def test_pages_are_written_and_read_one_by_one(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.begin("h", "p")
+    write(cache, "h", [f"page {i}" for i in range(100)])
+    assert cache.get("h", "p") is None  # Not complete yet
+    assert cache.complete("h", "p", 100)
+    pages = cache.get("h", "p")
+    assert next(pages) == "page 0"
+    assert list(pages) == [f"page {i}" for i in range(1, 100)]
+
+
+def test_ranges_complete_only_when_every_page_is_stored(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.begin("h", "p")
+    write(cache, "h", ["c", "d"], start=2)
+    assert not cache.complete("h", "p", 4)
+    write(cache, "h", ["a", "b"], start=0)
+    assert cache.complete("h", "p", 4)
+    assert list(cache.get("h", "p")) == ["a", "b", "c", "d"]
+
+
+def test_interrupted_parse_leaves_no_entry(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.begin("h", "p")
+    with pytest.raises(ValueError):
+        with cache.page_writer("h", "p") as add_page:
+            add_page("a")
+            raise ValueError("broken page")
+    assert not cache.contains("h", "p")
+    # The next parse starts over
+    cache.begin("h", "p")
+    write(cache, "h", ["a", "b"])
+    assert cache.complete("h", "p", 2)
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_files=2)
+    for file_hash in ("a", "b", "c"):
+        cache.begin(file_hash, "p")
+        write(cache, file_hash, [file_hash])
+        cache.complete(file_hash, "p", 1)
+    assert [cache.contains(file_hash, "p") for file_hash in ("a", "b", "c")] == [False, True, True]
+    assert cache.stats()["entries"] == 2
+
+
+class ListParser:
+    """A PdfParser over a list of page texts that counts the pages it parses"""
+
+    name = "list"
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.parsed = 0
+
+    @contextmanager
+    def document(self, stream, path=None):
+        yield self.pages
+
+    def page_count(self, document):
+        return len(document)
+
+    def page_text(self, document, index):
+        self.parsed += 1
+        return document[index]
+
+
+def test_iter_pdf_pages_caches_while_parsing(tmp_path, monkeypatch):
+    document_processor = pytest.importorskip("document_processor")
+    import page_cache
+
+    monkeypatch.setattr(Config, "VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setattr(page_cache, "_cache", None)
+    parser = ListParser([f"page {i}" for i in range(5)])
+    monkeypatch.setattr(document_processor, "get_parser", lambda: parser)
+    processor = document_processor.DocumentProcessor()
+
+    # Stopping part-way caches nothing
+    pages = processor.iter_pdf_pages(b"%PDF-1")
+    next(pages)
+    pages.close()
+    assert not page_cache.get_page_cache().contains(hashlib.sha256(b"%PDF-1").hexdigest(), "list")
+
+    assert list(processor.iter_pdf_pages(b"%PDF-1")) == list(enumerate(parser.pages, start=1))
+    parsed = parser.parsed
+    assert list(processor.iter_pdf_pages(b"%PDF-1")) == list(enumerate(parser.pages, start=1))
+    assert parser.parsed == parsed
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("chromadb")
+from config import Config  # noqa: E402
+
+
+def spy(monkeypatch, target, name, calls):
+    method = getattr(target, name)
+
+    def recorded(*args, **kwargs):
+        calls.append((args, kwargs))
+        return method(*args, **kwargs)
+
+    monkeypatch.setattr(target, name, recorded)
+
+
+def test_batch_search_passes_search_ef_to_hnsw(make_store, monkeypatch):
+    store = make_store()
+    store.ingest([f"chunk {i}" for i in range(20)], "a.pdf")
+    calls = []
+    # Chroma's Collection is a pydantic model, so spy on the class
+    spy(monkeypatch, type(store.collection), "query", calls)
+    results = store.similarity_search_batch(["chunk 1", "chunk 2"], k=3, search_ef=12)
+    assert [len(result) for result in results] == [3, 3]
+    assert [kwargs["n_results"] for _, kwargs in calls] == [12]
+
+
+def test_tier_search_rescores_at_least_search_ef(make_store, monkeypatch):
+    monkeypatch.setattr(Config, "VECTOR_TIER", "int8")
+    store = make_store()
+    store.ingest([f"chunk {i}" for i in range(20)], "a.pdf")
+    calls = []
+    spy(monkeypatch, store.vector_tier, "search", calls)
+    store.similarity_search_batch(["chunk 1"], k=3)
+    store.similarity_search_batch(["chunk 1"], k=3, search_ef=20)
+    assert [args[3] for args, _ in calls] == [None, 7]
+    assert store.similarity_search("chunk 1", k=3, search_ef=2)[0]["content"] == "chunk 1"
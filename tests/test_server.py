@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+server = pytest.importorskip("server")
+
+
+def test_streams_hold_a_slot_until_they_end(monkeypatch):
+    monkeypatch.setattr(server.Config, "SERVER_QUEUE_TIMEOUT_S", 0.05)
+
+    async def run():
+        monkeypatch.setattr(server, "_semaphore", asyncio.Semaphore(1))
+        await server._acquire_slot()
+        stream = server._stream_blocking(iter(["a", "b"]))
+        assert await stream.__anext__() == "a"
+        # The only slot is held by the running stream
+        with pytest.raises(HTTPException) as busy:
+            await server._acquire_slot()
+        assert busy.value.status_code == 503
+        assert [token async for token in stream] == ["b"]
+        await asyncio.wait_for(server._acquire_slot(), timeout=1)
+
+    asyncio.run(run())
+
+
+def test_disconnect_releases_the_slot(monkeypatch):
+    closed = []
+
+    def tokens():
+        try:
+            yield from ["a", "b", "c"]
+        finally:
+            closed.append(True)
+
+    async def run():
+        monkeypatch.setattr(server, "_semaphore", asyncio.Semaphore(1))
+        await server._acquire_slot()
+        stream = server._stream_blocking(tokens())
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        assert not server._semaphore.locked()
+
+    asyncio.run(run())
+    assert closed == [True]
+
+
+def test_second_server_process_on_a_store_is_refused(tmp_path, monkeypatch):
+    pytest.importorskip("fcntl")
+    monkeypatch.setattr(server.Config, "VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setattr(server, "_store_lock", None)
+    server._lock_store()
+    held = server._store_lock
+    try:
+        # A second open file description conflicts just like another process would
+        with pytest.raises(RuntimeError):
+            server._lock_store()
+    finally:
+        held.close()
+
+
+def test_oversized_upload_is_rejected(tmp_path, monkeypatch):
+    from io import BytesIO
+    from fastapi import UploadFile
+
+    monkeypatch.setattr(server.Config, "MAX_FILE_SIZE", 3 * 1024 * 1024)
+    path = str(tmp_path / "upload.pdf")
+    asyncio.run(server._spool_upload(UploadFile(BytesIO(b"x" * (2 * 1024 * 1024)), filename="a.pdf"), path))
+    assert (tmp_path / "upload.pdf").stat().st_size == 2 * 1024 * 1024
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(server._spool_upload(UploadFile(BytesIO(b"x" * (4 * 1024 * 1024)), filename="b.pdf"), path))
+    assert rejected.value.status_code == 413
+
+
+def test_unknown_tenant_is_404(db_path):
+    with pytest.raises(HTTPException) as unknown:
+        server._tenant_store("nobody")
+    assert unknown.value.status_code == 404
@@ -0,0 +1,45 @@
+import pytest
+
+vector_store = pytest.importorskip("vector_store")
+from config import Config  # noqa: E402
+
+
+@pytest.fixture
+def stores(db_path, engine, monkeypatch):
+    monkeypatch.setattr(vector_store, "get_embedding_engine", lambda: engine)
+    return vector_store
+
+
+def collection_names(stores):
+    return {collection.name for collection in stores._get_client().list_collections()}
+
+
+def test_lookup_of_unknown_tenant_creates_nothing(stores):
+    assert stores.find_vector_store("nobody") is None
+    assert stores.collection_name_for("nobody") not in collection_names(stores)
+    assert "nobody" not in stores._vector_stores
+
+
+def test_lookup_finds_tenant_created_by_ingest(stores):
+    stores.get_vector_store("acme").ingest(["Refunds take 14 days."], "a.pdf")
+    stores._vector_stores.clear()  # As after a restart
+    store = stores.find_vector_store("acme")
+    assert store is not None and store.get_collection_info()["document_count"] == 1
+
+
+def test_idle_tenant_stores_are_evicted(stores, monkeypatch):
+    monkeypatch.setattr(Config, "MAX_OPEN_TENANTS", 2)
+    default = stores.get_vector_store()
+    for tenant in ("a", "b", "c"):
+        stores.get_vector_store(tenant)
+    assert list(stores._vector_stores) == [None, "c"]
+    assert stores.get_vector_store() is default
+
+
+def test_busy_tenant_store_is_kept(stores, monkeypatch):
+    monkeypatch.setattr(Config, "MAX_OPEN_TENANTS", 1)
+    busy = stores.get_vector_store("a")
+    busy.rebuild_status = {"state": "running"}
+    stores.get_vector_store("b")
+    assert list(stores._vector_stores) == ["a", "b"]
+    assert stores.get_vector_store("a") is busy
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from config import Config
+from vector_tier import CompactVectorIndex
+
+
+def unit_vectors(count, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_tier(path, dtype="int8", compact_ratio=0.5):
+    return CompactVectorIndex(str(path), dtype=dtype, compact_ratio=compact_ratio)
+
+
+def top_ids(tier, queries, k):
+    return [[rid for rid, _ in result] for result in tier.search(queries, k)]
+
+
+@pytest.mark.parametrize("dtype", ["fp16", "int8"])
+def test_removed_records_stay_removed_after_reload(tmp_path, dtype):
+    vectors = unit_vectors(20)
+    ids = [f"r{i}" for i in range(20)]
+    tier = make_tier(tmp_path, dtype)
+    tier.add(ids, vectors)
+    tier.remove(["r3", "r7"])
+    tier.save()
+
+    reloaded = make_tier(tmp_path, dtype)
+    assert len(reloaded) == 18
+    assert top_ids(reloaded, vectors[[3, 7, 5]], 1)[2] == ["r5"]
+    assert not {"r3", "r7"} & {rid for result in top_ids(reloaded, vectors[[3, 7]], 5) for rid in result}
+
+
+def test_compaction_keeps_results(tmp_path):
+    vectors = unit_vectors(20)
+    tier = make_tier(tmp_path, compact_ratio=0.2)
+    tier.add([f"r{i}" for i in range(20)], vectors)
+    tier.remove([f"r{i}" for i in range(10)])
+    tier.save()
+    assert tier.stats()["rows"] == 10
+
+    reloaded = make_tier(tmp_path, compact_ratio=0.2)
+    assert reloaded.stats()["rows"] == 10
+    assert [result[0] for result in top_ids(reloaded, vectors[10:], 3)] == [f"r{i}" for i in range(10, 20)]
+
+
+def test_rows_of_an_unsaved_add_are_ignored_on_reload(tmp_path):
+    vectors = unit_vectors(4)
+    tier = make_tier(tmp_path)
+    tier.add(["a", "b"], vectors[:2])
+    tier.save()
+    tier.add(["c", "d"], vectors[2:])
+
+    reloaded = make_tier(tmp_path)
+    assert len(reloaded) == 2
+    reloaded.add(["e"], vectors[3:])
+    assert top_ids(reloaded, vectors[3:], 1) == [["e"]]
+
+
+def test_store_tier_follows_removals_across_restarts(make_store, monkeypatch):
+    pytest.importorskip("chromadb")
+    monkeypatch.setattr(Config, "VECTOR_TIER", "int8")
+    store = make_store()
+    store.ingest(["Refunds take 14 days.", "Returns need a receipt."], "policy.pdf")
+    store.ingest(["Gift cards never expire."], "cards.pdf")
+    store.remove("policy.pdf")
+
+    # The saved tier must load as is rather than be rebuilt from the collection
+    def rebuild(self):
+        raise AssertionError("vector tier was rebuilt")
+
+    monkeypatch.setattr(type(store), "_rebuild_vector_tier", rebuild)
+    restarted = make_store()
+    assert len(restarted.vector_tier) == restarted.collection.count() == 1
+    hits = restarted.similarity_search("Refunds take 14 days.", k=3)
+    assert [hit["metadata"]["filename"] for hit in hits] == ["cards.pdf"]
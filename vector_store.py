@@ -8,41 +8,387 @@ except ImportError:
 
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, cast
+from typing import List, Dict, Any, Callable, Optional, Tuple, cast
+import argparse
 import hashlib
+import json
 import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
 from config import Config
+from manifest import ChunkManifest
+from lexical_index import LexicalIndex
+from vector_tier import CompactVectorIndex
+from embeddings import EmbeddingEngine, get_embedding_engine
+from metrics import count, span, timed
+
+# Bumped on every write to any store, so caches of search results know when to drop them
+_generation = 0
+_generation_lock = threading.Lock()
+
+def _bump_generation() -> None:
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+_client: Optional[Any] = None
+_client_lock = threading.Lock()
+
+def _get_client() -> Any:
+    """One ChromaDB client per process, shared by every tenant's store"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                os.makedirs(Config.VECTOR_DB_PATH, exist_ok=True)
+                _client = chromadb.PersistentClient(
+                    path=Config.VECTOR_DB_PATH,
+                    settings=Settings(anonymized_telemetry=False)
+                )
+    return _client
+
+def collection_name_for(tenant: Optional[str]) -> str:
+    """Collection holding a tenant's documents; None is the shared default collection"""
+    if tenant is None:
+        return Config.COLLECTION_NAME
+    # Collection names allow only [A-Za-z0-9._-]; the hash keeps distinct tenants distinct
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "-", tenant).strip("-")[:32] or "tenant"
+    digest = hashlib.sha256(tenant.encode("utf-8")).hexdigest()[:8]
+    return f"{Config.COLLECTION_NAME}-{slug}-{digest}"
+
+def read_hnsw_header(path: str) -> Optional[Tuple[int, int]]:
+    """(max_elements, cur_element_count) from a persisted Chroma HNSW header.bin, or None if unreadable"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(28)
+        # Chroma's hnswlib prefixes the header with an int persistence version,
+        # then offsetLevel0, max_elements, cur_element_count, ... as size_t
+        _, capacity, elements = struct.unpack_from("<QQQ", data, 4)
+    except (OSError, struct.error):
+        return None
+    if elements > capacity:
+        # Not a header layout we know; better no numbers than wrong ones
+        return None
+    return capacity, elements
 
 class VectorStoreManager:
     """Manages vector database operations using ChromaDB"""
     
-    def __init__(self):
-        # Initialize sentence transformer for embeddings
-        self.embedding_model = SentenceTransformer(Config.EMBEDDING_MODEL)
+    # Keeps id lists below SQLite's bound-parameter limit
+    _ID_BATCH_SIZE = 500
+    
+    def __init__(self, embedding_model: Optional[EmbeddingEngine] = None, tenant: Optional[str] = None):
+        # Sentence transformer for embeddings, shared process-wide by default
+        self.embedding_model = embedding_model or get_embedding_engine()
+        
+        # Serializes writers; queries run concurrently
+        self._write_lock = threading.RLock()
+        
+        # Each tenant gets its own collection, so its HNSW index only holds its own chunks
+        self.tenant = tenant
+        self.collection_name = collection_name_for(tenant)
         
         # Initialize ChromaDB
-        os.makedirs(Config.VECTOR_DB_PATH, exist_ok=True)
-        self.client = chromadb.PersistentClient(
-            path=Config.VECTOR_DB_PATH,
-            settings=Settings(anonymized_telemetry=False)
-        )
+        self.client = _get_client()
         
         # Get or create collection
         try:
-            self.collection = self.client.get_collection(name=Config.COLLECTION_NAME)
+            self.collection = self.client.get_collection(name=self.collection_name)
         except:
-            self.collection = self.client.create_collection(
-                name=Config.COLLECTION_NAME,
-                metadata={"hnsw:space": "cosine"}
+            self.collection = self._recover_interrupted_swap() or self.client.create_collection(
+                name=self.collection_name,
+                metadata=self._hnsw_metadata()
+            )
+        self.rebuild_status: Dict[str, Any] = {"state": "idle"}
+        self._rebuild_lock = threading.Lock()
+        self._retire_timer: Optional[threading.Timer] = None
+        self._segment_dirs: Dict[Any, Optional[str]] = {}
+        
+        # Which chunks belong to which file, for incremental re-ingestion
+        self.manifest = ChunkManifest(
+            os.path.join(Config.VECTOR_DB_PATH, Config.MANIFEST_FILE),
+            self.collection_name
+        )
+        
+        # BM25 index over the same records, for exact identifiers dense search ranks badly
+        lexical_file = Config.LEXICAL_INDEX_FILE if tenant is None else f"{self.collection_name}.{Config.LEXICAL_INDEX_FILE}"
+        self.lexical_index = LexicalIndex(os.path.join(Config.VECTOR_DB_PATH, lexical_file))
+        if len(self.lexical_index) != self.collection.count():
+            self._rebuild_lexical_index()
+        
+        # Quantized copy of the embeddings, searched exhaustively instead of the HNSW index
+        self.vector_tier: Optional[CompactVectorIndex] = None
+        if Config.VECTOR_TIER != "off":
+            tier_dir = Config.VECTOR_TIER_DIR if tenant is None else f"{self.collection_name}.{Config.VECTOR_TIER_DIR}"
+            self.vector_tier = CompactVectorIndex(
+                os.path.join(Config.VECTOR_DB_PATH, tier_dir),
+                dtype=Config.VECTOR_TIER,
+                rescore=Config.VECTOR_TIER_RESCORE,
+                block_rows=Config.VECTOR_TIER_BLOCK_ROWS,
+                compact_ratio=Config.VECTOR_TIER_COMPACT_RATIO
             )
+            if len(self.vector_tier) != self.collection.count():
+                self._rebuild_vector_tier()
+        
+        # Cumulative ingest counters for this process
+        self.ingest_stats: Dict[str, int] = {}
+    
+    def _hnsw_metadata(self) -> Dict[str, Any]:
+        """Collection metadata fixing the HNSW settings when a collection is created"""
+        return {
+            "hnsw:space": "cosine",
+            "hnsw:M": Config.HNSW_M,
+            "hnsw:construction_ef": Config.HNSW_CONSTRUCTION_EF,
+            "hnsw:search_ef": Config.HNSW_SEARCH_EF
+        }
+    
+    def _recover_interrupted_swap(self) -> Optional[Any]:
+        """The collection a rebuild had renamed away when the process stopped mid-swap, renamed back"""
+        try:
+            collection = self.client.get_collection(name=f"{self.collection_name}-retired")
+        except Exception:
+            return None
+        collection.modify(name=self.collection_name)
+        return collection
+    
+    @property
+    def generation(self) -> int:
+        """Counter that changes whenever any store in this process is written to"""
+        return _generation
+    
+    def _rebuild_lexical_index(self) -> None:
+        """Re-index every stored chunk, for stores created before the index or out of sync with it"""
+        self.lexical_index.clear()
+        offset = 0
+        while True:
+            batch = self.collection.get(limit=self._ID_BATCH_SIZE, offset=offset, include=["documents"])
+            if not batch["ids"]:
+                break
+            self.lexical_index.add(zip(batch["ids"], batch["documents"]))
+            offset += len(batch["ids"])
+        self.lexical_index.save()
+    
+    def _rebuild_vector_tier(self) -> None:
+        """Copy every stored embedding into the vector tier, for a new tier or one out of sync"""
+        self.vector_tier.clear()
+        offset = 0
+        while True:
+            batch = self.collection.get(limit=self._ID_BATCH_SIZE, offset=offset, include=["embeddings"])
+            if not batch["ids"]:
+                break
+            self.vector_tier.add(batch["ids"], np.asarray(batch["embeddings"], dtype=np.float32))
+            offset += len(batch["ids"])
+        self.vector_tier.save()
     
-    def _generate_document_id(self, filename: str, chunk_index: int) -> str:
-        """Generate unique ID for document chunk"""
-        content = f"{filename}_{chunk_index}"
-        return hashlib.md5(content.encode()).hexdigest()
+    def _forget_records(self, ids: List[str]) -> None:
+        """Delete records from the collection and the side indexes"""
+        self._delete_in_batches(ids)
+        self.lexical_index.remove(ids)
+        if self.vector_tier is not None:
+            self.vector_tier.remove(ids)
     
-    def add_documents(self, chunks: List[str], filename: str) -> bool:
+    def _save_indexes(self) -> None:
+        self.lexical_index.save()
+        if self.vector_tier is not None:
+            self.vector_tier.save()
+    
+    def _content_hash(self, chunk: str) -> str:
+        """Hash identifying a chunk's text, independent of the file it came from"""
+        return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+    
+    def _generate_document_id(self, filename: str, content_hash: str) -> str:
+        """Generate unique ID for a file's copy of a chunk"""
+        content = f"{filename}\0{content_hash}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    
+    def _chunk_metadata(self, filename: str, chunk_index: int, chunk: str, content_hash: str,
+                        extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        metadata = dict(extra or {})
+        metadata.update({
+            "filename": str(filename),
+            "chunk_index": int(chunk_index),
+            "chunk_length": int(len(chunk)),
+            "content_hash": content_hash
+        })
+        return metadata
+    
+    def _get_in_batches(self, ids: List[str], include: List[str]) -> Dict[str, Any]:
+        """collection.get by id, split to stay below SQLite's bound-parameter limit"""
+        merged: Dict[str, Any] = {"ids": [], **{field: [] for field in include}}
+        for start in range(0, len(ids), self._ID_BATCH_SIZE):
+            result = self.collection.get(ids=ids[start:start + self._ID_BATCH_SIZE], include=include)
+            merged["ids"].extend(result["ids"])
+            for field in include:
+                merged[field].extend(result[field])
+        return merged
+    
+    def _delete_in_batches(self, ids: List[str]) -> None:
+        for start in range(0, len(ids), self._ID_BATCH_SIZE):
+            self.collection.delete(ids=ids[start:start + self._ID_BATCH_SIZE])
+    
+    def _vectors_by_content_hash(self, content_hashes: List[str]) -> Dict[str, List[float]]:
+        """Embeddings already stored for any of the given chunk texts, from any file"""
+        vectors: Dict[str, List[float]] = {}
+        for start in range(0, len(content_hashes), self._ID_BATCH_SIZE):
+            batch = content_hashes[start:start + self._ID_BATCH_SIZE]
+            result = self.collection.get(
+                where={"content_hash": {"$in": batch}},
+                include=["embeddings", "metadatas"]
+            )
+            for embedding, metadata in zip(result["embeddings"], result["metadatas"]):
+                vectors.setdefault(metadata["content_hash"], list(embedding))
+        return vectors
+    
+    def _plan_ingest(self, chunks: List[str], filename: str,
+                     metadatas: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Work out which chunks of a file are unchanged, reusable or need embedding"""
+        content_hashes = [self._content_hash(chunk) for chunk in chunks]
+        # First position of each distinct chunk; repeats within a file are stored once
+        positions: Dict[str, int] = {}
+        for i, content_hash in enumerate(content_hashes):
+            positions.setdefault(content_hash, i)
+        record_ids = {content_hash: self._generate_document_id(filename, content_hash) for content_hash in positions}
+        chunk_metadatas = {
+            content_hash: self._chunk_metadata(
+                filename, position, chunks[position], content_hash,
+                metadatas[position] if metadatas else None
+            )
+            for content_hash, position in positions.items()
+        }
+        
+        previous_hashes = self.manifest.get_file(filename)
+        if previous_hashes is None:
+            # Records written before the manifest existed (or by an interrupted
+            # ingest) are only reachable through their filename metadata
+            stored = self.collection.get(where={"filename": str(filename)}, include=[])["ids"]
+        else:
+            stored = [self._generate_document_id(filename, content_hash) for content_hash in dict.fromkeys(previous_hashes)]
+        stored_ids = set(stored)
+        wanted = set(record_ids.values())
+        
+        # This file's own records that survive the edit; their position or page may have moved
+        existing = self._get_in_batches([rid for rid in record_ids.values() if rid in stored_ids], ["metadatas"])
+        existing_by_id = dict(zip(existing["ids"], existing["metadatas"]))
+        moved = []
+        for content_hash, rid in record_ids.items():
+            metadata = existing_by_id.get(rid)
+            if metadata is not None and metadata != chunk_metadatas[content_hash]:
+                moved.append((rid, chunk_metadatas[content_hash]))
+        
+        missing = [content_hash for content_hash, rid in record_ids.items() if rid not in existing_by_id]
+        copied = self._vectors_by_content_hash(missing)
+        to_encode = [content_hash for content_hash in missing if content_hash not in copied]
+        return {
+            "filename": filename,
+            "chunks": chunks,
+            "content_hashes": content_hashes,
+            "positions": positions,
+            "record_ids": record_ids,
+            "metadatas": chunk_metadatas,
+            "moved": moved,
+            "copied": copied,
+            "to_encode": to_encode,
+            "encode_texts": [chunks[positions[content_hash]] for content_hash in to_encode],
+            "removed_ids": [rid for rid in stored if rid not in wanted],
+        }
+    
+    def _upsert_records(self, plan: Dict[str, Any], content_hashes: List[str], vectors: np.ndarray) -> None:
+        """Store a plan's records for the given chunk texts, in the collection and the side indexes"""
+        if not content_hashes:
+            return
+        ids = [plan["record_ids"][content_hash] for content_hash in content_hashes]
+        documents = [plan["chunks"][plan["positions"][content_hash]] for content_hash in content_hashes]
+        with span("chroma_upsert"):
+            # ChromaDB 0.4 only accepts embeddings as Python lists
+            self.collection.upsert(
+                ids=ids,
+                embeddings=vectors.tolist(),
+                documents=documents,
+                metadatas=[plan["metadatas"][content_hash] for content_hash in content_hashes]
+            )
+        with span("bm25_add"):
+            self.lexical_index.add(zip(ids, documents))
+        if self.vector_tier is not None:
+            with span("tier_add"):
+                self.vector_tier.add(ids, vectors)
+        count("chunks_written", len(ids))
+    
+    def _commit_ingest(self, plan: Dict[str, Any], embeddings: Optional[np.ndarray]) -> Dict[str, int]:
+        """
+        Write a plan's new and moved chunks, drop removed ones and update the manifest
+        
+        embeddings holds one row per plan["to_encode"] entry, or is None when those
+        records were already streamed in with _upsert_records.
+        """
+        filename = plan["filename"]
+        positions = plan["positions"]
+        
+        if plan["copied"]:
+            self._upsert_records(plan, list(plan["copied"]), np.asarray(list(plan["copied"].values()), dtype=np.float32))
+        if embeddings is not None:
+            self._upsert_records(plan, plan["to_encode"], embeddings)
+        
+        if plan["moved"]:
+            self.collection.update(
+                ids=[rid for rid, _ in plan["moved"]],
+                metadatas=[metadata for _, metadata in plan["moved"]]
+            )
+        
+        self._forget_records(plan["removed_ids"])
+        self.manifest.replace_file(filename, plan["content_hashes"])
+        _bump_generation()
+        
+        stats = {
+            "chunks": len(plan["chunks"]),
+            "encoded": len(plan["to_encode"]),
+            "reused": len(positions) - len(plan["to_encode"]),
+            "deleted": len(plan["removed_ids"])
+        }
+        for key, value in stats.items():
+            self.ingest_stats[key] = self.ingest_stats.get(key, 0) + value
+        return stats
+    
+    @timed("ingest")
+    def ingest(self, chunks: List[str], filename: str,
+               metadatas: Optional[List[Dict[str, Any]]] = None,
+               progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        """
+        Incrementally index a file without any UI feedback, embedding only new chunk texts
+        
+        progress, if given, is called with (distinct chunks stored, distinct chunks
+        in the file) once planning is done and after each encoded batch is written.
+        """
+        with self._write_lock:
+            plan = self._plan_ingest(chunks, filename, metadatas)
+            total = len(plan["positions"])
+            done = total - len(plan["to_encode"])
+            if progress:
+                progress(done, total)
+            # Write each length-bucketed batch as soon as it is encoded, so a
+            # large document never holds all of its vectors in memory at once
+            streamed: List[str] = []
+            try:
+                for indices, vectors in self.embedding_model.iter_encode(plan["encode_texts"]):
+                    content_hashes = [plan["to_encode"][i] for i in indices]
+                    self._upsert_records(plan, content_hashes, vectors)
+                    streamed.extend(content_hashes)
+                    if progress:
+                        progress(done + len(streamed), total)
+            except Exception:
+                # Nothing in the manifest points at these yet; don't leave them orphaned
+                streamed_ids = [plan["record_ids"][content_hash] for content_hash in streamed]
+                self._forget_records(streamed_ids)
+                raise
+            stats = self._commit_ingest(plan, None)
+            self._save_indexes()
+            return stats
+    
+    def add_documents(self, chunks: List[str], filename: str,
+                      metadatas: Optional[List[Dict[str, Any]]] = None) -> bool:
         """Add document chunks to vector store"""
         try:
             if not chunks:
@@ -51,103 +397,471 @@ class VectorStoreManager:
             
             # Generate embeddings using sentence transformers
             with st.spinner("Generating embeddings..."):
-                embeddings = self.embedding_model.encode(chunks, convert_to_tensor=False)
-                # Convert to list of lists for ChromaDB
-                embeddings = embeddings.tolist()
-            
-            # Prepare data for ChromaDB
-            ids = [self._generate_document_id(filename, i) for i in range(len(chunks))]
-            metadatas = []
-            for i, chunk in enumerate(chunks):
-                metadata = {
-                    "filename": str(filename),
-                    "chunk_index": int(i),
-                    "chunk_length": int(len(chunk))
-                }
-                metadatas.append(metadata)
-            
-            # Add to collection
-            self.collection.add(
-                embeddings=embeddings,
-                documents=chunks,
-                metadatas=metadatas,
-                ids=ids
-            )
+                stats = self.ingest(chunks, filename, metadatas)
             
-            st.success(f"Successfully added {len(chunks)} chunks to vector store")
+            st.success(
+                f"Indexed {stats['chunks']} chunks from {filename}: "
+                f"{stats['encoded']} embedded, {stats['reused']} reused, {stats['deleted']} removed"
+            )
             return True
             
         except Exception as e:
             st.error(f"Error adding documents to vector store: {str(e)}")
             return False
     
-    def similarity_search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
-        """Perform similarity search for relevant document chunks"""
+    def remove(self, filename: str) -> int:
+        """Delete every chunk of a file without any UI feedback, returning the count removed"""
+        with self._write_lock:
+            stored = self.collection.get(where={"filename": str(filename)}, include=[])["ids"]
+            self._forget_records(stored)
+            self._save_indexes()
+            self.manifest.remove_file(filename)
+            _bump_generation()
+            return len(stored)
+    
+    def delete_document(self, filename: str) -> bool:
+        """Remove a single document from the vector store"""
         try:
-            # Generate query embedding using sentence transformers
-            query_embedding = self.embedding_model.encode([query], convert_to_tensor=False)
-            query_embedding = query_embedding.tolist()[0]
+            removed = self.remove(filename)
+            st.success(f"Removed {removed} chunks of {filename} from vector store")
+            return True
+        except Exception as e:
+            st.error(f"Error removing document from vector store: {str(e)}")
+            return False
+    
+    def _format_results(self, results: Dict[str, Any], query_index: int) -> List[Dict[str, Any]]:
+        """Turn one query's slice of a ChromaDB result into content/metadata/distance dicts"""
+        formatted_results = []
+        if results and results.get('documents') and len(results['documents']) > query_index and results['documents'][query_index]:
+            documents = results['documents'][query_index]
+            
+            # Safely get ids, metadatas and distances
+            ids_list = results.get('ids') or []
+            ids = ids_list[query_index] if len(ids_list) > query_index else []
+            metadatas_list = results.get('metadatas') or []
+            metadatas = metadatas_list[query_index] if len(metadatas_list) > query_index else []
+            distances_list = results.get('distances') or []
+            distances = distances_list[query_index] if len(distances_list) > query_index else []
             
-            # Search in ChromaDB
+            for i in range(len(documents)):
+                formatted_results.append({
+                    'id': ids[i] if i < len(ids) else None,
+                    'content': documents[i],
+                    'metadata': metadatas[i] if i < len(metadatas) else {},
+                    'distance': distances[i] if i < len(distances) else 0.0
+                })
+        
+        return formatted_results
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embedding of a single query, as used by similarity_search"""
+        return self.embedding_model.encode([query])[0]
+    
+    def _scope_filter(self, filenames: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        """ChromaDB where clause restricting a query to the given files"""
+        if filenames is None:
+            return None
+        if len(filenames) == 1:
+            return {"filename": filenames[0]}
+        return {"filename": {"$in": list(filenames)}}
+    
+    def _scope_record_ids(self, filenames: List[str]) -> List[str]:
+        """Record ids of the chunks the manifest lists for the given files"""
+        record_ids = []
+        for filename in filenames:
+            for content_hash in dict.fromkeys(self.manifest.get_file(filename) or []):
+                record_ids.append(self._generate_document_id(filename, content_hash))
+        return record_ids
+    
+    def _search(self, queries: List[str], k: int, query_embeddings: Optional[np.ndarray] = None,
+                filenames: Optional[List[str]] = None, search_ef: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Encode queries in one forward pass and run them as one ChromaDB query
+        
+        HNSW searches with a candidate list of at least n_results, so search_ef
+        raises the collection's search ef for this query by asking for that many
+        results and keeping the best k. With the vector tier enabled the tier is
+        searched instead, and search_ef is the least number of first-pass
+        candidates it re-scores.
+        """
+        if not queries:
+            return []
+        if filenames is not None and not filenames:
+            return [[] for _ in queries]
+        
+        # Generate query embeddings using sentence transformers
+        if query_embeddings is None:
+            query_embeddings = self.embedding_model.encode(queries)
+        if self.vector_tier is not None:
+            return self._search_tier(query_embeddings, k, filenames, search_ef)
+        
+        # Search in ChromaDB
+        with span("chroma_query"):
             results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=k,
+                query_embeddings=query_embeddings.tolist(),
+                n_results=max(k, search_ef or 0),
+                where=self._scope_filter(filenames),
                 include=["documents", "metadatas", "distances"]
             )
-            
-            # Format results
-            formatted_results = []
-            if results and results.get('documents') and results['documents'] and results['documents'][0]:
-                documents = results['documents'][0]
-                
-                # Safely get metadatas
-                metadatas_list = results.get('metadatas', [[]])
-                metadatas = metadatas_list[0] if metadatas_list and len(metadatas_list) > 0 else []
-                
-                # Safely get distances
-                distances_list = results.get('distances', [[]])
-                distances = distances_list[0] if distances_list and len(distances_list) > 0 else []
-                
-                for i in range(len(documents)):
-                    formatted_results.append({
-                        'content': documents[i],
-                        'metadata': metadatas[i] if i < len(metadatas) else {},
-                        'distance': distances[i] if i < len(distances) else 0.0
-                    })
-            
-            return formatted_results
+        count("queries", len(queries))
+        return [self._format_results(results, i)[:k] for i in range(len(queries))]
+    
+    def _search_tier(self, query_embeddings: np.ndarray, k: int, filenames: Optional[List[str]],
+                     search_ef: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """Search the vector tier, then fetch the hits' text and metadata from ChromaDB"""
+        within = None if filenames is None else self._scope_record_ids(filenames)
+        # The tier's candidate list is rescore * k, so widen rescore until it holds search_ef
+        rescore = max(self.vector_tier.rescore, -(-search_ef // k)) if search_ef and k else None
+        with span("tier_query"):
+            hits = self.vector_tier.search(query_embeddings, k, within, rescore)
+        count("queries", len(hits))
+        fetched = self._get_in_batches(list({rid for result in hits for rid, _ in result}), ["documents", "metadatas"])
+        by_id = {rid: (document, metadata) for rid, document, metadata in zip(
+            fetched["ids"], fetched["documents"], fetched["metadatas"]
+        )}
+        # Cosine distance, as ChromaDB reports it for the collection's cosine space
+        return [
+            [{'id': rid, 'content': by_id[rid][0], 'metadata': by_id[rid][1], 'distance': 1.0 - similarity}
+             for rid, similarity in result if rid in by_id]
+            for result in hits
+        ]
+    
+    @timed("similarity_search")
+    def similarity_search(self, query: str, k: int = 3, query_embedding: Optional[np.ndarray] = None,
+                          filenames: Optional[List[str]] = None, search_ef: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Perform similarity search for relevant document chunks, optionally only within the given files"""
+        try:
+            query_embeddings = None if query_embedding is None else np.asarray(query_embedding).reshape(1, -1)
+            return self._search([query], k, query_embeddings, filenames, search_ef)[0]
             
         except Exception as e:
             st.error(f"Error during similarity search: {str(e)}")
             return []
     
+    def similarity_search_batch(self, queries: List[str], k: int = 3, filenames: Optional[List[str]] = None,
+                                search_ef: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """Similarity search for many queries at once, one result list per query in input order"""
+        try:
+            results: List[List[Dict[str, Any]]] = []
+            # Bound the size of a single encode/query call for very large batches
+            for start in range(0, len(queries), Config.SEARCH_BATCH_SIZE):
+                batch = queries[start:start + Config.SEARCH_BATCH_SIZE]
+                results.extend(self._search(batch, k, filenames=filenames, search_ef=search_ef))
+            return results
+            
+        except Exception as e:
+            st.error(f"Error during batch similarity search: {str(e)}")
+            return [[] for _ in queries]
+    
+    @timed("hybrid_search")
+    def hybrid_search(self, query: str, k: int = 3, query_embedding: Optional[np.ndarray] = None,
+                      timings: Optional[Dict[str, float]] = None, filenames: Optional[List[str]] = None,
+                      search_ef: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Fuse vector and BM25 results with reciprocal rank fusion
+        
+        If filenames is given both searches only consider chunks of those files.
+        If a timings dict is passed it is filled with vector_s, lexical_s and
+        fusion_s. Results have the same shape as similarity_search, plus rrf_score.
+        """
+        try:
+            candidates = max(k, Config.HYBRID_CANDIDATES)
+            
+            start = time.perf_counter()
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
+            query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+            dense = self._search([query], candidates, query_embedding.reshape(1, -1), filenames, search_ef)[0]
+            vector_s = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            within = None if filenames is None else self._scope_record_ids(filenames)
+            with span("bm25_search"):
+                lexical = self.lexical_index.search(query, candidates, within)
+            lexical_s = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            fused: Dict[str, float] = {}
+            for ranking in ([result['id'] for result in dense], [rid for rid, _ in lexical]):
+                for rank, rid in enumerate(ranking):
+                    fused[rid] = fused.get(rid, 0.0) + 1.0 / (Config.RRF_K + rank + 1)
+            top = sorted(fused, key=lambda rid: -fused[rid])[:k]
+            
+            by_id = {result['id']: result for result in dense}
+            missing = [rid for rid in top if rid not in by_id]
+            if missing and self.vector_tier is not None:
+                # Lexical-only hits; score them against the query like the dense ones
+                similarities = self.vector_tier.similarities(query_embedding, missing)
+                fetched = self._get_in_batches(missing, ["documents", "metadatas"])
+                for rid, document, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+                    distance = 1.0 - similarities[rid] if rid in similarities else 1.0
+                    by_id[rid] = {'id': rid, 'content': document, 'metadata': metadata, 'distance': distance}
+            elif missing:
+                # Lexical-only hits; score them against the query like the dense ones
+                fetched = self._get_in_batches(missing, ["documents", "metadatas", "embeddings"])
+                norm = np.linalg.norm(query_embedding) or 1.0
+                for rid, document, metadata, embedding in zip(
+                    fetched["ids"], fetched["documents"], fetched["metadatas"], fetched["embeddings"]
+                ):
+                    embedding = np.asarray(embedding, dtype=np.float32)
+                    similarity = float(embedding @ query_embedding) / ((np.linalg.norm(embedding) or 1.0) * norm)
+                    by_id[rid] = {'id': rid, 'content': document, 'metadata': metadata, 'distance': 1.0 - similarity}
+            
+            results = [dict(by_id[rid], rrf_score=fused[rid]) for rid in top if rid in by_id]
+            if timings is not None:
+                timings.update({
+                    "vector_s": vector_s,
+                    "lexical_s": lexical_s,
+                    "fusion_s": time.perf_counter() - start
+                })
+            return results
+            
+        except Exception as e:
+            st.error(f"Error during hybrid search: {str(e)}")
+            return []
+    
     def get_collection_info(self) -> Dict[str, Any]:
         """Get information about the current collection"""
         try:
             count = self.collection.count()
             return {
                 "document_count": count,
-                "collection_name": Config.COLLECTION_NAME
+                "collection_name": self.collection_name,
+                "files": self.manifest.list_files(),
+                "ingest_stats": dict(self.ingest_stats),
+                "embedding_cache": self.embedding_model.cache.stats() if self.embedding_model.cache else {},
+                "index": self.index_stats(count),
+                "vector_tier": self.vector_tier.stats() if self.vector_tier is not None else {}
             }
         except Exception as e:
             st.error(f"Error getting collection info: {str(e)}")
-            return {"document_count": 0, "collection_name": Config.COLLECTION_NAME}
+            return {
+                "document_count": 0,
+                "collection_name": self.collection_name,
+                "files": [],
+                "ingest_stats": {},
+                "embedding_cache": {},
+                "index": {},
+                "vector_tier": {}
+            }
+    
+    def _segment_dir(self) -> Optional[str]:
+        """On-disk directory of the collection's HNSW segment, if ChromaDB exposes it"""
+        collection_id = getattr(self.collection, "id", None)
+        if collection_id not in self._segment_dirs:
+            directory = None
+            try:
+                from chromadb.types import SegmentScope
+                server = getattr(self.client, "_server", self.client)
+                for segment in server._sysdb.get_segments(collection=collection_id, scope=SegmentScope.VECTOR):
+                    directory = os.path.join(Config.VECTOR_DB_PATH, str(segment["id"]))
+            except Exception:
+                pass
+            self._segment_dirs[collection_id] = directory
+        return self._segment_dirs[collection_id]
+    
+    def index_stats(self, record_count: Optional[int] = None) -> Dict[str, Any]:
+        """
+        HNSW settings, on-disk size and deleted-but-still-linked elements of the index
+        
+        Element counts come from the last persisted HNSW header, so they lag
+        the collection by up to Chroma's sync threshold.
+        """
+        metadata = self.collection.metadata or {}
+        params = {key[len("hnsw:"):]: value for key, value in metadata.items() if key.startswith("hnsw:")}
+        configured = {key[len("hnsw:"):]: value for key, value in self._hnsw_metadata().items()}
+        stats: Dict[str, Any] = {
+            "hnsw": params,
+            "settings_changed": any(params.get(key, value) != value for key, value in configured.items()),
+            "rebuild": dict(self.rebuild_status)
+        }
+        directory = self._segment_dir()
+        if not directory or not os.path.isdir(directory):
+            return stats
+        stats["size_bytes"] = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        header = read_hnsw_header(os.path.join(directory, "header.bin"))
+        if header is None:
+            return stats
+        capacity, elements = header
+        records = self.collection.count() if record_count is None else record_count
+        tombstones = max(0, elements - records)
+        stats.update({
+            "capacity": capacity,
+            "elements": elements,
+            "tombstones": tombstones,
+            "tombstone_ratio": tombstones / elements if elements else 0.0,
+            "rebuild_recommended": bool(elements) and tombstones / elements >= Config.HNSW_REBUILD_TOMBSTONE_RATIO
+        })
+        return stats
+    
+    def rebuild_index(self) -> Dict[str, Any]:
+        """
+        Copy every record into a new collection built with the current HNSW settings and swap it in
+        
+        This drops the tombstones deletes leave in the graph and applies changed
+        HNSW_* settings. Writers wait until the swap; queries keep using the old
+        collection until then, and it is deleted HNSW_RETIRE_DELAY_S later so
+        queries already running on it can finish.
+        """
+        with self._write_lock:
+            start = time.perf_counter()
+            staging_name = f"{self.collection_name}-rebuild"
+            retired_name = f"{self.collection_name}-retired"
+            # Leftovers of an interrupted or still retiring earlier rebuild
+            if self._retire_timer is not None:
+                self._retire_timer.cancel()
+            for name in (staging_name, retired_name):
+                self._drop_collection(name)
+            staging = self.client.create_collection(name=staging_name, metadata=self._hnsw_metadata())
+            
+            copied = 0
+            while True:
+                batch = self.collection.get(
+                    limit=self._ID_BATCH_SIZE, offset=copied, include=["embeddings", "documents", "metadatas"]
+                )
+                if not batch["ids"]:
+                    break
+                staging.upsert(
+                    ids=batch["ids"],
+                    embeddings=batch["embeddings"],
+                    documents=batch["documents"],
+                    metadatas=batch["metadatas"]
+                )
+                copied += len(batch["ids"])
+                self.rebuild_status["copied"] = copied
+            
+            # Swap names, then the handle queries read; a crash in between is undone on next start
+            old = self.collection
+            old.modify(name=retired_name)
+            staging.modify(name=self.collection_name)
+            self.collection = staging
+            self._retire_timer = threading.Timer(Config.HNSW_RETIRE_DELAY_S, self._drop_collection, args=(retired_name,))
+            self._retire_timer.daemon = True
+            self._retire_timer.start()
+            return {"records": copied, "elapsed_s": time.perf_counter() - start}
+    
+    def _drop_collection(self, name: str) -> None:
+        try:
+            self.client.delete_collection(name)
+        except Exception:
+            pass
+    
+    def is_busy(self) -> bool:
+        """Whether a write or a rebuild is running on this store right now"""
+        if self.rebuild_status.get("state") == "running":
+            return True
+        if not self._write_lock.acquire(blocking=False):
+            return True
+        self._write_lock.release()
+        return False
+    
+    def start_rebuild(self) -> bool:
+        """Run rebuild_index on a background thread; False if one is already running"""
+        with self._rebuild_lock:
+            if self.rebuild_status.get("state") == "running":
+                return False
+            self.rebuild_status = {"state": "running", "started_at": time.time(), "copied": 0}
+        
+        def run() -> None:
+            try:
+                result = self.rebuild_index()
+                self.rebuild_status.update(state="done", finished_at=time.time(), **result)
+            except Exception as e:
+                self.rebuild_status.update(state="failed", finished_at=time.time(), error=str(e))
+        
+        threading.Thread(target=run, name="docexpy-rebuild", daemon=True).start()
+        return True
     
     def clear_collection(self) -> bool:
         """Clear all documents from the collection"""
+        with self._write_lock:
+            return self._clear_collection()
+    
+    def _clear_collection(self) -> bool:
         try:
-            # Delete the existing collection
-            self.client.delete_collection(name=Config.COLLECTION_NAME)
-            
-            # Create a new empty collection
-            self.collection = self.client.create_collection(
-                name=Config.COLLECTION_NAME,
-                metadata={"hnsw:space": "cosine"}
-            )
+            # Delete records in place rather than dropping the collection, so
+            # sessions querying the shared instance never see a deleted collection
+            while True:
+                batch = self.collection.get(limit=self._ID_BATCH_SIZE, include=[])
+                if not batch["ids"]:
+                    break
+                self.collection.delete(ids=batch["ids"])
+            self.lexical_index.clear()
+            if self.vector_tier is not None:
+                self.vector_tier.clear()
+            self._save_indexes()
+            self.manifest.clear()
+            _bump_generation()
             
             st.success("Vector store cleared successfully")
             return True
             
         except Exception as e:
             st.error(f"Error clearing vector store: {str(e)}")
-            return False 
+            return False
+
+
+# Least recently used last; the default store and busy stores are never evicted
+_vector_stores: "OrderedDict[Optional[str], VectorStoreManager]" = OrderedDict()
+_vector_store_lock = threading.Lock()
+
+def get_vector_store(tenant: Optional[str] = None) -> VectorStoreManager:
+    """Return the process-wide vector store for a tenant (None for the default one), creating it on first use"""
+    with _vector_store_lock:
+        store = _vector_stores.get(tenant)
+        if store is None:
+            store = VectorStoreManager(tenant=tenant)
+            _vector_stores[tenant] = store
+            _evict_idle_stores()
+        else:
+            _vector_stores.move_to_end(tenant)
+    return store
+
+def find_vector_store(tenant: Optional[str] = None) -> Optional[VectorStoreManager]:
+    """Like get_vector_store, but None for a tenant that has no collection yet instead of creating one"""
+    if tenant is not None and tenant not in _vector_stores:
+        try:
+            _get_client().get_collection(name=collection_name_for(tenant))
+        except Exception:
+            return None
+    return get_vector_store(tenant)
+
+def _evict_idle_stores() -> None:
+    """Drop the least recently used tenant stores beyond MAX_OPEN_TENANTS; call with _vector_store_lock held"""
+    excess = len(_vector_stores) - Config.MAX_OPEN_TENANTS
+    # The last one is the store being handed out
+    for tenant in list(_vector_stores)[:-1]:
+        if excess <= 0:
+            break
+        if tenant is not None and not _vector_stores[tenant].is_busy():
+            del _vector_stores[tenant]
+            excess -= 1
+
+def is_vector_store_loaded() -> bool:
+    """Whether the shared vector store has been initialized in this process"""
+    return None in _vector_stores
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vector store maintenance; run it while nothing else writes to the store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (("stats", "Print HNSW index settings, size and tombstones, and vector tier recall"),
+                               ("rebuild", "Rebuild the HNSW index with the current settings and swap it in")):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("--tenant", default=None)
+    args = parser.parse_args()
+    
+    store = VectorStoreManager(tenant=args.tenant)
+    if args.command == "rebuild":
+        print(json.dumps(store.rebuild_index()))
+        # Nothing queries the old collection in this process, so drop it now
+        store._retire_timer.cancel()
+        store._drop_collection(f"{store.collection_name}-retired")
+    stats = store.index_stats()
+    if store.vector_tier is not None:
+        # Stored vectors as queries; the exact top-k is a float32 scan of the whole tier
+        queries = store.vector_tier.sample(200)
+        stats["vector_tier"] = dict(store.vector_tier.stats(), recall_at_10=store.vector_tier.recall(queries, 10))
+    print(json.dumps(stats, default=str, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class CompactVectorIndex:
+    """
+    Quantized copy of a collection's embeddings in memory-mapped files, searched exhaustively
+
+    Vectors are stored unit-normalized twice: as float16 or int8 codes (int8 with
+    one scale per row) that the first pass scans block by block, and as float32
+    rows that only the best rescore * k candidates are read from to re-score
+    them exactly. The first pass touches 2 (fp16) or about 1 (int8) bytes per
+    dimension instead of 4, and the float32 file is paged in a few rows at a time.
+
+    Rows are appended to the files as records are added and removed records are
+    tombstoned; the files are compacted on save once tombstones make up
+    compact_ratio of the rows. meta.json, written last, says how many rows are
+    valid, so rows appended by an ingest that never saved are ignored on load.
+    """
+
+    _ID_DTYPE = np.dtype("S64")  # Record ids are SHA-256 hex digests
+
+    def __init__(self, directory: str, dtype: str = "int8", rescore: int = 4,
+                 block_rows: int = 4096, compact_ratio: float = 0.2):
+        if dtype not in ("fp16", "int8"):
+            raise ValueError(f"Unknown vector tier type: {dtype}")
+        self.directory = directory
+        self.dtype = dtype
+        self.rescore = rescore
+        self.block_rows = block_rows
+        self.compact_ratio = compact_ratio
+        self._code_dtype = np.dtype(np.float16 if dtype == "fp16" else np.int8)
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._reset()
+        if os.path.exists(self._path("meta.json")):
+            try:
+                self._load()
+            except Exception:
+                # A corrupt or outdated tier is rebuilt from the collection by the caller
+                self._reset()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _reset(self) -> None:
+        self._dim = 0
+        self._rows = 0
+        self._ids: List[Optional[str]] = []
+        self._numbers: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def _row_files(self) -> List[Tuple[str, np.dtype, int]]:
+        """(file, dtype, values per row) of every per-row file"""
+        files = [("codes.bin", self._code_dtype, self._dim), ("vectors.bin", np.dtype(np.float32), self._dim),
+                 ("ids.bin", self._ID_DTYPE, 1)]
+        if self.dtype == "int8":
+            files.append(("scales.bin", np.dtype(np.float32), 1))
+        return files
+
+    def _map(self) -> None:
+        """Re-open the row files read-only at the current row count"""
+        if not self._rows:
+            self._codes = self._scales = self._vectors = None
+            return
+        shape = (self._rows, self._dim)
+        self._codes = np.memmap(self._path("codes.bin"), dtype=self._code_dtype, mode="r", shape=shape)
+        self._vectors = np.memmap(self._path("vectors.bin"), dtype=np.float32, mode="r", shape=shape)
+        if self.dtype == "int8":
+            self._scales = np.memmap(self._path("scales.bin"), dtype=np.float32, mode="r", shape=(self._rows,))
+
+    def _quantize(self, unit: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dtype == "fp16":
+            return unit.astype(np.float16), None
+        scales = np.abs(unit).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.rint(unit / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def add(self, record_ids: List[str], vectors: np.ndarray) -> None:
+        """Store vectors for record ids, replacing records that are already stored"""
+        if not record_ids:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        unit = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        codes, scales = self._quantize(unit)
+        with self._lock:
+            if not self._dim:
+                self._dim = unit.shape[1]
+            elif unit.shape[1] != self._dim:
+                raise ValueError(f"Vectors have {unit.shape[1]} dimensions, the tier holds {self._dim}")
+            for record_id in record_ids:
+                self._remove_one(record_id)
+            columns = {"codes.bin": codes, "vectors.bin": unit, "ids.bin": np.array(record_ids, dtype=self._ID_DTYPE),
+                       "scales.bin": scales}
+            for name, dtype, width in self._row_files():
+                with open(self._path(name), "r+b" if os.path.exists(self._path(name)) else "wb") as f:
+                    # Drop rows an unsaved ingest appended before the process stopped
+                    f.truncate(self._rows * width * dtype.itemsize)
+                    f.seek(0, os.SEEK_END)
+                    columns[name].tofile(f)
+            for record_id in record_ids:
+                self._numbers[record_id] = len(self._ids)
+                self._ids.append(record_id)
+            self._alive = np.concatenate([self._alive, np.ones(len(record_ids), dtype=bool)])
+            self._rows += len(record_ids)
+            self._map()
+            self._dirty = True
+
+    def _remove_one(self, record_id: str) -> None:
+        number = self._numbers.pop(record_id, None)
+        if number is not None:
+            self._ids[number] = None
+            self._alive[number] = False
+
+    def remove(self, record_ids: Iterable[str]) -> None:
+        with self._lock:
+            for record_id in record_ids:
+                self._remove_one(record_id)
+            self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self._dirty = True
+
+    def _scan(self, queries: np.ndarray, matrix: np.ndarray, scales: Optional[np.ndarray], alive: np.ndarray,
+              rows: Optional[np.ndarray], keep: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of the keep best live rows per query, unordered, scanning matrix block by block"""
+        if rows is None:
+            blocks = [slice(start, min(start + self.block_rows, len(alive)))
+                      for start in range(0, len(alive), self.block_rows)]
+        else:
+            blocks = [rows[start:start + self.block_rows] for start in range(0, len(rows), self.block_rows)]
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for block in blocks:
+            block_rows = np.arange(block.start, block.stop) if isinstance(block, slice) else block
+            scores = queries @ matrix[block].astype(np.float32).T
+            if scales is not None:
+                scores *= scales[block]
+            scores[:, ~alive[block_rows]] = -np.inf
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, np.broadcast_to(block_rows, scores.shape)], axis=1)
+            if best_scores.shape[1] > keep:
+                kept = np.argpartition(-best_scores, keep - 1, axis=1)[:, :keep]
+                best_scores = np.take_along_axis(best_scores, kept, axis=1)
+                best_rows = np.take_along_axis(best_rows, kept, axis=1)
+        return best_rows, best_scores
+
+    def _prepare(self, queries: np.ndarray) -> np.ndarray:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self._dim or np.shape(queries)[-1])
+        return queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+
+    def search(self, queries: np.ndarray, k: int, within: Optional[Iterable[str]] = None,
+               rescore: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k (record_id, cosine similarity) pairs per query row, best first
+
+        If within is given only those record ids are considered. Similarities
+        come from the float32 re-scoring, so they match an exact search.
+        """
+        queries = self._prepare(queries)
+        with self._lock:
+            codes, scales, vectors, ids = self._codes, self._scales, self._vectors, self._ids
+            alive = self._alive[:self._rows].copy()
+            rows = None
+            if within is not None:
+                rows = np.array(sorted(self._numbers[rid] for rid in within if rid in self._numbers), dtype=np.int64)
+        if codes is None or not k or (rows is not None and not len(rows)):
+            return [[] for _ in queries]
+
+        candidates = max(k, k * (self.rescore if rescore is None else rescore))
+        best_rows, best_scores = self._scan(queries, codes, scales, alive, rows, candidates)
+        results = []
+        for query, query_scores, query_rows in zip(queries, best_scores, best_rows):
+            # Sorted rows read the float32 file front to back
+            found = np.sort(query_rows[np.isfinite(query_scores)])
+            exact = vectors[found] @ query
+            order = np.argsort(-exact, kind="stable")
+            hits = [(ids[found[i]], float(exact[i])) for i in order]
+            results.append([(rid, score) for rid, score in hits if rid is not None][:k])
+        return results
+
+    def recall(self, queries: np.ndarray, k: int) -> Dict[str, float]:
+        """
+        Share of the exact float32 top-k that the tier returns, for the first pass
+        alone (rescore 1) and with the configured re-scoring
+        """
+        with self._lock:
+            vectors, ids = self._vectors, self._ids
+            alive = self._alive[:self._rows].copy()
+        if vectors is None or not len(queries):
+            return {"first_pass": 1.0, "rescored": 1.0}
+        queries = self._prepare(queries)
+        rows, scores = self._scan(queries, vectors, None, alive, None, k)
+        exact = [{ids[row] for row, score in zip(query_rows, query_scores) if np.isfinite(score)}
+                 for query_rows, query_scores in zip(rows, scores)]
+
+        def overlap(results: List[List[Tuple[str, float]]]) -> float:
+            shares = [len(truth & {rid for rid, _ in found}) / len(truth) for truth, found in zip(exact, results) if truth]
+            return sum(shares) / len(shares) if shares else 1.0
+
+        return {"first_pass": overlap(self.search(queries, k, rescore=1)), "rescored": overlap(self.search(queries, k))}
+
+    def sample(self, count: int, seed: int = 0) -> np.ndarray:
+        """Float32 vectors of up to count random live records, e.g. as queries for recall()"""
+        with self._lock:
+            vectors, live = self._vectors, np.flatnonzero(self._alive[:self._rows])
+        if vectors is None or not len(live):
+            return np.zeros((0, self._dim), dtype=np.float32)
+        chosen = np.random.default_rng(seed).choice(live, size=min(count, len(live)), replace=False)
+        return np.asarray(vectors[np.sort(chosen)])
+
+    def similarities(self, query: np.ndarray, record_ids: List[str]) -> Dict[str, float]:
+        """Exact cosine similarity of the query to each stored record among record_ids"""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self._lock:
+            vectors = self._vectors
+            found = [(rid, self._numbers[rid]) for rid in record_ids if rid in self._numbers]
+        if vectors is None or not found:
+            return {}
+        exact = vectors[[number for _, number in found]] @ query
+        return {rid: float(score) for (rid, _), score in zip(found, exact)}
+
+    def _compact(self) -> None:
+        """Rewrite the row files without tombstoned rows"""
+        live = np.flatnonzero(self._alive)
+        if len(live) == self._rows:
+            return
+        sources = {"codes.bin": self._codes, "vectors.bin": self._vectors, "scales.bin": self._scales}
+        for name, dtype, width in self._row_files():
+            tmp_path = self._path(f"{name}.tmp")
+            with open(tmp_path, "wb") as f:
+                for start in range(0, len(live), self.block_rows):
+                    block = live[start:start + self.block_rows]
+                    if name == "ids.bin":
+                        np.array([self._ids[number] for number in block], dtype=self._ID_DTYPE).tofile(f)
+                    else:
+                        np.ascontiguousarray(sources[name][block]).tofile(f)
+            os.replace(tmp_path, self._path(name))
+        self._ids = [self._ids[number] for number in live]
+        self._numbers = {rid: number for number, rid in enumerate(self._ids)}
+        self._alive = np.ones(len(live), dtype=bool)
+        self._rows = len(live)
+        self._map()
+
+    def save(self) -> None:
+        """Record the valid rows, compacting first if enough of them are tombstoned"""
+        with self._lock:
+            if not self._dirty:
+                return
+            if self._rows - len(self._numbers) > self.compact_ratio * self._rows:
+                self._compact()
+            meta = {
+                "dtype": self.dtype,
+                "dim": self._dim,
+                "rows": self._rows,
+                "deleted": np.flatnonzero(~self._alive).tolist()
+            }
+            tmp_path = self._path("meta.json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._path("meta.json"))
+            self._dirty = False
+
+    def _load(self) -> None:
+        with open(self._path("meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dtype"] != self.dtype:
+            # Switched between fp16 and int8; the caller re-fills the tier
+            return
+        self._dim, self._rows = int(meta["dim"]), int(meta["rows"])
+        for name, dtype, width in self._row_files():
+            if self._rows and os.path.getsize(self._path(name)) < self._rows * width * dtype.itemsize:
+                raise ValueError(f"{name} is shorter than the {self._rows} rows recorded")
+        ids = np.fromfile(self._path("ids.bin"), dtype=self._ID_DTYPE, count=self._rows) if self._rows else []
+        self._ids = [rid.decode("ascii") for rid in ids]
+        self._alive = np.ones(self._rows, dtype=bool)
+        self._alive[np.asarray(meta["deleted"], dtype=np.int64)] = False
+        for number in meta["deleted"]:
+            self._ids[number] = None
+        self._numbers = {rid: number for number, rid in enumerate(self._ids) if rid is not None}
+        self._map()
+
+    def stats(self) -> Dict[str, Any]:
+        """Row counts and bytes: scanned per query, read for re-scoring, and the float32 equivalent"""
+        with self._lock:
+            rows, live, dim = self._rows, len(self._numbers), self._dim
+        code_bytes = rows * dim * self._code_dtype.itemsize + (rows * 4 if self.dtype == "int8" else 0)
+        float32_bytes = rows * dim * 4
+        return {
+            "dtype": self.dtype,
+            "rows": rows,
+            "live": live,
+            "dim": dim,
+            "scan_bytes": code_bytes,
+            "rescore_bytes": float32_bytes,
+            "float32_bytes": float32_bytes,
+            "compression": float32_bytes / code_bytes if code_bytes else 0.0
+        }
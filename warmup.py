@@ -0,0 +1,72 @@
+"""
+Background warm-up of the heavy parts of DocExpy
+
+Importing chromadb, sentence_transformers/torch, langchain and the PDF/DOCX
+parsers takes seconds. The UI imports none of them at module load; instead
+start_warmup() loads the shared vector store and embedding model on a daemon
+thread while the first page renders, and everything that needs them imports
+them on first use (blocking only if the warm-up has not finished yet).
+"""
+
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import Config
+
+_thread: Optional[threading.Thread] = None
+_thread_lock = threading.Lock()
+_status: Dict[str, Any] = {"started_at": None, "finished_at": None, "error": None}
+
+
+def _warm_up() -> None:
+    try:
+        from vector_store import get_vector_store
+        get_vector_store().embedding_model.warm_up()
+        from reranker import get_reranker
+        reranker = get_reranker()
+        if reranker:
+            reranker.warm_up()
+        # Resume ingestion jobs a previous process left unfinished
+        from job_queue import start_job_runner
+        start_job_runner()
+        # Modules the upload and answer paths import on first use
+        import document_processor  # noqa: F401
+        import ingest_pipeline  # noqa: F401
+        if not Config.LLM_STUB and Config.GROQ_API_KEY:
+            from llm import get_llm_client
+            get_llm_client()
+    except Exception as e:
+        _status["error"] = str(e)
+    finally:
+        _status["finished_at"] = time.perf_counter()
+
+
+def start_warmup() -> None:
+    """Start warming up once per process; later calls return immediately"""
+    global _thread
+    if _thread is None:
+        with _thread_lock:
+            if _thread is None:
+                _status["started_at"] = time.perf_counter()
+                _thread = threading.Thread(target=_warm_up, name="docexpy-warmup", daemon=True)
+                _thread.start()
+
+
+def warmup_status() -> Dict[str, Any]:
+    """Whether the warm-up is running or done, how long it took and any error"""
+    started, finished = _status["started_at"], _status["finished_at"]
+    return {
+        "started": started is not None,
+        "done": finished is not None,
+        "elapsed_s": (finished or time.perf_counter()) - started if started is not None else 0.0,
+        "error": _status["error"]
+    }
+
+
+def is_vector_store_loaded() -> bool:
+    """vector_store.is_vector_store_loaded, without importing chromadb and torch just to ask"""
+    module = sys.modules.get("vector_store")
+    loaded = getattr(module, "is_vector_store_loaded", None)
+    return loaded is not None and loaded()